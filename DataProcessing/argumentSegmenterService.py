@@ -0,0 +1,113 @@
+import re
+
+PARAGRAPH_SEPARATOR = '\n\n'
+
+# Numbered outline headings: "I.", "IV.", "A.", "1.", "12." followed by the heading text
+OUTLINE_HEADING_PATTERN = re.compile(r'\s*(?:[IVXLC]+|[A-Z]|\d{1,3})\.\s+\S')
+
+
+class ArgumentSegmenter:
+    """
+    Incremental heading/content segmenter for brief text.
+    Text is consumed chunk by chunk and split into paragraphs exactly like
+    text.split('\\n\\n'); arguments are yielded as soon as the next heading closes them,
+    with character offsets into the source text. Memory is bounded by the largest
+    single argument, not by the document.
+    """
+
+    def __init__(self, outline_headings=True, max_outline_heading_length=200, compact_threshold=1 << 16):
+        self.outline_headings = outline_headings
+        self.max_outline_heading_length = max_outline_heading_length
+        self.compact_threshold = compact_threshold
+
+    def is_heading(self, para):
+        """
+        Check if paragraph looks like a heading:
+        - All caps
+        - Short (less than 100 chars)
+        - Ends with period but doesn't have many periods
+        - Numbered outline heading such as "I.", "A." or "1." (if enabled)
+        """
+        if (para.isupper() or
+                (len(para) < 100 and para.count('.') <= 1) or
+                (para.endswith('.') and para.count('.') == 1)):
+            return True
+        return (self.outline_headings and
+                len(para) <= self.max_outline_heading_length and
+                OUTLINE_HEADING_PATTERN.match(para) is not None)
+
+    def iter_paragraphs(self, chunks):
+        """Yield (start offset, paragraph) with the same paragraphs as ''.join(chunks).split('\\n\\n')"""
+        if isinstance(chunks, str):
+            chunks = [chunks]
+
+        buffer = ''
+        pos = 0          # Scan position inside buffer
+        offset = 0       # Source offset of buffer[0]
+        for chunk in chunks:
+            # Drop consumed text so the buffer stays around one paragraph plus one chunk
+            if pos > self.compact_threshold:
+                buffer = buffer[pos:]
+                offset += pos
+                pos = 0
+            # Re-check the last character too, in case a separator spans two chunks
+            search_from = max(pos, len(buffer) - 1)
+            buffer += chunk
+            while True:
+                idx = buffer.find(PARAGRAPH_SEPARATOR, search_from)
+                if idx == -1:
+                    break
+                yield offset + pos, buffer[pos:idx]
+                pos = idx + len(PARAGRAPH_SEPARATOR)
+                search_from = pos
+        yield offset + pos, buffer[pos:]
+
+    def segment(self, chunks):
+        """
+        Yield arguments as dicts with 'heading', 'content' (content paragraphs joined by
+        a blank line) and source offsets 'heading_start', 'heading_end', 'content_start'
+        and 'content_end'.
+        """
+        current_heading = None
+        heading_span = None
+        current_content = []
+        content_start = content_end = None
+
+        def make_argument():
+            return {
+                'heading': current_heading,
+                'content': PARAGRAPH_SEPARATOR.join(current_content),
+                'heading_start': heading_span[0],
+                'heading_end': heading_span[1],
+                'content_start': content_start,
+                'content_end': content_end
+            }
+
+        for start, para in self.iter_paragraphs(chunks):
+            # Skip empty paragraphs
+            if not para.strip():
+                continue
+
+            if self.is_heading(para):
+                # If we have a previous heading and content, emit it
+                if current_heading and current_content:
+                    yield make_argument()
+
+                # Start new argument
+                current_heading = para
+                heading_span = (start, start + len(para))
+                current_content = []
+            elif current_heading:
+                # Add paragraph to current content
+                if not current_content:
+                    content_start = start
+                current_content.append(para)
+                content_end = start + len(para)
+            else:
+                # If no heading yet, treat this as a heading
+                current_heading = para
+                heading_span = (start, start + len(para))
+
+        # Emit the last argument if there is one
+        if current_heading and current_content:
+            yield make_argument()
@@ -0,0 +1,161 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+
+def is_pdf(data, filename=''):
+    """True for PDF uploads, by extension or magic bytes"""
+    return filename.lower().endswith('.pdf') or data[:5] == b'%PDF-'
+
+
+def _pdf_reader(data):
+    try:
+        import PyPDF2
+    except ImportError:
+        raise RuntimeError("PyPDF2 module is not installed. Please install it using: pip install PyPDF2")
+    return PyPDF2.PdfReader(io.BytesIO(data))
+
+
+def extract_pdf_page_range(data, start, stop):
+    """Text of pages [start, stop) of a PDF; runs inside a worker process"""
+    reader = _pdf_reader(data)
+    return [reader.pages[i].extract_text() or '' for i in range(start, stop)]
+
+
+class DocumentTextCache:
+    """LRU cache of extracted document text keyed by file hash, bounded by total characters"""
+
+    def __init__(self, max_chars=64 * 1024 * 1024):
+        self.max_chars = max_chars
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_chars = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            text = self._entries.get(key)
+            if text is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return text
+
+    def put(self, key, text):
+        if len(text) > self.max_chars:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_chars -= len(previous)
+            self._entries[key] = text
+            self.current_chars += len(text)
+            while self.current_chars > self.max_chars:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_chars -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'chars': self.current_chars,
+                'max_chars': self.max_chars,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+class DocumentExtractor:
+    """
+    Text extraction for uploaded TXT and PDF files.
+    PDF pages are split into contiguous ranges extracted in parallel worker processes
+    (PyPDF2 is pure Python, so threads would serialize on the GIL). Pages are yielded in
+    order as their range finishes, so segmentation can start before the last page is read.
+    Extracted text is cached by SHA-256 of the file, so re-uploads skip extraction.
+    Workers are started with forkserver (spawn where it is unavailable) rather than fork:
+    the server process runs threads (model loader, encode scheduler, compute pool) whose
+    locks a forked child could inherit while held. Every server process has its own pool,
+    so max_workers is kept small.
+    """
+
+    PAGE_SEPARATOR = '\n'
+
+    def __init__(self, max_workers=2, min_pages_per_worker=8, cache=None, start_method='forkserver'):
+        self.max_workers = max(int(max_workers), 1)
+        self.min_pages_per_worker = min_pages_per_worker
+        if start_method not in multiprocessing.get_all_start_methods():
+            start_method = 'spawn'
+        self.start_method = start_method
+        self.cache = cache if cache is not None else DocumentTextCache()
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created lazily (and again after fork), since a pool can't be shared across processes
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context(self.start_method))
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def shutdown(self):
+        """Stop the worker processes, if any were started by this process"""
+        with self._lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    @staticmethod
+    def file_hash(data):
+        return hashlib.sha256(data).hexdigest()
+
+    def iter_pdf_pages(self, data):
+        """Yield page texts in order, extracting page ranges in parallel for large PDFs"""
+        page_count = len(_pdf_reader(data).pages)
+        workers = min(self.max_workers, page_count // self.min_pages_per_worker)
+        if workers <= 1:
+            yield from extract_pdf_page_range(data, 0, page_count)
+            return
+
+        bounds = [page_count * i // workers for i in range(workers + 1)]
+        executor = self._get_executor()
+        futures = [executor.submit(extract_pdf_page_range, data, start, stop)
+                   for start, stop in zip(bounds, bounds[1:])]
+        for future in futures:
+            yield from future.result()
+
+    def iter_text(self, data, filename=''):
+        """
+        Yield the document text in pieces (one per PDF page), filling the cache once
+        the whole document has been read. Cached documents are yielded in one piece.
+        """
+        key = self.file_hash(data)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        if not is_pdf(data, filename):
+            text = data.decode('utf-8', errors='replace')
+            self.cache.put(key, text)
+            yield text
+            return
+
+        pieces = []
+        for i, page_text in enumerate(self.iter_pdf_pages(data)):
+            piece = page_text if i == 0 else self.PAGE_SEPARATOR + page_text
+            pieces.append(piece)
+            yield piece
+        self.cache.put(key, ''.join(pieces))
+
+    def extract_text(self, data, filename=''):
+        """Full document text"""
+        return ''.join(self.iter_text(data, filename))
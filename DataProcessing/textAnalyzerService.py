@@ -0,0 +1,191 @@
+import re
+from collections import Counter
+
+# Citation patterns, in the same order as ArgumentFeatureExtractor.extract_legal_citations
+CITATION_PATTERNS = [
+    # Case citations (e.g., Brown v. Board of Education)
+    ('case', r'[A-Z][a-z]+\s+v\.\s+[A-Z][a-z]+'),
+
+    # Supreme Court citations (e.g., 347 U.S. 483)
+    ('us_reports', r'\d+\s+U\.S\.\s+\d+'),
+
+    # Federal Reporter citations (e.g., 865 F.3d 211)
+    ('federal_reporter', r'\d+\s+F\.\d+d\s+\d+'),
+
+    # Supreme Court Reporter citations (e.g., 137 S.Ct. 2012)
+    ('supreme_court_reporter', r'\d+\s+S\.Ct\.\s+\d+'),
+
+    # Federal Rules citations (e.g., Fed. R. Civ. P. 12(b)(6))
+    ('federal_rules', r'Fed\.\s+R\.\s+Civ\.\s+P\.\s+\d+(?P<federal_rules_part>\([a-z]\))+'),
+
+    # U.S. Code citations (e.g., 42 U.S.C. § 1983)
+    ('us_code', r'\d+\s+U\.S\.C\.\s+§\s+\d+'),
+
+    # Code of Federal Regulations (e.g., 17 C.F.R. § 240.10b-5)
+    ('cfr', r'\d+\s+C\.F\.R\.\s+§\s+\d+\.\d+[a-z]?-\d+')
+]
+
+CITATION_REGEXES = {name: re.compile(pattern) for name, pattern in CITATION_PATTERNS}
+
+# Every citation contains one of these literal markers. Scanning for the markers is
+# one cheap pass; the full pattern is then matched only where a marker was found.
+CITATION_MARKERS = re.compile(r'v\.|[UFSC]\.|Fed\.')
+
+# Patterns to try at each marker
+MARKER_PATTERNS = {
+    'v.': ['case'],
+    'U.': ['us_reports', 'us_code'],
+    'F.': ['federal_reporter'],
+    'S.': ['supreme_court_reporter'],
+    'C.': ['cfr'],
+    'Fed.': ['federal_rules']
+}
+
+# A run of letters starting with a capital at a word boundary; entities are chains of runs
+# separated by whitespace (the capitalized-phrase pattern \b[A-Z][a-zA-Z]*(?:\s+[A-Z][a-zA-Z]*)*\b)
+CAPITAL_RUN = re.compile(r'\b[A-Z][a-zA-Z]*')
+
+
+class LegalTextProfile:
+    """
+    Citations, entities and key terms of one text, computed once and reused across pairs.
+    term_counts holds the text's term frequencies for TF-IDF when a term index is in use.
+    """
+
+    __slots__ = ('citations', 'entities', 'key_terms', 'term_counts')
+
+    def __init__(self, citations, entities, key_terms, term_counts=None):
+        self.citations = citations
+        self.entities = entities
+        self.key_terms = key_terms
+        self.term_counts = term_counts
+
+
+class LegalTextAnalyzer:
+    """
+    Precompiled scanner producing a LegalTextProfile per text.
+    Citations, entities and key terms are all collected in one pass over the text's tokens.
+    """
+
+    def __init__(self, max_terms=50, min_term_length=4, min_entity_length=4):
+        self.max_terms = max_terms
+        self.min_term_length = min_term_length
+        self.min_entity_length = min_entity_length
+
+    def analyze(self, text):
+        """Build the full profile for a text in a single pass over its whitespace tokens"""
+        citations = set()
+        entities = set()
+        terms = []
+
+        # End of the last accepted match per citation pattern, so each pattern keeps
+        # re.findall's non-overlapping semantics on its own
+        last_end = {name: 0 for name, _ in CITATION_PATTERNS}
+
+        # Span of the capitalized phrase being built (phrase_start is None without one); it
+        # continues into the next token only while its last run ends at the end of a token
+        phrase_start = phrase_end = None
+        phrase_token = -1
+
+        # Only tokens with a capital letter or a '.' are located in the text; tokens
+        # without either can't contain one, so find() from the last located token is exact
+        position = 0
+
+        # Lowercasing never adds or removes whitespace, so the two token lists line up
+        for index, (token, word) in enumerate(zip(text.split(), text.lower().split())):
+            if len(word) >= self.min_term_length:
+                terms.append(word)
+            if word == token and '.' not in token:
+                continue
+
+            token_start = text.find(token, position)
+            token_end = position = token_start + len(token)
+            if '.' in token:
+                self._scan_citations(text, token_start, token_end, citations, last_end)
+            if word == token:
+                continue
+
+            if token.isalpha() and token.isascii():
+                # A plain word is one run if it starts with a capital, and none otherwise
+                runs = ((token_start, token_end),) if 'A' <= token[0] <= 'Z' else ()
+            else:
+                runs = [run.span() for run in CAPITAL_RUN.finditer(text, token_start, token_end)]
+
+            for run_start, run_end in runs:
+                if phrase_start is not None and not (phrase_token == index - 1 and run_start == token_start):
+                    self._add_entity(text, phrase_start, phrase_end, entities)
+                    phrase_start = None
+                if run_end == token_end:
+                    if phrase_start is None:
+                        phrase_start = run_start
+                    phrase_end, phrase_token = run_end, index
+                    continue
+
+                # A phrase can't end before a word character (the trailing \b), and
+                # doesn't continue past a non-space character
+                if not (text[run_end].isalnum() or text[run_end] == '_'):
+                    if phrase_start is None:
+                        phrase_start = run_start
+                    phrase_end = run_end
+                if phrase_start is not None:
+                    self._add_entity(text, phrase_start, phrase_end, entities)
+                phrase_start = None
+
+        if phrase_start is not None:
+            self._add_entity(text, phrase_start, phrase_end, entities)
+        key_terms = {term for term, count in Counter(terms).most_common(self.max_terms)}
+        return LegalTextProfile(citations, entities, key_terms)
+
+    def _add_entity(self, text, start, end, entities):
+        if end - start >= self.min_entity_length:
+            entities.add(text[start:end])
+
+    def _scan_citations(self, text, token_start, token_end, citations, last_end):
+        """Match the citation patterns at each citation marker inside one token"""
+        for marker in CITATION_MARKERS.finditer(text, token_start, token_end):
+            marker_start = marker.start()
+            for name in MARKER_PATTERNS[marker.group()]:
+                start = self._citation_start(text, name, marker_start)
+                if start is None or start < last_end[name]:
+                    continue
+                match = CITATION_REGEXES[name].match(text, start)
+                if match is None:
+                    continue
+                last_end[name] = match.end()
+
+                # re.findall returns the (last) capture group for the Federal Rules pattern
+                citations.add(match.group(1) if name == 'federal_rules' else match.group())
+
+    @staticmethod
+    def _citation_start(text, name, marker_start):
+        """
+        Leftmost position where pattern `name` could match with its marker at marker_start,
+        or None. Number-prefixed patterns need `\\d+\\s+` before the marker and case names
+        need `[A-Z][a-z]+\\s+`; the greedy runs make that start unique.
+        """
+        if name == 'federal_rules':
+            return marker_start
+
+        # Whitespace run directly before the marker
+        pos = marker_start
+        while pos > 0 and text[pos - 1].isspace():
+            pos -= 1
+        if pos == marker_start:
+            return None
+
+        if name == 'case':
+            # Lowercase run, then one capital letter
+            word_end = pos
+            while pos > 0 and 'a' <= text[pos - 1] <= 'z':
+                pos -= 1
+            if pos == word_end or pos == 0 or not 'A' <= text[pos - 1] <= 'Z':
+                return None
+            return pos - 1
+
+        # Digit run
+        number_end = pos
+        while pos > 0 and text[pos - 1].isdecimal():
+            pos -= 1
+        if pos == number_end:
+            return None
+        return pos
@@ -0,0 +1,305 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class RegisteredBrief:
+    """A segmented brief with everything pair scoring needs, computed once at registration"""
+
+    __slots__ = ('brief_id', 'arguments', 'argument_embeddings', 'heading_embeddings',
+                 'profiles', 'model_name', 'registered_at', 'nbytes')
+
+    def __init__(self, brief_id, arguments, argument_embeddings, heading_embeddings, profiles, model_name):
+        self.brief_id = brief_id
+        self.arguments = arguments
+        self.argument_embeddings = argument_embeddings
+        self.heading_embeddings = heading_embeddings
+        self.profiles = profiles
+        self.model_name = model_name
+        self.registered_at = time.time()
+        self.nbytes = self._estimate_nbytes()
+
+    def _estimate_nbytes(self):
+        # Vectors exactly, text roughly (one byte per character)
+        size = self.argument_embeddings.nbytes + self.heading_embeddings.nbytes
+        size += sum(len(arg['heading']) + len(arg['content']) for arg in self.arguments)
+        for profile in self.profiles:
+            for items in (profile.citations, profile.entities, profile.key_terms):
+                size += sum(len(item) for item in items)
+            if profile.term_counts is not None:
+                size += sum(array.nbytes for array in profile.term_counts)
+        return size
+
+    def summary(self):
+        return {
+            'brief_id': self.brief_id,
+            'num_arguments': len(self.arguments),
+            'headings': [arg['heading'] for arg in self.arguments],
+            'model_name': self.model_name,
+            'registered_at': self.registered_at,
+            'bytes': self.nbytes
+        }
+
+
+class BriefStore:
+    """
+    Bounded server-side store of registered briefs keyed by brief_id.
+    Least recently used briefs are evicted once there are more than max_briefs
+    or their estimated size exceeds max_bytes; on_evict(brief) is called for each
+    evicted brief, after the store's lock is released.
+    """
+
+    def __init__(self, max_briefs=256, max_bytes=256 * 1024 * 1024, on_evict=None):
+        self.max_briefs = int(max_briefs)
+        self.max_bytes = int(max_bytes)
+        self.on_evict = on_evict
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, brief_id):
+        """Return the registered brief, or None if it is unknown or was evicted"""
+        with self._lock:
+            brief = self._entries.get(brief_id)
+            if brief is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(brief_id)
+            self.hits += 1
+            return brief
+
+    def peek(self, brief_id):
+        """Return the registered brief or None, without counting a hit or refreshing its recency"""
+        with self._lock:
+            return self._entries.get(brief_id)
+
+    def put(self, brief):
+        """Register (or replace) a brief; returns True if it replaced an existing one"""
+        if brief.nbytes > self.max_bytes:
+            raise ValueError(f"Brief '{brief.brief_id}' needs {brief.nbytes} bytes, more than the store's {self.max_bytes}.")
+
+        evicted_briefs = []
+        with self._lock:
+            previous = self._entries.pop(brief.brief_id, None)
+            if previous is not None:
+                self.current_bytes -= previous.nbytes
+            self._entries[brief.brief_id] = brief
+            self.current_bytes += brief.nbytes
+
+            while len(self._entries) > self.max_briefs or self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.nbytes
+                self.evictions += 1
+                evicted_briefs.append(evicted)
+
+        if self.on_evict is not None:
+            for evicted in evicted_briefs:
+                self.on_evict(evicted)
+        return previous is not None
+
+    def delete(self, brief_id):
+        """Remove a brief; returns False if it was not registered"""
+        with self._lock:
+            brief = self._entries.pop(brief_id, None)
+            if brief is None:
+                return False
+            self.current_bytes -= brief.nbytes
+            return True
+
+    def stats(self):
+        """Counters for the health endpoint"""
+        with self._lock:
+            return {
+                'briefs': len(self._entries),
+                'max_briefs': self.max_briefs,
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+
+class SharedBriefStore(BriefStore):
+    """
+    Brief store kept in a SQLite database at path, shared by every process that opens it
+    (each gunicorn worker has its own SharedBriefStore on the same file), so a brief
+    registered through one worker can be linked through any other.
+    The limits apply to the database, evicting its least recently used briefs. Each process
+    also caches the briefs it has used in memory, within the same limits, and checks the
+    cached copy against the database's version of the brief on every lookup.
+    on_load(brief) is called for briefs read from the database into this process, such as
+    those registered by another worker; on_evict(brief) for briefs this process evicts, and
+    for cached briefs it finds deleted by another process.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS briefs ("
+        "brief_id TEXT PRIMARY KEY, version TEXT NOT NULL, nbytes INTEGER NOT NULL, "
+        "last_used REAL NOT NULL, data BLOB NOT NULL)"
+    )
+
+    def __init__(self, path, max_briefs=256, max_bytes=256 * 1024 * 1024, on_evict=None, on_load=None):
+        super().__init__(max_briefs, max_bytes, on_evict)
+        self.path = path
+        self.on_load = on_load
+        self._versions = {}
+        self._connection = None
+        self._pid = None
+
+    def _db(self):
+        # One connection per process (caller holds _lock); connections don't survive fork
+        if self._connection is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(self.SCHEMA)
+            self._pid = os.getpid()
+            self._entries = OrderedDict()
+            self._versions = {}
+            self.current_bytes = 0
+        return self._connection
+
+    def __len__(self):
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM briefs").fetchone()[0]
+
+    def _cache(self, brief, version):
+        """Keep a brief in this process's memory, dropping the least recently used beyond the limits"""
+        previous = self._entries.pop(brief.brief_id, None)
+        if previous is not None:
+            self.current_bytes -= previous.nbytes
+        self._entries[brief.brief_id] = brief
+        self._versions[brief.brief_id] = version
+        self.current_bytes += brief.nbytes
+        while len(self._entries) > self.max_briefs or self.current_bytes > self.max_bytes:
+            brief_id, dropped = self._entries.popitem(last=False)
+            del self._versions[brief_id]
+            self.current_bytes -= dropped.nbytes
+
+    def _uncache(self, brief_id):
+        brief = self._entries.pop(brief_id, None)
+        if brief is not None:
+            del self._versions[brief_id]
+            self.current_bytes -= brief.nbytes
+        return brief
+
+    def _lookup(self, brief_id, touch):
+        db = self._db()
+        loaded = removed = None
+        row = db.execute("SELECT version FROM briefs WHERE brief_id = ?", (brief_id,)).fetchone()
+        if row is None:
+            # Deleted or evicted by another process
+            removed = self._uncache(brief_id)
+            brief = None
+        elif self._versions.get(brief_id) == row[0]:
+            brief = self._entries[brief_id]
+            self._entries.move_to_end(brief_id)
+        else:
+            data = db.execute("SELECT version, data FROM briefs WHERE brief_id = ?", (brief_id,)).fetchone()
+            if data is None:
+                removed = self._uncache(brief_id)
+                brief = None
+            else:
+                brief = loaded = pickle.loads(data[1])
+                self._cache(brief, data[0])
+        if brief is not None and touch:
+            db.execute("UPDATE briefs SET last_used = ? WHERE brief_id = ?", (time.time(), brief_id))
+        return brief, loaded, removed
+
+    def _notify(self, loaded=None, removed=()):
+        if self.on_evict is not None:
+            for brief in removed:
+                if brief is not None:
+                    self.on_evict(brief)
+        if loaded is not None and self.on_load is not None:
+            self.on_load(loaded)
+
+    def get(self, brief_id):
+        """Return the registered brief, or None if it is unknown or was evicted"""
+        with self._lock:
+            brief, loaded, removed = self._lookup(brief_id, touch=True)
+            if brief is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        self._notify(loaded, [removed])
+        return brief
+
+    def peek(self, brief_id):
+        """Return the registered brief or None, without counting a hit or refreshing its recency"""
+        with self._lock:
+            brief, loaded, removed = self._lookup(brief_id, touch=False)
+        self._notify(loaded, [removed])
+        return brief
+
+    def put(self, brief):
+        """Register (or replace) a brief; returns True if it replaced an existing one"""
+        if brief.nbytes > self.max_bytes:
+            raise ValueError(f"Brief '{brief.brief_id}' needs {brief.nbytes} bytes, more than the store's {self.max_bytes}.")
+
+        data = pickle.dumps(brief, protocol=pickle.HIGHEST_PROTOCOL)
+        version = uuid.uuid4().hex
+        evicted_briefs = []
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                replaced = db.execute("SELECT 1 FROM briefs WHERE brief_id = ?", (brief.brief_id,)).fetchone() is not None
+                db.execute("INSERT OR REPLACE INTO briefs (brief_id, version, nbytes, last_used, data) VALUES (?, ?, ?, ?, ?)",
+                           (brief.brief_id, version, brief.nbytes, time.time(), data))
+                while True:
+                    count, total_bytes = db.execute("SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM briefs").fetchone()
+                    if count <= self.max_briefs and total_bytes <= self.max_bytes:
+                        break
+                    evicted_id, evicted_data = db.execute(
+                        "SELECT brief_id, data FROM briefs WHERE brief_id != ? ORDER BY last_used LIMIT 1",
+                        (brief.brief_id,)).fetchone()
+                    db.execute("DELETE FROM briefs WHERE brief_id = ?", (evicted_id,))
+                    self._uncache(evicted_id)
+                    evicted_briefs.append(pickle.loads(evicted_data))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            self.evictions += len(evicted_briefs)
+            self._cache(brief, version)
+
+        self._notify(removed=evicted_briefs)
+        return replaced
+
+    def delete(self, brief_id):
+        """Remove a brief; returns False if it was not registered"""
+        with self._lock:
+            deleted = self._db().execute("DELETE FROM briefs WHERE brief_id = ?", (brief_id,)).rowcount > 0
+            self._uncache(brief_id)
+            return deleted
+
+    def stats(self):
+        """Counters for the health endpoint (briefs and bytes are the database's; the rest this process's)"""
+        with self._lock:
+            count, total_bytes = self._db().execute("SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM briefs").fetchone()
+            return {
+                'briefs': count,
+                'max_briefs': self.max_briefs,
+                'bytes': total_bytes,
+                'max_bytes': self.max_bytes,
+                'cached_briefs': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'path': self.path
+            }
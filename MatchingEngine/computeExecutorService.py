@@ -0,0 +1,121 @@
+import contextvars
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_DONE = object()
+
+
+class ComputeQueueFull(Exception):
+    """Raised by run() when max_queue jobs are already waiting; retry_after is a wait estimate in seconds"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Compute queue is full. Retry after {retry_after} seconds.")
+        self.retry_after = retry_after
+
+
+class ComputeExecutor:
+    """
+    Bounded thread pool for the CPU-heavy part of requests (encoding, featurizing, scoring).
+    Request threads hand their work to run() and wait, so at most max_concurrency jobs
+    compete for the CPU while the remaining request threads stay free to answer cheap
+    endpoints (health checks, argument extraction) without queueing behind them.
+    Work runs in a copy of the caller's context, so Flask's request / g and the stage
+    timer see the same request as the calling thread.
+    At most max_queue jobs wait for a slot (None for no limit); beyond that run() sheds
+    the job with ComputeQueueFull instead of letting the queue wait grow without bound.
+    """
+
+    def __init__(self, max_concurrency=2, max_queue=None):
+        if int(max_concurrency) < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        self.max_concurrency = int(max_concurrency)
+        self.max_queue = None if max_queue is None else int(max_queue)
+        self._executor = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.active = 0
+        self.queued = 0
+        self.started = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_run_seconds = 0.0
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+
+    def _ensure_executor(self):
+        # Created lazily and recreated after fork, since threads don't survive fork
+        if self._executor is not None and self._pid == os.getpid():
+            return self._executor
+        with self._start_lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='compute')
+            return self._executor
+
+    def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on the pool and return its result (or raise its exception)"""
+        return self._run(fn, args, kwargs, shed=True)
+
+    def _run(self, fn, args, kwargs, shed):
+        enqueued_at = time.perf_counter()
+        context = contextvars.copy_context()
+        with self._stats_lock:
+            if shed and self.max_queue is not None and self.queued >= self.max_queue:
+                self.rejected += 1
+                raise ComputeQueueFull(self._retry_after())
+            self.queued += 1
+
+        def task():
+            wait = time.perf_counter() - enqueued_at
+            with self._stats_lock:
+                self.queued -= 1
+                self.active += 1
+                self.started += 1
+                self.total_queue_wait += wait
+                self.max_queue_wait = max(self.max_queue_wait, wait)
+            started_at = time.perf_counter()
+            try:
+                return context.run(fn, *args, **kwargs)
+            finally:
+                with self._stats_lock:
+                    self.active -= 1
+                    self.completed += 1
+                    self.total_run_seconds += time.perf_counter() - started_at
+
+        return self._ensure_executor().submit(task).result()
+
+    def _retry_after(self):
+        # Time for the running and queued jobs to drain at the average job duration (caller holds _stats_lock)
+        average = self.total_run_seconds / self.completed if self.completed else 1.0
+        return max(1, math.ceil(average * (self.active + self.queued) / self.max_concurrency))
+
+    def iterate(self, iterator):
+        """
+        Yield the items of iterator, computing each one on the pool (for streamed responses).
+        The stream was admitted with the request that created it, so its items wait for a slot
+        like any job but are never shed: once a 200 is sent, the body has to run to its end.
+        """
+        while True:
+            item = self._run(next, (iterator, _DONE), {}, shed=False)
+            if item is _DONE:
+                return
+            yield item
+
+    def stats(self):
+        """Concurrency and queue wait counters for the health endpoint"""
+        with self._stats_lock:
+            return {
+                'max_concurrency': self.max_concurrency,
+                'max_queue': self.max_queue,
+                'active': self.active,
+                'queued': self.queued,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'avg_run_ms': self.total_run_seconds / self.completed * 1000.0 if self.completed else 0.0,
+                'avg_queue_wait_ms': self.total_queue_wait / self.started * 1000.0 if self.started else 0.0,
+                'max_queue_wait_ms': self.max_queue_wait * 1000.0
+            }
@@ -0,0 +1,237 @@
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class CounterArgumentIndex:
+    """
+    Inverted-file (IVF) nearest-neighbor index over argument embeddings.
+    Vectors are L2-normalized and clustered with spherical k-means; a query only scans
+    the inverted lists of its n_probe closest centroids, so search cost grows with
+    n_probe * (size / n_lists) instead of the full archive size.
+    Each vector carries a metadata dict (brief_id, position, heading, content, plus a
+    'source' that tells apart briefs without a brief_id).
+
+    Several processes (gunicorn workers) can share one saved index: writers hold the
+    directory's exclusive locked() while they reload, add and save, and is_stale() tells a
+    process that another one has saved since it loaded.
+    """
+
+    VECTORS_FILE = 'vectors.npz'
+    METADATA_FILE = 'metadata.json'
+    LOCK_FILE = '.lock'
+
+    def __init__(self, dim=None, min_train_size=256):
+        self.dim = dim
+        self.min_train_size = min_train_size
+        self.vectors = np.zeros((0, dim or 0), dtype=np.float32)
+        self.metadata = []
+        self.centroids = None
+        self.list_ids = []
+        self._keys = set()
+        self._lock = threading.Lock()
+
+        # stored_signature() of the saved index this one was loaded from or last saved as
+        self.signature = None
+
+    def __len__(self):
+        return len(self.metadata)
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+    @staticmethod
+    def _key(meta):
+        return (meta.get('brief_id'), meta.get('source'), meta.get('position'))
+
+    def train(self, n_lists=None, n_iter=10, seed=42):
+        """Cluster the stored vectors into n_lists inverted lists (default about sqrt(size))"""
+        with self._lock:
+            size = len(self.vectors)
+            if size == 0:
+                return
+            n_lists = n_lists or max(1, int(np.sqrt(size)))
+            n_lists = min(n_lists, size)
+
+            rng = np.random.default_rng(seed)
+            centroids = self.vectors[rng.choice(size, n_lists, replace=False)].copy()
+            for _ in range(n_iter):
+                assignments = np.argmax(self.vectors @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignments, self.vectors)
+
+                # Re-seed empty clusters with random vectors
+                empty = np.bincount(assignments, minlength=n_lists) == 0
+                sums[empty] = self.vectors[rng.integers(size, size=int(empty.sum()))]
+                centroids = self._normalize(sums)
+
+            self.centroids = centroids
+            self._rebuild_lists()
+
+    def _rebuild_lists(self):
+        assignments = np.argmax(self.vectors @ self.centroids.T, axis=1)
+        self.list_ids = [np.flatnonzero(assignments == c) for c in range(len(self.centroids))]
+
+    def build(self, vectors, metadata, n_lists=None, n_iter=10, seed=42):
+        """Replace the index contents and train the inverted lists"""
+        with self._lock:
+            self.vectors = np.zeros((0, np.asarray(vectors).shape[-1]), dtype=np.float32)
+            self.metadata = []
+            self.centroids = None
+            self.list_ids = []
+            self._keys = set()
+        self.add(vectors, metadata, train=False)
+        self.train(n_lists, n_iter, seed)
+
+    def add(self, vectors, metadata, train=True):
+        """
+        Incrementally add vectors with their metadata. Entries whose (brief_id, source, position)
+        is already indexed are skipped. New vectors go to their nearest existing list;
+        an untrained index is trained once it holds min_train_size vectors.
+        Returns the number of vectors added.
+        """
+        vectors = self._normalize(vectors)
+        with self._lock:
+            keep = []
+            for i, meta in enumerate(metadata):
+                key = self._key(meta)
+                if key in self._keys:
+                    continue
+                self._keys.add(key)
+                keep.append(i)
+            if not keep:
+                return 0
+
+            if self.dim is None or len(self.vectors) == 0:
+                self.dim = vectors.shape[1]
+                self.vectors = self.vectors.reshape(0, self.dim)
+            new_ids = np.arange(len(self.vectors), len(self.vectors) + len(keep))
+            self.vectors = np.concatenate([self.vectors, vectors[keep]])
+            self.metadata.extend(metadata[i] for i in keep)
+
+            if self.centroids is not None:
+                assignments = np.argmax(vectors[keep] @ self.centroids.T, axis=1)
+                for c in np.unique(assignments):
+                    self.list_ids[c] = np.concatenate([self.list_ids[c], new_ids[assignments == c]])
+                return len(keep)
+
+        if train and len(self.vectors) >= self.min_train_size:
+            self.train()
+        return len(keep)
+
+    def search(self, query, k=10, n_probe=8):
+        """
+        Approximate top-k by cosine similarity.
+        Returns (ids, scores) sorted by descending score.
+        """
+        query = self._normalize(query)[0]
+        with self._lock:
+            if len(self.vectors) == 0:
+                return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+            if self.centroids is None:
+                # Small untrained index: exact scan
+                candidates = np.arange(len(self.vectors))
+            else:
+                centroid_scores = self.centroids @ query
+                n_probe = min(n_probe, len(self.centroids))
+                probes = np.argpartition(-centroid_scores, n_probe - 1)[:n_probe]
+                candidates = np.concatenate([self.list_ids[c] for c in probes])
+
+            scores = self.vectors[candidates] @ query
+
+        k = min(k, len(candidates))
+        if k == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return candidates[top], scores[top]
+
+    def get(self, ids):
+        """Stored (normalized) vectors and metadata for a list of ids"""
+        with self._lock:
+            return self.vectors[ids], [self.metadata[i] for i in ids]
+
+    @classmethod
+    @contextmanager
+    def locked(cls, path, exclusive=True):
+        """
+        Hold the index directory's file lock, shared between processes: exclusive around a
+        reload-add-save, shared around a load. The lock is not reentrant.
+        """
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, cls.LOCK_FILE), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @classmethod
+    def stored_signature(cls, path):
+        """Identity of the index saved at path (None if there is none); every save() changes it"""
+        try:
+            stat = os.stat(os.path.join(path, cls.METADATA_FILE))
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def is_stale(self, path):
+        """True if an index was saved at path after this one was loaded from or saved there"""
+        signature = self.stored_signature(path)
+        return signature is not None and signature != self.signature
+
+    def save(self, path):
+        """
+        Write the index to a directory (vectors and lists as npz, metadata as JSON).
+        Each file is replaced atomically; callers sharing the directory hold locked().
+        """
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            arrays = {'vectors': self.vectors}
+            if self.centroids is not None:
+                arrays['centroids'] = self.centroids
+                arrays['assignments'] = np.concatenate([
+                    np.full(len(ids), c, dtype=np.int64) for c, ids in enumerate(self.list_ids)
+                ] or [np.zeros(0, dtype=np.int64)])
+                arrays['assignment_ids'] = np.concatenate(self.list_ids or [np.zeros(0, dtype=np.int64)])
+            vectors_path = os.path.join(path, self.VECTORS_FILE)
+            with open(vectors_path + '.tmp', 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(vectors_path + '.tmp', vectors_path)
+
+            # Metadata last: its signature marks the save as complete
+            metadata_path = os.path.join(path, self.METADATA_FILE)
+            with open(metadata_path + '.tmp', 'w') as f:
+                json.dump({'min_train_size': self.min_train_size, 'metadata': self.metadata}, f)
+            os.replace(metadata_path + '.tmp', metadata_path)
+            self.signature = self.stored_signature(path)
+
+    @classmethod
+    def load(cls, path):
+        """Load an index written by save() (callers sharing the directory hold locked(exclusive=False))"""
+        signature = cls.stored_signature(path)
+        with open(os.path.join(path, cls.METADATA_FILE), 'r') as f:
+            stored = json.load(f)
+        with np.load(os.path.join(path, cls.VECTORS_FILE), allow_pickle=False) as arrays:
+            vectors = arrays['vectors']
+            index = cls(dim=vectors.shape[1], min_train_size=stored['min_train_size'])
+            index.vectors = vectors.astype(np.float32)
+            index.metadata = stored['metadata']
+            index._keys = {cls._key(meta) for meta in index.metadata}
+            if 'centroids' in arrays:
+                index.centroids = arrays['centroids']
+                assignments = arrays['assignments']
+                assignment_ids = arrays['assignment_ids']
+                index.list_ids = [assignment_ids[assignments == c] for c in range(len(index.centroids))]
+        index.signature = signature
+        return index
@@ -0,0 +1,146 @@
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+class _EncodeRequest:
+    __slots__ = ('texts', 'enqueued_at', 'done', 'result', 'error')
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class EncodeScheduler:
+    """
+    Dynamic micro-batching in front of a sentence model.
+    Concurrent encode() calls are queued; a background thread collects them for up to
+    max_wait_ms (or until max_batch_size texts are waiting), runs one forward pass and
+    hands each caller back its own rows. Exposes encode() like SentenceTransformer, so
+    it can be passed to ArgumentFeatureExtractor in place of the model.
+    Optional histograms receive each request's queue wait (seconds) and each batch's size (texts).
+    """
+
+    def __init__(self, sentence_model, max_batch_size=64, max_wait_ms=5.0,
+                 queue_wait_histogram=None, batch_size_histogram=None):
+        self.sentence_model = sentence_model
+        self.queue_wait_histogram = queue_wait_histogram
+        self.batch_size_histogram = batch_size_histogram
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait = float(max_wait_ms) / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+
+    def __getattr__(self, name):
+        # Model attributes such as tokenizer and max_seq_length pass through
+        if name == 'sentence_model':
+            raise AttributeError(name)
+        return getattr(self.sentence_model, name)
+
+    def _ensure_worker(self):
+        # Started lazily and restarted after fork, since threads don't survive fork
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='encode-scheduler', daemon=True)
+            self._thread.start()
+
+    def encode(self, sentences, **kwargs):
+        """Encode one text or a list of texts, batched together with concurrent callers"""
+        if kwargs:
+            # Calls with custom encode options are not merged with others
+            return self.sentence_model.encode(sentences, **kwargs)
+
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.asarray(self.sentence_model.encode(texts))
+
+        self._ensure_worker()
+        request = _EncodeRequest(texts)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result[0] if single else request.result
+
+    def _collect(self):
+        """Block for the first request, then gather more until the batch is full or the wait expires"""
+        batch = [self._queue.get()]
+        size = len(batch[0].texts)
+        deadline = batch[0].enqueued_at + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            texts = [text for request in batch for text in request.texts]
+
+            waits = [started - request.enqueued_at for request in batch]
+            with self._stats_lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self.texts += len(texts)
+                self.total_queue_wait += sum(waits)
+                self.max_queue_wait = max(self.max_queue_wait, *waits)
+            if self.queue_wait_histogram is not None:
+                for wait in waits:
+                    self.queue_wait_histogram.observe(wait)
+            if self.batch_size_histogram is not None:
+                self.batch_size_histogram.observe(len(texts))
+
+            try:
+                embeddings = np.asarray(self.sentence_model.encode(texts))
+                offset = 0
+                for request in batch:
+                    request.result = embeddings[offset:offset + len(request.texts)]
+                    offset += len(request.texts)
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            for request in batch:
+                request.done.set()
+
+    def stats(self):
+        """Batching counters and queue wait metrics"""
+        with self._stats_lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'requests': self.requests,
+                'batches': self.batches,
+                'texts': self.texts,
+                'avg_batch_size': self.texts / self.batches if self.batches else 0.0,
+                'avg_queue_wait_ms': self.total_queue_wait / self.requests * 1000.0 if self.requests else 0.0,
+                'max_queue_wait_ms': self.max_queue_wait * 1000.0
+            }
@@ -0,0 +1,34 @@
+"""
+CPU encoder backends for the sentence model, selected by 'encoder_backend' in config.json:
+
+    torch       full fp32 PyTorch SentenceTransformer (default)
+    torch-int8  the same model with its Linear layers dynamically quantized to int8
+    onnx        exported ONNX graph run by onnxruntime (needs optimum[onnxruntime])
+
+All backends expose SentenceTransformer's encode(), so the rest of the pipeline does not care.
+"""
+
+ENCODER_BACKENDS = ('torch', 'torch-int8', 'onnx')
+
+
+def load_encoder(model_name, backend='torch', model_kwargs=None):
+    """Load model_name with the given backend; model_kwargs go to SentenceTransformer (e.g. an ONNX file_name)"""
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend '{backend}'. Expected one of {ENCODER_BACKENDS}.")
+
+    from sentence_transformers import SentenceTransformer
+
+    if backend == 'onnx':
+        return SentenceTransformer(model_name, device='cpu', backend='onnx', model_kwargs=model_kwargs)
+
+    encoder = SentenceTransformer(model_name, device='cpu', model_kwargs=model_kwargs)
+    if backend == 'torch-int8':
+        import torch
+        from torch.ao.quantization import quantize_dynamic
+        encoder = quantize_dynamic(encoder, {torch.nn.Linear}, dtype=torch.qint8)
+    return encoder
+
+
+def encoder_id(model_name, backend='torch'):
+    """Identifier for embeddings produced by this model/backend, used in cache keys"""
+    return model_name if backend == 'torch' else f"{model_name}:{backend}"
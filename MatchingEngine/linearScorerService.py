@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+ARTIFACT_FORMAT = 'standardized-logistic-regression'
+ARTIFACT_VERSION = 1
+
+
+class LinearScorer:
+    """
+    Pure NumPy scorer for the link classifier: standardize the features, then a logistic
+    regression. Loaded from a small JSON artifact of weights, scaler parameters and feature
+    order (exported from model.pkl), so serving needs neither scikit-learn nor unpickling.
+    predict_proba matches the sklearn / imblearn pipeline it was exported from.
+    """
+
+    def __init__(self, feature_cols, mean, scale, coef, intercept, metadata=None):
+        self.feature_cols = list(feature_cols)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.metadata = dict(metadata or {})
+        if not (len(self.feature_cols) == len(self.mean) == len(self.scale) == len(self.coef)):
+            raise ValueError("Feature columns, scaler parameters and weights must have the same length.")
+
+        # Fold the scaler into the weights: ((X - mean) / scale) @ coef + b == X @ w + b'
+        self._weights = self.coef / self.scale
+        self._bias = self.intercept - float(self.mean @ self._weights)
+
+    @property
+    def model_version(self):
+        """Short hash of the parameters, identifying this exact model"""
+        params = json.dumps([self.feature_cols, self.mean.tolist(), self.scale.tolist(),
+                             self.coef.tolist(), self.intercept])
+        return hashlib.sha1(params.encode('utf-8')).hexdigest()[:12]
+
+    def decision_function(self, X):
+        return np.asarray(X, dtype=np.float64) @ self._weights + self._bias
+
+    def predict_proba(self, X):
+        """(n, 2) class probabilities, like sklearn"""
+        z = self.decision_function(X)
+        positive = np.exp(-np.logaddexp(0.0, -z))
+        return np.stack([1.0 - positive, positive], axis=1)
+
+    @classmethod
+    def from_pipeline(cls, pipeline, feature_cols):
+        """
+        Extract the parameters of a fitted (StandardScaler, [sampler,] LogisticRegression)
+        pipeline. Samplers such as SMOTE only act during fit and are skipped.
+        """
+        steps = [step for _, step in pipeline.steps] if hasattr(pipeline, 'steps') else [pipeline]
+        n_features = len(feature_cols)
+        mean = np.zeros(n_features)
+        scale = np.ones(n_features)
+        classifier = None
+        for step in steps:
+            if step is None or step == 'passthrough' or hasattr(step, 'fit_resample'):
+                continue
+            if type(step).__name__ == 'StandardScaler':
+                if getattr(step, 'mean_', None) is not None:
+                    mean = np.asarray(step.mean_, dtype=np.float64)
+                if getattr(step, 'scale_', None) is not None:
+                    scale = np.asarray(step.scale_, dtype=np.float64)
+            elif type(step).__name__ == 'LogisticRegression':
+                classifier = step
+            else:
+                raise ValueError(f"Cannot export pipeline step {type(step).__name__}.")
+
+        if classifier is None or not hasattr(classifier, 'coef_'):
+            raise ValueError("Pipeline has no fitted LogisticRegression.")
+        if classifier.coef_.shape != (1, n_features):
+            raise ValueError(f"Expected a binary classifier over {n_features} features, got coef_ of shape {classifier.coef_.shape}.")
+        return cls(feature_cols, mean, scale, classifier.coef_[0], classifier.intercept_[0])
+
+    def parity_error(self, reference_model, X):
+        """Largest absolute difference in positive-class probability against reference_model on X"""
+        expected = np.asarray(reference_model.predict_proba(X))[:, 1]
+        return float(np.max(np.abs(self.predict_proba(X)[:, 1] - expected))) if len(X) else 0.0
+
+    def to_dict(self):
+        return {
+            'format': ARTIFACT_FORMAT,
+            'format_version': ARTIFACT_VERSION,
+            'model_version': self.model_version,
+            'feature_cols': self.feature_cols,
+            'scaler_mean': self.mean.tolist(),
+            'scaler_scale': self.scale.tolist(),
+            'coef': self.coef.tolist(),
+            'intercept': self.intercept,
+            'metadata': self.metadata
+        }
+
+    def save(self, path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if data.get('format') != ARTIFACT_FORMAT:
+            raise ValueError(f"Unknown model artifact format '{data.get('format')}'.")
+        if data.get('format_version', 0) > ARTIFACT_VERSION:
+            raise ValueError(f"Model artifact format version {data['format_version']} is newer than supported ({ARTIFACT_VERSION}).")
+        return cls(data['feature_cols'], data['scaler_mean'], data['scaler_scale'],
+                   data['coef'], data['intercept'], data.get('metadata'))
+
+
+def parity_inputs(n_features, n_random=10000, seed=0):
+    """
+    Feature rows for parity checks: random similarities / overlaps in [0, 1] plus the
+    corners of the unit cube (all zeros, all ones, one feature set at a time).
+    """
+    rng = np.random.default_rng(seed)
+    corners = np.vstack([np.zeros(n_features), np.ones(n_features), np.eye(n_features)])
+    return np.vstack([rng.random((n_random, n_features)), corners])
+
+
+def export_model(pipeline, feature_cols, path, tolerance=1e-9, extra_inputs=None, metadata=None):
+    """
+    Export a fitted pipeline to a LinearScorer artifact at path after checking that both give the
+    same probabilities (within tolerance) on parity_inputs() and extra_inputs. Returns the scorer.
+    """
+    scorer = LinearScorer.from_pipeline(pipeline, feature_cols)
+    X = parity_inputs(len(feature_cols))
+    if extra_inputs is not None and len(extra_inputs):
+        X = np.vstack([X, extra_inputs])
+    error = scorer.parity_error(pipeline, X)
+    if error > tolerance:
+        raise ValueError(f"Exported scorer differs from the pipeline by {error:.3g} (tolerance {tolerance:.3g}).")
+    scorer.metadata.update(metadata or {})
+    scorer.metadata.update({'parity_rows': int(len(X)), 'parity_max_abs_error': error})
+    scorer.save(path)
+    return scorer
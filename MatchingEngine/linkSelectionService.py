@@ -0,0 +1,50 @@
+import numpy as np
+
+# 'topk': up to max_links response arguments per moving argument
+# 'optimal': maximum-weight one-to-one matching between moving and response arguments
+ASSIGNMENT_MODES = ('topk', 'optimal')
+
+
+def select_link_indices(proba_matrix, threshold, max_links, assignment='topk'):
+    """
+    Pick links from a (M, N) probability matrix.
+    Returns (moving_idx, response_idx) arrays ordered by descending probability
+    (ties keep row-major order). Arguments are identified by index, so two sections
+    sharing a heading are limited separately.
+    """
+    if assignment not in ASSIGNMENT_MODES:
+        raise ValueError(f"Unknown assignment mode '{assignment}'. Expected one of {ASSIGNMENT_MODES}.")
+
+    proba_matrix = np.asarray(proba_matrix, dtype=np.float64)
+    n_moving, n_response = proba_matrix.shape
+    eligible = proba_matrix >= threshold
+
+    if assignment == 'optimal':
+        # scipy.optimize is slow to import, so it is only loaded when a request asks for it
+        from scipy.optimize import linear_sum_assignment
+        
+        # Below-threshold pairs weigh nothing, so the matching only trades eligible links
+        weights = np.where(eligible, proba_matrix, 0.0)
+        rows, cols = linear_sum_assignment(weights, maximize=True)
+        keep = eligible[rows, cols]
+        selected = np.zeros_like(eligible)
+        selected[rows[keep], cols[keep]] = True
+    else:
+        k = min(max_links, n_response)
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        if k < n_response:
+            # Per-row top-k without sorting the full row: everything above the k-th largest
+            # probability, then ties with it in index order (as a stable sort would pick them)
+            kth = -np.partition(-proba_matrix, k - 1, axis=1)[:, k - 1:k]
+            above = proba_matrix > kth
+            tied = proba_matrix == kth
+            room = k - above.sum(axis=1, keepdims=True)
+            selected = (above | (tied & (np.cumsum(tied, axis=1) <= room))) & eligible
+        else:
+            selected = eligible
+
+    # Sort only the selected links, stable so equal probabilities keep row-major order
+    flat = np.flatnonzero(selected)
+    flat = flat[np.argsort(-proba_matrix.ravel()[flat], kind='stable')]
+    return np.unravel_index(flat, proba_matrix.shape)
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+
+import numpy as np
+
+# Lowercase words of three or more characters starting with a letter ("rule", "12b6" is not one)
+TOKEN_PATTERN = re.compile(r'[a-z][a-z0-9]{2,}')
+
+
+@lru_cache(maxsize=65536)
+def term_hash(term):
+    """Stable 64-bit hash of a term; the index stores hashes instead of a vocabulary"""
+    return int.from_bytes(hashlib.blake2b(term.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def term_counts(text):
+    """(sorted uint64 term hashes, float64 counts) of the distinct terms of a text"""
+    counts = Counter(TOKEN_PATTERN.findall(text.lower()))
+    hashes = np.fromiter((term_hash(term) for term in counts), dtype=np.uint64, count=len(counts))
+    values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+    order = np.argsort(hashes)
+    return hashes[order], values[order]
+
+
+class TermIndex:
+    """
+    Corpus term statistics for TF-IDF cosine similarity between arguments.
+    The built index is three flat arrays sorted by term hash (hashes, document frequencies,
+    IDF weights) saved as .npy files and memory-mapped on load, so loading costs nothing and
+    forked workers share the pages. Documents added later (e.g. registered briefs) are kept
+    in a small in-memory overlay keyed by the caller, so re-adding a key replaces its counts
+    and removing it takes them out again. Overlay changes reach the IDF weights in batches,
+    once idf_update_documents documents have been added or removed, so weights (and every
+    score computed from them) stay stable between batches; idf_version counts the batches.
+    """
+
+    HASHES_FILE = 'term_hashes.npy'
+    DOCUMENT_FREQUENCY_FILE = 'document_frequency.npy'
+    IDF_FILE = 'idf.npy'
+    METADATA_FILE = 'metadata.json'
+    FORMAT_VERSION = 1
+
+    def __init__(self, term_hashes=None, document_frequency=None, n_documents=0, idf=None, metadata=None,
+                 idf_update_documents=32):
+        self.term_hashes = np.zeros(0, dtype=np.uint64) if term_hashes is None else term_hashes
+        self.document_frequency = np.zeros(0, dtype=np.uint32) if document_frequency is None else document_frequency
+        self.n_documents = int(n_documents)
+        self.idf = self.smooth_idf(self.document_frequency, self.n_documents).astype(np.float32) if idf is None else idf
+        self.metadata = dict(metadata or {})
+        self._version = None
+        self.idf_update_documents = max(int(idf_update_documents), 1)
+        self.idf_version = 0
+        # Overlay documents by key, with their term frequencies kept up to date ...
+        self._extra_documents = {}
+        self._overlay_frequency = Counter()
+        # ... and the snapshot of them that the IDF weights currently use
+        self._extra_frequency = Counter()
+        self._extra_document_count = 0
+        self._pending_documents = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def smooth_idf(document_frequency, n_documents):
+        """log((1 + n) / (1 + df)) + 1, so unseen terms get the largest weight and no term gets 0"""
+        return np.log((1.0 + n_documents) / (1.0 + np.asarray(document_frequency, dtype=np.float64))) + 1.0
+
+    @classmethod
+    def build(cls, texts, metadata=None):
+        """Build the index from an iterable of documents (one per argument)"""
+        frequency = Counter()
+        n_documents = 0
+        for text in texts:
+            frequency.update(term_counts(text)[0].tolist())
+            n_documents += 1
+        hashes = np.array(sorted(frequency), dtype=np.uint64)
+        document_frequency = np.array([frequency[h] for h in hashes.tolist()], dtype=np.uint32)
+        return cls(hashes, document_frequency, n_documents, metadata=metadata)
+
+    @property
+    def version(self):
+        """Short hash of the built statistics (not the overlay), identifying this index"""
+        if self._version is None:
+            digest = hashlib.sha1(np.ascontiguousarray(self.term_hashes).tobytes())
+            digest.update(np.ascontiguousarray(self.document_frequency).tobytes())
+            digest.update(str(self.n_documents).encode('utf-8'))
+            self._version = digest.hexdigest()[:12]
+        return self._version
+
+    def add_documents(self, key, texts):
+        """
+        Count texts as documents under key, replacing what was added under key before.
+        Returns True if the IDF weights changed (a batch of overlay changes was applied).
+        """
+        documents = [term_counts(text)[0] for text in texts]
+        with self._lock:
+            previous = self._extra_documents.get(key)
+            if previous is not None and len(previous) == len(documents) and \
+                    all(np.array_equal(a, b) for a, b in zip(previous, documents)):
+                return False
+            for hashes in previous or []:
+                self._overlay_frequency.subtract(hashes.tolist())
+            for hashes in documents:
+                self._overlay_frequency.update(hashes.tolist())
+            self._extra_documents[key] = documents
+            self._pending_documents += len(previous or []) + len(documents)
+            return self._apply_pending(force=False)
+
+    def remove_documents(self, key):
+        """
+        Stop counting the documents added under key.
+        Returns True if the IDF weights changed (a batch of overlay changes was applied).
+        """
+        with self._lock:
+            documents = self._extra_documents.pop(key, None)
+            if documents is None:
+                return False
+            for hashes in documents:
+                self._overlay_frequency.subtract(hashes.tolist())
+            self._pending_documents += len(documents)
+            return self._apply_pending(force=False)
+
+    def refresh(self):
+        """Apply pending overlay changes to the IDF weights now; returns True if there were any"""
+        with self._lock:
+            return self._apply_pending(force=True)
+
+    def _apply_pending(self, force):
+        # Caller holds _lock
+        if not self._pending_documents or (not force and self._pending_documents < self.idf_update_documents):
+            return False
+        self._overlay_frequency += Counter()  # drop terms whose count fell to zero
+        self._extra_frequency = Counter(self._overlay_frequency)
+        self._extra_document_count = sum(len(documents) for documents in self._extra_documents.values())
+        self._pending_documents = 0
+        self.idf_version += 1
+        return True
+
+    def idf_for(self, hashes):
+        """IDF weight of each term hash (unknown terms get the weight of df = 0)"""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        positions = np.minimum(np.searchsorted(self.term_hashes, hashes), max(len(self.term_hashes) - 1, 0))
+        found = self.term_hashes[positions] == hashes if len(self.term_hashes) else np.zeros(len(hashes), dtype=bool)
+
+        with self._lock:
+            extra_documents = self._extra_document_count
+            extra_frequency = np.fromiter((self._extra_frequency.get(h, 0) for h in hashes.tolist()),
+                                          dtype=np.float64, count=len(hashes)) if extra_documents else None
+
+        if extra_frequency is None:
+            # Only the built statistics: use the stored weights
+            unseen = np.float32(self.smooth_idf(0, self.n_documents))
+            return np.where(found, self.idf[positions] if len(self.idf) else unseen, unseen).astype(np.float64)
+        base_frequency = np.where(found, self.document_frequency[positions] if len(self.document_frequency) else 0, 0)
+        return self.smooth_idf(base_frequency + extra_frequency, self.n_documents + extra_documents)
+
+    def cosine_matrix(self, moving_counts, response_counts):
+        """
+        (M, N) cosine similarity of sublinear TF-IDF vectors ((1 + log tf) * idf) between lists of
+        term_counts() results, as one sparse matrix product. Empty documents score 0.
+        """
+        from scipy import sparse
+
+        counts = list(moving_counts) + list(response_counts)
+        if not moving_counts or not response_counts:
+            return np.zeros((len(moving_counts), len(response_counts)))
+        lengths = np.array([len(hashes) for hashes, _ in counts])
+        all_hashes = np.concatenate([hashes for hashes, _ in counts]) if lengths.sum() else np.zeros(0, dtype=np.uint64)
+        all_counts = np.concatenate([values for _, values in counts]) if lengths.sum() else np.zeros(0)
+
+        # Columns are the distinct terms of this request only
+        terms, columns = np.unique(all_hashes, return_inverse=True)
+        weights = (1.0 + np.log(all_counts)) * self.idf_for(terms)[columns]
+        indptr = np.concatenate([[0], np.cumsum(lengths)])
+        matrix = sparse.csr_matrix((weights, columns, indptr), shape=(len(counts), len(terms)))
+
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        matrix = sparse.diags(1.0 / np.where(norms == 0, 1.0, norms)) @ matrix
+        n_moving = len(moving_counts)
+        return np.asarray((matrix[:n_moving] @ matrix[n_moving:].T).toarray())
+
+    def stats(self):
+        """Sizes for the health endpoint"""
+        with self._lock:
+            extra_documents = sum(len(documents) for documents in self._extra_documents.values())
+            extra_terms = len(self._extra_frequency)
+            pending_documents = self._pending_documents
+            idf_version = self.idf_version
+        return {
+            'version': self.version,
+            'idf_version': idf_version,
+            'terms': len(self.term_hashes),
+            'documents': self.n_documents,
+            'added_documents': extra_documents,
+            'added_terms': extra_terms,
+            'pending_documents': pending_documents,
+            'bytes': int(self.term_hashes.nbytes + self.document_frequency.nbytes + self.idf.nbytes)
+        }
+
+    def save(self, path):
+        """Write the built statistics (not the overlay) to a directory of .npy files plus metadata"""
+        os.makedirs(path, exist_ok=True)
+        for name, array in ((self.HASHES_FILE, self.term_hashes),
+                            (self.DOCUMENT_FREQUENCY_FILE, self.document_frequency),
+                            (self.IDF_FILE, self.idf)):
+            np.save(os.path.join(path, name), np.ascontiguousarray(array))
+        metadata = dict(self.metadata)
+        metadata.update({
+            'format_version': self.FORMAT_VERSION,
+            'version': self.version,
+            'n_documents': self.n_documents,
+            'n_terms': len(self.term_hashes)
+        })
+        with open(os.path.join(path, self.METADATA_FILE), 'w') as f:
+            json.dump(metadata, f, indent=2)
+
+    @classmethod
+    def load(cls, path, mmap=True, idf_update_documents=32):
+        """Load an index written by save(), memory-mapping the arrays unless mmap is False"""
+        with open(os.path.join(path, cls.METADATA_FILE), 'r') as f:
+            metadata = json.load(f)
+        if metadata.get('format_version', 0) > cls.FORMAT_VERSION:
+            raise ValueError(f"Term index format version {metadata['format_version']} is newer than supported ({cls.FORMAT_VERSION}).")
+        mmap_mode = 'r' if mmap else None
+        arrays = [np.load(os.path.join(path, name), mmap_mode=mmap_mode, allow_pickle=False)
+                  for name in (cls.HASHES_FILE, cls.DOCUMENT_FREQUENCY_FILE, cls.IDF_FILE)]
+        return cls(*arrays[:2], metadata['n_documents'], idf=arrays[2], metadata=metadata,
+                   idf_update_documents=idf_update_documents)
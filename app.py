@@ -1,12 +1,28 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
+import functools
+import hashlib
 import json
 import os
 import pickle
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import re
+import threading
+import time
+from DataProcessing.argumentSegmenterService import ArgumentSegmenter
+from DataProcessing.documentExtractionService import DocumentExtractor
+from DataProcessing.textAnalyzerService import LegalTextAnalyzer
+from MatchingEngine.briefStoreService import BriefStore, RegisteredBrief, SharedBriefStore
+from MatchingEngine.computeExecutorService import ComputeExecutor, ComputeQueueFull
+from MatchingEngine.counterArgumentIndexService import CounterArgumentIndex
+from MatchingEngine.embeddingCacheService import EmbeddingCache
+from MatchingEngine.encodeSchedulerService import EncodeScheduler
+from MatchingEngine.encoderBackendService import encoder_id, load_encoder
+from MatchingEngine.linearScorerService import LinearScorer
+from MatchingEngine.linkSelectionService import ASSIGNMENT_MODES, select_link_indices
+from MatchingEngine.pairScoreCacheService import PairScoreCache, argument_hash
+from MatchingEngine.termIndexService import TermIndex, term_counts
+from Monitoring.metricsService import MetricsRegistry, StageTimer
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -19,14 +35,129 @@ model = None
 feature_extractor = None
 sentence_model = None
 feature_cols = None
+embedding_cache = None
+encode_scheduler = None
+brief_store = None
+pair_score_cache = None
+counterargument_index = None
+counterargument_index_path = os.path.join(model_path, 'counterargument_index')
+term_index = None
+term_index_path = os.path.join(model_path, 'term_index')
+
+# Text extraction for uploaded documents (needs no models)
+document_extractor = DocumentExtractor()
+
+# 'sync' runs every request on its own thread; 'async' moves encoding and scoring onto a
+# bounded compute executor so cheap endpoints never queue behind link jobs (see configure_serving)
+SERVING_MODES = ('sync', 'async')
+serving_mode = 'sync'
+compute_executor = None
+
+# Admission control for model-backed requests (config.json keys of the same name; 0 disables one).
+# request_deadline_ms bounds the time from arrival to response; clients may ask for less with
+# 'deadline_ms'. With a deadline, links are scored deadline_block_rows moving arguments at a time
+# and batches deadline_block_pairs brief pairs at a time, so a request that runs out of time
+# returns the top-k rows or pairs it finished as a partial result (optimal and incremental
+# links have no partial result and give up with 504 at the next block).
+DEFAULT_REQUEST_LIMITS = {
+    'max_arguments_per_brief': 200,
+    'max_pairs_per_request': 10000,
+    'max_content_bytes': 4 * 1024 * 1024,
+    'request_deadline_ms': 0,
+    'deadline_block_rows': 8,
+    'deadline_block_pairs': 8
+}
+request_limits = dict(DEFAULT_REQUEST_LIMITS)
+
+# Serializes model loading so concurrent first requests don't load twice
+models_lock = threading.RLock()
+
+# Progress of the current (or last) model load, reported by /api/health and /api/model-info
+model_loading = {'phase': 'not_started', 'started_at': None, 'finished_at': None, 'error': None}
+model_loader_thread = None
+model_loader_lock = threading.Lock()
+
+# Metrics exposed on /api/metrics
+metrics = MetricsRegistry()
+stage_timer = StageTimer(metrics.histogram(
+    'argument_linker_stage_seconds', 'Time spent in each pipeline stage per request', ['stage']))
+request_seconds = metrics.histogram(
+    'argument_linker_request_seconds', 'Request handling time by endpoint', ['endpoint'])
+requests_total = metrics.counter(
+    'argument_linker_requests_total', 'Requests by endpoint and status code', ['endpoint', 'status'])
+pairs_scored = metrics.counter(
+    'argument_linker_pairs_scored_total', 'Argument pairs scored by the classifier')
+texts_encoded = metrics.counter(
+    'argument_linker_texts_encoded_total', 'Texts run through the sentence model (embedding cache misses)')
+prediction_fallbacks = metrics.counter(
+    'argument_linker_prediction_fallbacks_total', 'Scoring calls that fell back to semantic similarity')
+requests_shed = metrics.counter(
+    'argument_linker_requests_shed_total', 'Requests rejected or cut short by admission control', ['reason'])
+encode_queue_wait_seconds = metrics.histogram(
+    'argument_linker_encode_queue_wait_seconds', 'Time encode requests wait for the micro-batching scheduler')
+encode_batch_texts = metrics.histogram(
+    'argument_linker_encode_batch_texts', 'Texts per sentence model forward pass from the encode scheduler',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512))
 
 # Define feature extractor class
 class ArgumentFeatureExtractor:
-    def __init__(self, sentence_model):
+    # Bump whenever a feature's definition changes, so cached training features are rebuilt
+    FEATURE_VERSION = 1
+    
+    def __init__(self, sentence_model, embedding_cache=None, model_name='all-mpnet-base-v2',
+                 argument_encoding='truncate', chunk_pooling='mean', max_chunks_per_argument=8,
+                 term_index=None):
+        if argument_encoding not in ('truncate', 'chunked'):
+            raise ValueError(f"Unknown argument_encoding '{argument_encoding}'. Expected 'truncate' or 'chunked'.")
+        if chunk_pooling not in ('mean', 'max'):
+            raise ValueError(f"Unknown chunk_pooling '{chunk_pooling}'. Expected 'mean' or 'max'.")
         self.sentence_model = sentence_model
+        self.embedding_cache = embedding_cache
+        self.model_name = model_name
+        self.argument_encoding = argument_encoding
+        self.chunk_pooling = chunk_pooling
+        self.max_chunks_per_argument = max_chunks_per_argument
+        self.text_analyzer = LegalTextAnalyzer()
         
-    def get_argument_embedding(self, arg):
-        """Get semantic embedding for an argument"""
+        # Corpus term statistics; when set, pairs also get the 'tfidf_cosine' feature
+        self.term_index = term_index
+        
+        # Fast tokenizers can't be used from several threads at once
+        self._tokenizer_lock = threading.Lock()
+    
+    def encode_texts(self, texts, kind):
+        """
+        Encode a list of texts in one batch, serving repeated texts from the embedding cache.
+        kind ('argument' or 'heading') is part of the cache key.
+        """
+        if self.embedding_cache is None:
+            texts_encoded.inc(len(texts))
+            with stage_timer.span('encode'):
+                return np.asarray(self.sentence_model.encode(list(texts)))
+        
+        keys = [EmbeddingCache.make_key(self.model_name, text, kind) for text in texts]
+        embeddings = [self.embedding_cache.get(key) for key in keys]
+        
+        # Encode only the distinct texts that missed the cache
+        missing = {}
+        for i, embedding in enumerate(embeddings):
+            if embedding is None:
+                missing.setdefault(keys[i], []).append(i)
+        if missing:
+            missing_keys = list(missing)
+            missing_texts = [texts[missing[key][0]] for key in missing_keys]
+            texts_encoded.inc(len(missing_texts))
+            with stage_timer.span('encode'):
+                encoded = np.asarray(self.sentence_model.encode(missing_texts))
+            for key, embedding in zip(missing_keys, encoded):
+                self.embedding_cache.put(key, embedding)
+                for i in missing[key]:
+                    embeddings[i] = embedding
+        
+        return np.array(embeddings)
+        
+    def get_argument_text(self, arg):
+        """Build the text that is embedded for an argument"""
         heading = arg['heading']
         content = arg['content']
         
@@ -36,151 +167,356 @@ class ArgumentFeatureExtractor:
             content = content[:max_length]
         
         # Repeat heading to give it more weight
-        text_to_embed = heading + " " + heading + " " + content
+        return heading + " " + heading + " " + content
+    
+    def token_offsets(self, text):
+        """(start, end) character offsets of the model's tokens in text (whitespace words without a tokenizer)"""
+        tokenizer = getattr(self.sentence_model, 'tokenizer', None)
+        if tokenizer is None:
+            return [match.span() for match in re.finditer(r'\S+', text)]
+        with self._tokenizer_lock:
+            return tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)['offset_mapping']
+    
+    def get_argument_chunks(self, arg):
+        """
+        Split an argument into texts that each fit the model's token window.
+        Every chunk keeps the doubled heading prefix; at most max_chunks_per_argument chunks
+        are produced, and only as much content as they can hold is tokenized.
+        """
+        heading = arg['heading']
+        content = arg['content']
+        
+        # Tokens available after [CLS]/[SEP]. A long heading is cut so that the doubled
+        # prefix leaves at least min(32, usable) tokens of content per chunk; the window is
+        # then whatever the prefix leaves, so prefix + window never exceeds max_seq_length
+        max_seq_length = getattr(self.sentence_model, 'max_seq_length', None) or 384
+        usable = max(max_seq_length - 2, 2)
+        heading_budget = (usable - min(32, usable // 2)) // 2
+        heading_offsets = self.token_offsets(heading)
+        if len(heading_offsets) > heading_budget:
+            heading = heading[:heading_offsets[heading_budget - 1][1]] if heading_budget > 0 else ''
+        prefix = heading + " " + heading + " "
+        window = max(usable - len(self.token_offsets(prefix)), 1)
+        max_tokens = window * self.max_chunks_per_argument
+        
+        # Only the content the chunks can hold is tokenized; tokens average well over one
+        # character, so the 16-characters-per-token slice keeps at least max_tokens tokens
+        offsets = self.token_offsets(content[:max_tokens * 16])[:max_tokens]
+        
+        chunks = []
+        for start in range(0, len(offsets), window):
+            window_offsets = offsets[start:start + window]
+            chunks.append(prefix + content[window_offsets[0][0]:window_offsets[-1][1]])
+        
+        return chunks or [prefix]
+    
+    def get_argument_embedding(self, arg):
+        """Get semantic embedding for an argument"""
+        if self.argument_encoding == 'chunked':
+            return self.get_argument_embeddings([arg])[0]
+        
+        text_to_embed = self.get_argument_text(arg)
         
         # Get embedding
-        embedding = self.sentence_model.encode(text_to_embed)
+        embedding = self.encode_texts([text_to_embed], 'argument')[0]
         return embedding
     
     def get_heading_embedding(self, heading):
         """Get semantic embedding for a heading only"""
-        return self.sentence_model.encode(heading)
+        return self.encode_texts([heading], 'heading')[0]
+    
+    def get_argument_embeddings(self, args):
+        """Get semantic embeddings for a list of arguments in one encode batch"""
+        if self.argument_encoding == 'chunked':
+            return self.get_chunked_argument_embeddings(args)
+        
+        texts = [self.get_argument_text(arg) for arg in args]
+        return self.encode_texts(texts, 'argument')
+    
+    def get_chunked_argument_embeddings(self, args):
+        """Encode the chunks of all arguments in one batch and pool them into one vector per argument"""
+        chunk_lists = [self.get_argument_chunks(arg) for arg in args]
+        chunk_embeddings = self.encode_texts([chunk for chunks in chunk_lists for chunk in chunks], 'chunk')
+        
+        pooled = []
+        offset = 0
+        for chunks in chunk_lists:
+            vectors = chunk_embeddings[offset:offset + len(chunks)]
+            offset += len(chunks)
+            pooled.append(vectors.max(axis=0) if self.chunk_pooling == 'max' else vectors.mean(axis=0))
+        
+        return np.array(pooled).reshape(len(args), chunk_embeddings.shape[-1])
+    
+    def get_heading_embeddings(self, headings):
+        """Get semantic embeddings for a list of headings in one encode batch"""
+        return self.encode_texts(list(headings), 'heading')
+    
+    @staticmethod
+    def cosine_similarity_matrix(a, b):
+        """Cosine similarity between every row of a and every row of b"""
+        a = np.asarray(a)
+        b = np.asarray(b)
+        
+        # Zero vectors get a similarity of 0, same as sklearn's cosine_similarity
+        a_norm = np.linalg.norm(a, axis=1, keepdims=True)
+        b_norm = np.linalg.norm(b, axis=1, keepdims=True)
+        a = a / np.where(a_norm == 0, 1.0, a_norm)
+        b = b / np.where(b_norm == 0, 1.0, b_norm)
+        
+        return a @ b.T
     
     def calculate_semantic_similarity(self, moving_arg, response_arg):
         """Calculate semantic similarity between arguments"""
         moving_embedding = self.get_argument_embedding(moving_arg)
         response_embedding = self.get_argument_embedding(response_arg)
         
-        return cosine_similarity([moving_embedding], [response_embedding])[0][0]
+        return self.cosine_similarity_matrix([moving_embedding], [response_embedding])[0][0]
     
     def calculate_heading_similarity(self, moving_arg, response_arg):
         """Calculate similarity between argument headings"""
         moving_heading_emb = self.get_heading_embedding(moving_arg['heading'])
         response_heading_emb = self.get_heading_embedding(response_arg['heading'])
         
-        return cosine_similarity([moving_heading_emb], [response_heading_emb])[0][0]
+        return self.cosine_similarity_matrix([moving_heading_emb], [response_heading_emb])[0][0]
     
-    def extract_legal_citations(self, text):
-        """Extract legal citations from text using regex patterns"""
-        citation_patterns = [
-            # Case citations (e.g., Brown v. Board of Education)
-            r'[A-Z][a-z]+\s+v\.\s+[A-Z][a-z]+',
-            
-            # Supreme Court citations (e.g., 347 U.S. 483)
-            r'\d+\s+U\.S\.\s+\d+',
-            
-            # Federal Reporter citations (e.g., 865 F.3d 211)
-            r'\d+\s+F\.\d+d\s+\d+',
-            
-            # Supreme Court Reporter citations (e.g., 137 S.Ct. 2012)
-            r'\d+\s+S\.Ct\.\s+\d+',
-            
-            # Federal Rules citations (e.g., Fed. R. Civ. P. 12(b)(6))
-            r'Fed\.\s+R\.\s+Civ\.\s+P\.\s+\d+(\([a-z]\))+',
-            
-            # U.S. Code citations (e.g., 42 U.S.C. § 1983)
-            r'\d+\s+U\.S\.C\.\s+§\s+\d+',
-            
-            # Code of Federal Regulations (e.g., 17 C.F.R. § 240.10b-5)
-            r'\d+\s+C\.F\.R\.\s+§\s+\d+\.\d+[a-z]?-\d+'
-        ]
-        
-        citations = []
-        for pattern in citation_patterns:
-            citations.extend(re.findall(pattern, text))
-        
-        return set(citations)
+    def get_text_profile(self, arg):
+        """Citations, entities and key terms (and term counts, with a term index) of an argument's content"""
+        profile = self.text_analyzer.analyze(arg['content'])
+        if self.term_index is not None:
+            profile.term_counts = term_counts(arg['content'])
+        return profile
+    
+    def calculate_tfidf_cosine(self, moving_arg, response_arg):
+        """Cosine similarity of the arguments' TF-IDF vectors under the corpus term index"""
+        return self.term_index.cosine_matrix([term_counts(moving_arg['content'])],
+                                             [term_counts(response_arg['content'])])[0][0]
     
-    def calculate_citation_overlap(self, moving_arg, response_arg):
-        """Calculate the overlap in legal citations"""
-        moving_citations = self.extract_legal_citations(moving_arg['content'])
-        response_citations = self.extract_legal_citations(response_arg['content'])
+    @staticmethod
+    def jaccard_matrix(moving_sets, response_sets):
+        """
+        Jaccard similarity between every moving set and every response set.
+        Each set becomes a row of a sparse binary matrix over a shared vocabulary, so
+        intersection = A . B^T and union = |A| + |B| - intersection.
+        Pairs where either set is empty score 0, as in the per-pair overlap functions.
+        """
+        from scipy import sparse
         
-        # Calculate Jaccard similarity
-        if not moving_citations or not response_citations:
-            return 0.0
+        vocabulary = {}
         
-        intersection = len(moving_citations.intersection(response_citations))
-        union = len(moving_citations.union(response_citations))
+        def to_csr_parts(sets):
+            indptr = [0]
+            indices = []
+            for items in sets:
+                indices.extend(vocabulary.setdefault(item, len(vocabulary)) for item in items)
+                indptr.append(len(indices))
+            return indices, indptr
         
-        return intersection / union if union > 0 else 0.0
-    
-    def extract_key_terms(self, text):
-        """Extract key legal terms based on frequency in the document"""
-        # Simple implementation - split by space and filter by length
-        words = text.lower().split()
-        words = [w for w in words if len(w) > 3]  # Filter short words
+        def to_sparse(indices, indptr):
+            data = np.ones(len(indices), dtype=np.float64)
+            return sparse.csr_matrix((data, indices, indptr), shape=(len(indptr) - 1, len(vocabulary)))
         
-        # Count frequencies
-        from collections import Counter
-        term_counts = Counter(words)
+        # Build the shared vocabulary from both sides before fixing the matrix width
+        moving_parts = to_csr_parts(moving_sets)
+        response_parts = to_csr_parts(response_sets)
+        moving_matrix = to_sparse(*moving_parts)
+        response_matrix = to_sparse(*response_parts)
         
-        # Get top terms
-        top_terms = [term for term, count in term_counts.most_common(50)]
+        intersection = (moving_matrix @ response_matrix.T).toarray()
+        moving_sizes = np.array([len(items) for items in moving_sets], dtype=np.float64)
+        response_sizes = np.array([len(items) for items in response_sets], dtype=np.float64)
+        union = moving_sizes[:, None] + response_sizes[None, :] - intersection
         
-        return set(top_terms)
+        both_non_empty = (moving_sizes[:, None] > 0) & (response_sizes[None, :] > 0)
+        return np.divide(intersection, union, out=np.zeros_like(intersection), where=both_non_empty)
     
-    def calculate_term_overlap(self, moving_arg, response_arg):
-        """Calculate the overlap in key legal terms"""
-        moving_terms = self.extract_key_terms(moving_arg['content'])
-        response_terms = self.extract_key_terms(response_arg['content'])
+    def extract_all_features(self, moving_arg, response_arg):
+        """Extract all features for a pair of arguments"""
+        moving_profile = self.text_analyzer.analyze(moving_arg['content'])
+        response_profile = self.text_analyzer.analyze(response_arg['content'])
         
-        # Calculate Jaccard similarity
-        if not moving_terms or not response_terms:
-            return 0.0
+        def overlap(kind):
+            return self.jaccard_matrix([getattr(moving_profile, kind)], [getattr(response_profile, kind)])[0][0]
         
-        intersection = len(moving_terms.intersection(response_terms))
-        union = len(moving_terms.union(response_terms))
+        features = {
+            'semantic_similarity': self.calculate_semantic_similarity(moving_arg, response_arg),
+            'heading_similarity': self.calculate_heading_similarity(moving_arg, response_arg),
+            'citation_overlap': overlap('citations'),
+            'entity_overlap': overlap('entities'),
+            'term_overlap': overlap('key_terms')
+        }
+        if self.term_index is not None:
+            features['tfidf_cosine'] = self.calculate_tfidf_cosine(moving_arg, response_arg)
         
-        return intersection / union if union > 0 else 0.0
+        return features
     
-    def extract_entities(self, text):
-        """Extract simple entities (placeholder function)"""
-        # This is a simplified entity extraction
-        # In a production system, you would use a proper NER model
-        entities = set()
-        
-        # Extract capitalized phrases as potential entities
-        entity_pattern = r'\b[A-Z][a-zA-Z]*(?:\s+[A-Z][a-zA-Z]*)*\b'
-        potential_entities = re.findall(entity_pattern, text)
+    def extract_feature_matrix(self, moving_args, response_args):
+        """
+        Extract all features for every (moving, response) pair at once.
+        Returns a dict of feature name -> array of shape (len(moving_args), len(response_args)).
+        Each argument and heading is encoded once instead of once per pair.
+        """
+        return self.extract_feature_matrices([(moving_args, response_args)])[0]
+    
+    def extract_feature_matrices(self, brief_pairs, stop=None):
+        """
+        Extract feature matrices for a list of (moving_args, response_args) brief pairs.
+        Arguments and headings of all pairs are encoded together in two large batches.
+        stop(), if given, is checked between pairs; once it returns True the remaining pairs
+        are skipped, so fewer matrices than pairs are returned.
+        """
+        all_args = [arg for moving_args, response_args in brief_pairs for arg in list(moving_args) + list(response_args)]
+        argument_embeddings, heading_embeddings, profiles = self.profile_arguments(all_args)
         
-        # Filter by length
-        entities.update([e for e in potential_entities if len(e) > 3])
+        feature_matrices = []
+        offset = 0
+        for moving_args, response_args in brief_pairs:
+            if stop is not None and stop():
+                break
+            moving = slice(offset, offset + len(moving_args))
+            response = slice(moving.stop, moving.stop + len(response_args))
+            offset = response.stop
+            
+            with stage_timer.span('feature_matrix'):
+                feature_matrices.append(self.build_feature_matrix(
+                    argument_embeddings[moving], argument_embeddings[response],
+                    heading_embeddings[moving], heading_embeddings[response],
+                    profiles[moving], profiles[response]
+                ))
         
-        return entities
+        return feature_matrices
     
-    def calculate_entity_overlap(self, moving_arg, response_arg):
-        """Calculate the overlap in entities"""
-        moving_entities = self.extract_entities(moving_arg['content'])
-        response_entities = self.extract_entities(response_arg['content'])
+    def profile_arguments(self, args):
+        """
+        Argument embeddings, heading embeddings and text profiles for a list of arguments:
+        everything build_feature_matrix needs from one side of a pair
+        """
+        argument_embeddings = self.get_argument_embeddings(args)
+        heading_embeddings = self.get_heading_embeddings([arg['heading'] for arg in args])
         
-        # Calculate Jaccard similarity
-        if not moving_entities or not response_entities:
-            return 0.0
+        # Citations, entities and key terms are profiled once per argument
+        with stage_timer.span('text_features'):
+            profiles = [self.get_text_profile(arg) for arg in args]
         
-        intersection = len(moving_entities.intersection(response_entities))
-        union = len(moving_entities.union(response_entities))
+        return argument_embeddings, heading_embeddings, profiles
+    
+    def iter_feature_rows(self, moving_args, response_args, block_size=1):
+        """
+        Yield (row slice, feature matrix block) for blocks of block_size moving arguments.
+        The response side is encoded once up front; each block of moving arguments is encoded
+        only when reached, so the first rows are ready long before the whole matrix.
+        """
+        response_embeddings, response_heading_embeddings, response_profiles = self.profile_arguments(response_args)
         
-        return intersection / union if union > 0 else 0.0
+        for start in range(0, len(moving_args), block_size):
+            block = moving_args[start:start + block_size]
+            block_embeddings = self.get_argument_embeddings(block)
+            block_heading_embeddings = self.get_heading_embeddings([arg['heading'] for arg in block])
+            with stage_timer.span('text_features'):
+                block_profiles = [self.get_text_profile(arg) for arg in block]
+            with stage_timer.span('feature_matrix'):
+                feature_block = self.build_feature_matrix(
+                    block_embeddings, response_embeddings,
+                    block_heading_embeddings, response_heading_embeddings,
+                    block_profiles, response_profiles
+                )
+            yield slice(start, start + len(block)), feature_block
     
-    def extract_all_features(self, moving_arg, response_arg):
-        """Extract all features for a pair of arguments"""
+    def build_feature_matrix(self, moving_embeddings, response_embeddings,
+                             moving_heading_embeddings, response_heading_embeddings,
+                             moving_profiles, response_profiles):
+        """Compute the (M, N) feature matrices from precomputed embeddings and text profiles"""
         features = {
-            'semantic_similarity': self.calculate_semantic_similarity(moving_arg, response_arg),
-            'heading_similarity': self.calculate_heading_similarity(moving_arg, response_arg),
-            'citation_overlap': self.calculate_citation_overlap(moving_arg, response_arg),
-            'entity_overlap': self.calculate_entity_overlap(moving_arg, response_arg),
-            'term_overlap': self.calculate_term_overlap(moving_arg, response_arg)
+            'semantic_similarity': self.cosine_similarity_matrix(moving_embeddings, response_embeddings),
+            'heading_similarity': self.cosine_similarity_matrix(moving_heading_embeddings, response_heading_embeddings),
+            'citation_overlap': self.jaccard_matrix(
+                [p.citations for p in moving_profiles],
+                [p.citations for p in response_profiles]
+            ),
+            'entity_overlap': self.jaccard_matrix(
+                [p.entities for p in moving_profiles],
+                [p.entities for p in response_profiles]
+            ),
+            'term_overlap': self.jaccard_matrix(
+                [p.key_terms for p in moving_profiles],
+                [p.key_terms for p in response_profiles]
+            )
         }
+        if self.term_index is not None:
+            features['tfidf_cosine'] = self.term_index.cosine_matrix(
+                [p.term_counts for p in moving_profiles],
+                [p.term_counts for p in response_profiles]
+            )
         
         return features
 
+def models_loaded():
+    """True once the classifier, sentence model and feature extractor are all available"""
+    return model is not None and feature_extractor is not None and sentence_model is not None
+
+def ensure_models_loaded():
+    """Load models on first use; concurrent callers wait for the one load in progress"""
+    if models_loaded():
+        return True
+    with models_lock:
+        if models_loaded():
+            return True
+        return load_models()
+
 def load_models():
     """Load models and components"""
-    global model, feature_extractor, sentence_model, feature_cols
+    with models_lock:
+        model_loading.update(phase='loading', started_at=time.monotonic(), finished_at=None, error=None)
+        loaded = _load_models()
+        model_loading.update(phase='ready' if loaded else 'failed', finished_at=time.monotonic())
+        return loaded
+
+def set_load_phase(phase):
+    """Record the step _load_models is in, for the load progress report"""
+    model_loading['phase'] = phase
+    print(f"Loading models: {phase}")
+
+def models_loading():
+    """True while a model load is queued or in progress"""
+    return model_loading['phase'] not in ('not_started', 'ready', 'failed')
+
+def model_loading_status():
+    """Load phase, seconds spent loading (so far, or in total once finished) and the last error"""
+    started_at = model_loading['started_at']
+    elapsed = None
+    if started_at is not None:
+        elapsed = round((model_loading['finished_at'] or time.monotonic()) - started_at, 3)
+    return {
+        'phase': model_loading['phase'],
+        'elapsed_seconds': elapsed,
+        'error': model_loading['error']
+    }
+
+def start_model_loading():
+    """
+    Load the models in a background thread so the server answers (health checks, argument
+    extraction) while they load. Does nothing if they are loaded or already loading.
+    Requests that need the models wait for the load in ensure_models_loaded().
+    """
+    global model_loader_thread
+    
+    with model_loader_lock:
+        if models_loaded() or (model_loader_thread is not None and model_loader_thread.is_alive()):
+            return model_loader_thread
+        model_loading.update(phase='starting', started_at=time.monotonic(), finished_at=None, error=None)
+        model_loader_thread = threading.Thread(target=load_models, name='model-loader', daemon=True)
+        model_loader_thread.start()
+        return model_loader_thread
+
+def _load_models():
+    """Load models and components (caller holds models_lock)"""
+    global model, feature_extractor, sentence_model, feature_cols, embedding_cache
+    global counterargument_index, counterargument_index_path, encode_scheduler, brief_store, pair_score_cache
+    global term_index, term_index_path, document_extractor
     
     try:
         # Load configuration
+        set_load_phase('config')
+        config = {}
         config_path = os.path.join(model_path, 'config.json')
         if os.path.exists(config_path):
             with open(config_path, 'r') as f:
@@ -204,12 +540,27 @@ def load_models():
             print("Configuration file not found. Using default features.")
         
         # Load sentence transformer model
-        print("Loading sentence transformer model...")
-        sentence_model = SentenceTransformer('all-mpnet-base-v2')
+        set_load_phase('sentence_model')
+        sentence_model_name = config.get('sentence_model_name', 'all-mpnet-base-v2')
+        encoder_backend = config.get('encoder_backend', 'torch')
+        sentence_model = load_encoder(sentence_model_name, encoder_backend, config.get('encoder_model_kwargs'))
         
-        # Load classifier model
+        # Process-wide embedding cache, kept across reloads
+        if embedding_cache is None:
+            embedding_cache = EmbeddingCache(config.get('embedding_cache_max_bytes', 256 * 1024 * 1024))
+        
+        # Load classifier model: the exported NumPy scorer if there is one, else the pickle
+        set_load_phase('classifier')
+        weights_file = os.path.join(model_path, config.get('model_weights_file', 'model_weights.json'))
         model_file = os.path.join(model_path, 'model.pkl')
-        if os.path.exists(model_file):
+        if os.path.exists(weights_file):
+            print("Loading exported model weights...")
+            model = LinearScorer.load(weights_file)
+            if model.feature_cols != feature_cols:
+                raise ValueError(f"Model weights expect features {model.feature_cols}, config has {feature_cols}.")
+            if config.get('verify_model_parity', False) and os.path.exists(model_file):
+                verify_model_parity(model, model_file)
+        elif os.path.exists(model_file):
             print("Loading saved model...")
             with open(model_file, 'rb') as f:
                 model = pickle.load(f)
@@ -219,134 +570,826 @@ def load_models():
             from sklearn.linear_model import LogisticRegression
             model = LogisticRegression(class_weight='balanced')
         
-        # Initialize feature extractor
-        feature_extractor = ArgumentFeatureExtractor(sentence_model)
+        # Micro-batch encode calls from concurrent requests. Off by default (encode_max_wait_ms
+        # 0): every encode call would wait up to encode_max_wait_ms for others to join, which
+        # only pays off when many requests encode at once. A few ms suits sustained concurrency.
+        encoder = sentence_model
+        encode_max_wait_ms = config.get('encode_max_wait_ms', 0)
+        if encode_max_wait_ms > 0:
+            encode_scheduler = EncodeScheduler(sentence_model, config.get('encode_max_batch_size', 64), encode_max_wait_ms,
+                                               encode_queue_wait_seconds, encode_batch_texts)
+            encoder = encode_scheduler
+        else:
+            encode_scheduler = None
+        
+        # Corpus term statistics (memory-mapped) for the 'tfidf_cosine' feature, if built
+        set_load_phase('term_index')
+        term_index_path = config.get('term_index_path', term_index_path)
+        if os.path.exists(os.path.join(term_index_path, TermIndex.METADATA_FILE)):
+            term_index = TermIndex.load(term_index_path, idf_update_documents=config.get('term_index_update_documents', 32))
+        else:
+            term_index = None
+        if 'tfidf_cosine' in feature_cols and term_index is None:
+            raise ValueError(f"Feature 'tfidf_cosine' needs a term index at {term_index_path}. Run build_term_index.py.")
+        
+        # Initialize feature extractor (TF-IDF is only computed when the model uses it)
+        feature_extractor = ArgumentFeatureExtractor(
+            encoder, embedding_cache, encoder_id(sentence_model_name, encoder_backend),
+            argument_encoding=config.get('argument_encoding', 'truncate'),
+            chunk_pooling=config.get('chunk_pooling', 'mean'),
+            max_chunks_per_argument=config.get('max_chunks_per_argument', 8),
+            term_index=term_index if 'tfidf_cosine' in feature_cols else None
+        )
+        
+        # Registered briefs, kept across reloads (re-profiled on use if the encoder changed).
+        # They live in a SQLite file shared by all server workers, so a brief registered through
+        # one worker can be linked through any other; an empty brief_store_path keeps them in
+        # this process's memory instead (only for single-process servers).
+        if brief_store is None:
+            brief_store_path = config.get('brief_store_path', os.path.join(model_path, 'brief_store.sqlite3'))
+            brief_store_max_briefs = config.get('brief_store_max_briefs', 256)
+            brief_store_max_bytes = config.get('brief_store_max_bytes', 256 * 1024 * 1024)
+            if brief_store_path:
+                brief_store = SharedBriefStore(brief_store_path, brief_store_max_briefs, brief_store_max_bytes,
+                                               on_evict=forget_brief_terms, on_load=remember_brief_terms)
+            else:
+                brief_store = BriefStore(brief_store_max_briefs, brief_store_max_bytes, on_evict=forget_brief_terms)
+        
+        # PDF extraction worker processes per server process (each gunicorn worker has its own pool)
+        pdf_extraction_workers = int(config.get('pdf_extraction_workers', 2))
+        if document_extractor.max_workers != pdf_extraction_workers:
+            document_extractor.shutdown()
+            document_extractor = DocumentExtractor(pdf_extraction_workers, cache=document_extractor.cache)
+        
+        # Size limits and deadlines for incoming requests
+        request_limits.update({key: config.get(key, value) for key, value in DEFAULT_REQUEST_LIMITS.items()})
+        
+        # Pair scores for incremental re-linking are only valid for these models
+        pair_score_cache = PairScoreCache(config.get('pair_score_cache_max_bytes', 32 * 1024 * 1024))
+        
+        # Load the corpus-wide counterargument index if one has been built
+        set_load_phase('counterargument_index')
+        counterargument_index_path = config.get('counterargument_index_path', counterargument_index_path)
+        counterargument_index = CounterArgumentIndex()
+        if os.path.exists(os.path.join(counterargument_index_path, CounterArgumentIndex.METADATA_FILE)):
+            print("Loading counterargument index...")
+            refresh_counterargument_index()
         
         print("Models and components loaded successfully")
         return True
     
     except Exception as e:
         print(f"Error loading models: {str(e)}")
+        model_loading['error'] = str(e)
         return False
 
+def verify_model_parity(scorer, model_file, tolerance=1e-9):
+    """Check the exported scorer against the pickled pipeline it came from (development aid)"""
+    from MatchingEngine.linearScorerService import parity_inputs
+    
+    with open(model_file, 'rb') as f:
+        pipeline = pickle.load(f)
+    error = scorer.parity_error(pipeline, parity_inputs(len(scorer.feature_cols)))
+    if error > tolerance:
+        raise ValueError(f"Exported model weights differ from {model_file} by {error:.3g}. Re-run export_model.py.")
+    print(f"Model weights match {model_file} (max abs error {error:.3g})")
+
+def score_feature_matrices(feature_matrices):
+    """
+    Classifier probabilities for a list of feature matrices, scored in one predict_proba call.
+    Returns one (M, N) probability matrix per feature matrix.
+    """
+    shapes = [feature_matrix['semantic_similarity'].shape for feature_matrix in feature_matrices]
+    
+    # Stack feature matrices into one (sum of M * N, n_features) array for prediction
+    X = np.concatenate([
+        np.stack([feature_matrix[col].ravel() for col in feature_cols], axis=1)
+        for feature_matrix in feature_matrices
+    ])
+    
+    pairs_scored.inc(len(X))
+    try:
+        with stage_timer.span('predict'):
+            y_proba = model.predict_proba(X)[:, 1]
+    except Exception as e:
+        # Fallback to using semantic similarity as proxy for probability
+        print(f"Error in prediction: {str(e)}. Using semantic similarity as fallback.")
+        prediction_fallbacks.inc()
+        y_proba = np.concatenate([feature_matrix['semantic_similarity'].ravel() for feature_matrix in feature_matrices])
+    
+    proba_matrices = []
+    offset = 0
+    for shape in shapes:
+        size = shape[0] * shape[1]
+        proba_matrices.append(y_proba[offset:offset + size].reshape(shape))
+        offset += size
+    
+    return proba_matrices
+
+def select_links(moving_args, response_args, proba_matrix, threshold, max_links, assignment='topk', moving_offset=0):
+    """
+    Turn a (M, N) probability matrix into the ranked, thresholded list of links.
+    moving_offset is added to moving_idx when the matrix holds a block of rows of a larger brief.
+    """
+    with stage_timer.span('select_links'):
+        moving_idx, response_idx = select_link_indices(proba_matrix, threshold, max_links, assignment)
+        
+        return [{
+            'moving_idx': int(m_idx) + moving_offset,
+            'moving_heading': moving_args[m_idx]['heading'],
+            'response_idx': int(r_idx),
+            'response_heading': response_args[r_idx]['heading'],
+            'confidence': float(proba_matrix[m_idx, r_idx])
+        } for m_idx, r_idx in zip(moving_idx, response_idx)]
+
+def refresh_counterargument_index(lock=True):
+    """
+    Reload the counterargument index if a newer one was saved since this process loaded it
+    (by another gunicorn worker, or by build_counterargument_index.py). Takes the index's
+    shared lock for the reload unless lock is False (the caller holds the exclusive one).
+    """
+    global counterargument_index
+    if not counterargument_index.is_stale(counterargument_index_path):
+        return
+    if not lock:
+        counterargument_index = CounterArgumentIndex.load(counterargument_index_path)
+        return
+    with CounterArgumentIndex.locked(counterargument_index_path, exclusive=False):
+        counterargument_index = CounterArgumentIndex.load(counterargument_index_path)
+
+def index_briefs(briefs, sources=None, save=False):
+    """
+    Add every argument of the given briefs to the counterargument index; returns the number added.
+    Arguments are keyed by (brief_id, position). Briefs without a brief_id are told apart by
+    their entry in sources (e.g. the record's place in an archive), or else by a hash of their
+    arguments, so they don't collide with each other.
+    With save, the arguments are added to the latest saved index and it is saved again, all
+    under the index's exclusive lock, so concurrent adds from other workers aren't lost.
+    """
+    args = []
+    metadata = []
+    for i, brief in enumerate(briefs):
+        brief_arguments = brief.get('brief_arguments', [])
+        source = None
+        if brief.get('brief_id') is None:
+            hashes = ''.join(argument_hash(arg) for arg in brief_arguments)
+            source = sources[i] if sources is not None else hashlib.sha1(hashes.encode('utf-8')).hexdigest()[:16]
+        for position, arg in enumerate(brief_arguments):
+            args.append(arg)
+            meta = {
+                'brief_id': brief.get('brief_id'),
+                'position': position,
+                'heading': arg['heading'],
+                'content': arg['content']
+            }
+            if source is not None:
+                meta['source'] = source
+            metadata.append(meta)
+    if not args:
+        return 0
+    
+    embeddings = feature_extractor.get_argument_embeddings(args)
+    if save:
+        with CounterArgumentIndex.locked(counterargument_index_path):
+            refresh_counterargument_index(lock=False)
+            added = counterargument_index.add(embeddings, metadata)
+            if added:
+                counterargument_index.save(counterargument_index_path)
+    else:
+        added = counterargument_index.add(embeddings, metadata)
+    if added < len(args):
+        print(f"Warning: skipped {len(args) - added} arguments already in the counterargument index")
+    return added
+
+def register_brief(brief_id, arguments):
+    """Embed and profile a brief's arguments once and keep them in the brief store"""
+    argument_embeddings, heading_embeddings, profiles = feature_extractor.profile_arguments(arguments)
+    
+    # Registered briefs count towards the term statistics (applied to the IDF weights in
+    # batches; cached pair scores are keyed on the IDF version, see pair_score_version)
+    if feature_extractor.term_index is not None:
+        feature_extractor.term_index.add_documents(brief_id, [arg['content'] for arg in arguments])
+    brief = RegisteredBrief(brief_id, arguments, argument_embeddings, heading_embeddings,
+                            profiles, feature_extractor.model_name)
+    try:
+        replaced = brief_store.put(brief)
+    except ValueError:
+        # Not stored: restore the term counts of the registration it would have replaced
+        previous = brief_store.peek(brief_id)
+        if previous is None:
+            forget_brief_terms(brief)
+        else:
+            remember_brief_terms(previous)
+        raise
+    return brief, replaced
+
+def remember_brief_terms(brief):
+    """Count a brief's arguments towards the term statistics (e.g. one registered through another worker)"""
+    if feature_extractor is not None and feature_extractor.term_index is not None:
+        feature_extractor.term_index.add_documents(brief.brief_id, [arg['content'] for arg in brief.arguments])
+
+def forget_brief_terms(brief):
+    """Take a deleted or evicted brief's arguments out of the term statistics"""
+    if feature_extractor is not None and feature_extractor.term_index is not None:
+        feature_extractor.term_index.remove_documents(brief.brief_id)
+
+def pair_score_version():
+    """
+    Part of every pair score cache key: scores with the TF-IDF feature depend on the IDF
+    weights, so each batch of registered-brief term updates starts a new set of keys
+    """
+    if feature_extractor is None or feature_extractor.term_index is None:
+        return 0
+    return feature_extractor.term_index.idf_version
+
+def get_registered_brief(brief_id):
+    """
+    A registered brief, re-profiled first if it was embedded by a different encoder
+    or lacks the term counts the current feature extractor needs
+    """
+    brief = brief_store.get(brief_id)
+    if brief is None:
+        return None
+    missing_terms = feature_extractor.term_index is not None and any(p.term_counts is None for p in brief.profiles)
+    if brief.model_name != feature_extractor.model_name or missing_terms:
+        brief, _ = register_brief(brief_id, brief.arguments)
+    return brief
+
+def requested_brief_id(data, side):
+    """
+    brief_id of the registered brief requested for one side of a link request ('<side>_brief_id',
+    or a '<side>_brief' with a 'brief_id' but no 'brief_arguments'), or None for an inline brief
+    """
+    if data.get(f'{side}_brief_id') is not None:
+        return str(data[f'{side}_brief_id'])
+    brief = data.get(f'{side}_brief')
+    if isinstance(brief, dict) and 'brief_arguments' not in brief and brief.get('brief_id') is not None:
+        return str(brief['brief_id'])
+    return None
+
+def profiled_feature_matrix(moving, response):
+    """
+    Feature matrix for a pair where each side is a RegisteredBrief or a list of arguments.
+    Registered sides reuse their stored embeddings and profiles, so only the rest is computed.
+    """
+    def profile(side):
+        if isinstance(side, RegisteredBrief):
+            return side.argument_embeddings, side.heading_embeddings, side.profiles
+        return feature_extractor.profile_arguments(side)
+    
+    moving_embeddings, moving_heading_embeddings, moving_profiles = profile(moving)
+    response_embeddings, response_heading_embeddings, response_profiles = profile(response)
+    with stage_timer.span('feature_matrix'):
+        return feature_extractor.build_feature_matrix(
+            moving_embeddings, response_embeddings,
+            moving_heading_embeddings, response_heading_embeddings,
+            moving_profiles, response_profiles
+        )
+
+def side_profile(side, indices):
+    """Embeddings and text profiles of the arguments at indices of a RegisteredBrief or argument list"""
+    if isinstance(side, RegisteredBrief):
+        return (side.argument_embeddings[indices], side.heading_embeddings[indices],
+                [side.profiles[i] for i in indices])
+    return feature_extractor.profile_arguments([side[i] for i in indices])
+
+def relink_proba_matrix(moving, response, moving_hashes, response_hashes, previous_hashes, deadline=None):
+    """
+    Probability matrix for a pair of briefs (RegisteredBrief or argument list per side) that
+    reuses cached pair scores for arguments whose content hash is in previous_hashes.
+    Only rows and columns with new hashes (or whose scores were evicted) are featurized and
+    scored, so an edit costs O(changed x N) instead of O(M x N).
+    Returns the matrix and a dict of changed rows / columns and recomputed / reused pair counts.
+    Raises DeadlineExceeded between featurizing steps once the deadline has passed.
+    """
+    previous_moving = set(previous_hashes.get('moving') or [])
+    previous_response = set(previous_hashes.get('response') or [])
+    changed_rows = [i for i, h in enumerate(moving_hashes) if h not in previous_moving]
+    changed_columns = [j for j, h in enumerate(response_hashes) if h not in previous_response]
+    
+    proba_matrix = np.full((len(moving_hashes), len(response_hashes)), np.nan)
+    unchanged_rows = [i for i, h in enumerate(moving_hashes) if h in previous_moving]
+    unchanged_columns = [j for j, h in enumerate(response_hashes) if h in previous_response]
+    version = pair_score_version()
+    if unchanged_rows and unchanged_columns:
+        cached = pair_score_cache.get_many(
+            [(moving_hashes[i], response_hashes[j], version) for i in unchanged_rows for j in unchanged_columns]
+        )
+        proba_matrix[np.ix_(unchanged_rows, unchanged_columns)] = np.array(
+            [np.nan if value is None else value for value in cached]
+        ).reshape(len(unchanged_rows), len(unchanged_columns))
+    
+    # Whole rows for new arguments (and rows missing cached scores), then new columns for the rest
+    missing_rows = np.isnan(proba_matrix[:, unchanged_columns]).any(axis=1) if unchanged_columns else np.zeros(len(moving_hashes), dtype=bool)
+    full_rows = sorted(set(changed_rows) | set(np.flatnonzero(missing_rows).tolist()))
+    full_row_set = set(full_rows)
+    other_rows = [i for i in range(len(moving_hashes)) if i not in full_row_set]
+    blocks = []
+    if full_rows:
+        blocks.append((full_rows, list(range(len(response_hashes)))))
+    if other_rows and changed_columns:
+        blocks.append((other_rows, changed_columns))
+    
+    if blocks:
+        rows_needed = sorted(set(i for rows, _ in blocks for i in rows))
+        columns_needed = sorted(set(j for _, columns in blocks for j in columns))
+        moving_profile = side_profile(moving, rows_needed)
+        check_deadline(deadline)
+        response_profile = side_profile(response, columns_needed)
+        row_positions = {i: k for k, i in enumerate(rows_needed)}
+        column_positions = {j: k for k, j in enumerate(columns_needed)}
+        
+        def take(profile, positions):
+            embeddings, heading_embeddings, profiles = profile
+            return embeddings[positions], heading_embeddings[positions], [profiles[k] for k in positions]
+        
+        feature_matrices = []
+        for rows, columns in blocks:
+            check_deadline(deadline)
+            moving_embeddings, moving_heading_embeddings, moving_profiles = take(moving_profile, [row_positions[i] for i in rows])
+            response_embeddings, response_heading_embeddings, response_profiles = take(response_profile, [column_positions[j] for j in columns])
+            with stage_timer.span('feature_matrix'):
+                feature_matrices.append(feature_extractor.build_feature_matrix(
+                    moving_embeddings, response_embeddings,
+                    moving_heading_embeddings, response_heading_embeddings,
+                    moving_profiles, response_profiles
+                ))
+        
+        for (rows, columns), block in zip(blocks, score_feature_matrices(feature_matrices)):
+            proba_matrix[np.ix_(rows, columns)] = block
+            pair_score_cache.put_many(
+                ((moving_hashes[i], response_hashes[j], version), block[a, b])
+                for a, i in enumerate(rows) for b, j in enumerate(columns)
+            )
+    
+    recomputed_pairs = sum(len(rows) * len(columns) for rows, columns in blocks)
+    return proba_matrix, {
+        'moving_idx': changed_rows,
+        'response_idx': changed_columns,
+        'recomputed_pairs': recomputed_pairs,
+        'reused_pairs': proba_matrix.size - recomputed_pairs
+    }
+
+STREAM_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'sse': 'text/event-stream'
+}
+
+def format_stream_record(record, stream_format):
+    """Serialize one streamed record as an NDJSON line or a server-sent event"""
+    if stream_format == 'sse':
+        return f"event: {record['type']}\ndata: {json.dumps(record)}\n\n"
+    return json.dumps(record) + "\n"
+
+def iter_link_rows(moving_args, response_args, threshold, max_links, assignment, registered=None,
+                   deadline=None):
+    """
+    Yield one record per moving argument with its ranked links, as soon as its row is scored,
+    then a summary record. 'optimal' assignment needs the whole matrix before any row is final;
+    registered briefs (registered: (moving, response) sides, RegisteredBrief or argument list)
+    are scored whole as well.
+    Rows are streamed until the deadline passes; then a 'timeout' record replaces the rest
+    and the summary is marked partial. An optimal assignment that misses the deadline
+    streams no rows.
+    """
+    total_links = 0
+    rows_sent = len(moving_args)
+    
+    if assignment == 'optimal' or registered is not None:
+        moving, response = registered or (moving_args, response_args)
+        if deadline is not None:
+            proba_matrix = score_rows_until(moving, response, deadline, request_limits['deadline_block_rows'])
+        elif registered is not None:
+            proba_matrix = score_feature_matrices([profiled_feature_matrix(moving, response)])[0]
+        else:
+            proba_matrix = score_feature_matrices([feature_extractor.extract_feature_matrix(moving_args, response_args)])[0]
+        rows_sent = len(proba_matrix) if assignment == 'topk' or len(proba_matrix) == len(moving_args) else 0
+        links = select_links(moving_args, response_args, proba_matrix, threshold, max_links, assignment) if rows_sent else []
+        for m_idx, moving_arg in enumerate(moving_args[:rows_sent]):
+            row_links = [link for link in links if link['moving_idx'] == m_idx]
+            total_links += len(row_links)
+            yield {'type': 'row', 'moving_idx': m_idx, 'moving_heading': moving_arg['heading'], 'links': row_links}
+        if rows_sent < len(moving_args):
+            requests_shed.inc(reason='partial' if rows_sent else 'deadline')
+            yield {'type': 'timeout', 'error': "Request deadline exceeded; remaining rows were not scored.",
+                   'rows_scored': rows_sent}
+    else:
+        for rows, feature_block in feature_extractor.iter_feature_rows(moving_args, response_args):
+            proba_block = score_feature_matrices([feature_block])[0]
+            for i, m_idx in enumerate(range(rows.start, rows.stop)):
+                row_links = select_links(moving_args[m_idx:m_idx + 1], response_args, proba_block[i:i + 1],
+                                         threshold, max_links, assignment, moving_offset=m_idx)
+                total_links += len(row_links)
+                yield {'type': 'row', 'moving_idx': m_idx, 'moving_heading': moving_args[m_idx]['heading'], 'links': row_links}
+            if rows.stop < len(moving_args) and deadline_passed(deadline):
+                rows_sent = rows.stop
+                requests_shed.inc(reason='partial')
+                yield {'type': 'timeout', 'error': "Request deadline exceeded; remaining rows were not scored.",
+                       'rows_scored': rows_sent}
+                break
+    
+    yield {
+        'type': 'summary',
+        'rows': rows_sent,
+        'total_links': total_links,
+        'model_info': {
+            'threshold': threshold,
+            'max_links_per_arg': max_links,
+            'assignment': assignment
+        }
+    }
+
+def stream_link_response(moving_args, response_args, threshold, max_links, assignment, stream_format,
+                         registered=None, deadline=None):
+    """Streaming Response for /api/link-arguments"""
+    def generate():
+        try:
+            for record in iter_link_rows(moving_args, response_args, threshold, max_links, assignment, registered,
+                                         deadline):
+                yield format_stream_record(record, stream_format)
+        except Exception as e:
+            yield format_stream_record({'type': 'error', 'error': str(e)}, stream_format)
+    
+    # Rows are computed after the view returns, so in async mode each one goes to the executor too
+    body = generate() if compute_executor is None else compute_executor.iterate(generate())
+    return Response(stream_with_context(body), mimetype=STREAM_MIMETYPES[stream_format])
+
+def configure_serving(mode=None, max_concurrency=None, max_queue=None):
+    """
+    Select the serving mode ('sync' or 'async', default from SERVING_MODE) and, for async, the
+    number of compute jobs run at once per process (default from COMPUTE_CONCURRENCY, else 2)
+    and how many may wait for a slot before requests are shed with 429 (COMPUTE_MAX_QUEUE, else 8).
+    In async mode the model-backed endpoints hand their work to a bounded ComputeExecutor while
+    the request threads (gunicorn gthread workers, see gunicorn.conf.py) keep answering health,
+    readiness, metrics and extraction requests.
+    """
+    global serving_mode, compute_executor
+    
+    mode = mode or os.environ.get('SERVING_MODE', 'sync')
+    if mode not in SERVING_MODES:
+        raise ValueError(f"Unknown serving mode '{mode}'. Expected one of {SERVING_MODES}.")
+    serving_mode = mode
+    if mode == 'async':
+        compute_executor = ComputeExecutor(max_concurrency or int(os.environ.get('COMPUTE_CONCURRENCY', 2)),
+                                           max_queue if max_queue is not None else int(os.environ.get('COMPUTE_MAX_QUEUE', 8)))
+    else:
+        compute_executor = None
+    return compute_executor
+
+def offload(view):
+    """Run a model-backed view on the compute executor in async serving mode"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if compute_executor is None:
+            return view(*args, **kwargs)
+        try:
+            return compute_executor.run(view, *args, **kwargs)
+        except ComputeQueueFull as e:
+            # Shed load instead of queueing work that would miss its deadline anyway
+            requests_shed.inc(reason='queue_full')
+            response = jsonify({"error": str(e)})
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response, 429
+    return wrapper
+
+def content_bytes(arguments):
+    """UTF-8 size of the headings and contents of a list of arguments"""
+    return sum(len(str(arg.get('heading', '')).encode('utf-8')) + len(str(arg.get('content', '')).encode('utf-8'))
+               for arg in arguments if isinstance(arg, dict))
+
+def request_limit_error(brief_pairs, inline_bytes):
+    """Error message if (moving_args, response_args) pairs or inline_bytes exceed request_limits, or None"""
+    max_arguments = request_limits['max_arguments_per_brief']
+    max_pairs = request_limits['max_pairs_per_request']
+    max_bytes = request_limits['max_content_bytes']
+    for moving_args, response_args in brief_pairs:
+        if max_arguments and max(len(moving_args), len(response_args)) > max_arguments:
+            return f"Briefs may have at most {max_arguments} arguments."
+    pairs = sum(len(moving_args) * len(response_args) for moving_args, response_args in brief_pairs)
+    if max_pairs and pairs > max_pairs:
+        return f"Request has {pairs} argument pairs, more than the limit of {max_pairs}."
+    if max_bytes and inline_bytes > max_bytes:
+        return f"Request has {inline_bytes} bytes of argument text, more than the limit of {max_bytes}."
+    return None
+
+def link_request_error(data):
+    """
+    Error message if a /api/link-arguments body is not an object whose inline briefs are
+    objects with a list of arguments in 'brief_arguments', or None
+    """
+    if not isinstance(data, dict):
+        return "Invalid request format. JSON object required."
+    for side in ('moving', 'response'):
+        if requested_brief_id(data, side) is not None:
+            continue
+        brief = data.get(f'{side}_brief', {})
+        if not isinstance(brief, dict):
+            return "Invalid brief format. 'brief_arguments' field required."
+        # Empty or missing argument lists are reported by the view
+        if brief.get('brief_arguments'):
+            error = validate_brief_arguments(brief['brief_arguments'])
+            if error:
+                return error
+    return None
+
+def link_request_pairs(data):
+    """
+    (brief pairs, inline argument bytes) of a /api/link-arguments request. Registered briefs
+    count towards the pair limit only; their text was admitted when they were registered.
+    Raises ValueError for a malformed request.
+    """
+    error = link_request_error(data)
+    if error:
+        raise ValueError(error)
+    sides = []
+    inline_bytes = 0
+    for side in ('moving', 'response'):
+        brief_id = requested_brief_id(data, side)
+        if brief_id is not None:
+            brief = brief_store.peek(brief_id) if brief_store is not None else None
+            sides.append(brief.arguments if brief is not None else [])
+            continue
+        arguments = data.get(f'{side}_brief', {}).get('brief_arguments') or []
+        inline_bytes += content_bytes(arguments)
+        sides.append(arguments)
+    return [tuple(sides)], inline_bytes
+
+def batch_request_pairs(data):
+    """
+    (brief pairs, inline argument bytes) of a /api/link-arguments/batch request. Raises
+    ValueError unless the body is an object or a list; malformed pairs count as empty here
+    and get an error result from the view.
+    """
+    if not isinstance(data, (dict, list)):
+        raise ValueError("Invalid batch format. Non-empty 'brief_pairs' list required.")
+    brief_pairs = data if isinstance(data, list) else data.get('brief_pairs')
+    pairs = []
+    for pair in brief_pairs if isinstance(brief_pairs, list) else []:
+        briefs = [pair.get(side) if isinstance(pair, dict) else None for side in ('moving_brief', 'response_brief')]
+        sides = [brief.get('brief_arguments') if isinstance(brief, dict) else None for brief in briefs]
+        pairs.append(tuple(arguments if isinstance(arguments, list) else [] for arguments in sides))
+    return pairs, sum(content_bytes(arguments) for pair in pairs for arguments in pair)
+
+def admit(request_pairs):
+    """
+    Reject requests over the size limits with 413, and malformed ones with 400, before they
+    take a compute slot. request_pairs(data) returns the request's (brief pairs, inline
+    argument bytes), or raises ValueError if the request is malformed.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            data = request.get_json(silent=True)
+            if data is not None:
+                try:
+                    error = request_limit_error(*request_pairs(data))
+                except ValueError as e:
+                    return jsonify({"error": str(e)}), 400
+                if error:
+                    requests_shed.inc(reason='limits')
+                    return jsonify({"error": error}), 413
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def request_deadline(data):
+    """
+    perf_counter() time by which a request must be answered, or None without a deadline.
+    Raises ValueError if the request's 'deadline_ms' is not a non-negative number (0 means none).
+    """
+    requested = data.get('deadline_ms')
+    if requested is not None:
+        try:
+            if isinstance(requested, bool):
+                raise TypeError
+            requested = float(requested)
+        except (TypeError, ValueError):
+            requested = -1.0
+        if not 0 <= requested < float('inf'):
+            raise ValueError("'deadline_ms' must be a non-negative number of milliseconds.")
+    budgets = [float(ms) for ms in (request_limits['request_deadline_ms'], requested) if ms]
+    if not budgets:
+        return None
+    return g.request_started + min(budgets) / 1000.0
+
+def deadline_passed(deadline):
+    return deadline is not None and time.perf_counter() >= deadline
+
+def deadline_response():
+    """504 for a request whose deadline passed before any of its pairs were scored"""
+    requests_shed.inc(reason='deadline')
+    return jsonify({"error": "Request deadline exceeded before scoring finished.", "timed_out": True}), 504
+
+def score_rows_until(moving, response, deadline, block_rows):
+    """
+    Probability rows for blocks of block_rows moving arguments (each side a RegisteredBrief or
+    a list of arguments), stopping at the first block boundary after the deadline. Returns a
+    (scored rows, N) matrix; later rows are abandoned.
+    """
+    n_moving = len(moving.arguments) if isinstance(moving, RegisteredBrief) else len(moving)
+    n_response = len(response.arguments) if isinstance(response, RegisteredBrief) else len(response)
+    response_embeddings, response_heading_embeddings, response_profiles = side_profile(response, list(range(n_response)))
+    
+    blocks = []
+    for start in range(0, n_moving, block_rows):
+        moving_embeddings, moving_heading_embeddings, moving_profiles = side_profile(
+            moving, list(range(start, min(start + block_rows, n_moving))))
+        with stage_timer.span('feature_matrix'):
+            feature_block = feature_extractor.build_feature_matrix(
+                moving_embeddings, response_embeddings,
+                moving_heading_embeddings, response_heading_embeddings,
+                moving_profiles, response_profiles
+            )
+        blocks.append(score_feature_matrices([feature_block])[0])
+        if deadline_passed(deadline):
+            break
+    return np.vstack(blocks)
+
+class DeadlineExceeded(Exception):
+    """Raised at a block boundary once the deadline has passed for work that has no partial result"""
+
+def check_deadline(deadline):
+    if deadline_passed(deadline):
+        raise DeadlineExceeded()
+
+def format_timings(timings):
+    """Stage timings in milliseconds for the 'timings' block of a debug response"""
+    result = {stage: round(elapsed * 1000.0, 3) for stage, elapsed in timings.items()}
+    result['total'] = round((time.perf_counter() - g.request_started) * 1000.0, 3)
+    return result
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    # For streamed responses this is the time to the first byte
+    endpoint = request.endpoint or 'unknown'
+    if 'request_started' in g:
+        request_seconds.observe(time.perf_counter() - g.request_started, endpoint=endpoint)
+    requests_total.inc(endpoint=endpoint, status=response.status_code)
+    return response
+
 # API routes
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Simple health check endpoint"""
-    global model, feature_extractor, sentence_model
-    models_loaded = model is not None and feature_extractor is not None and sentence_model is not None
+    global embedding_cache, encode_scheduler, brief_store, pair_score_cache, term_index, compute_executor
     
     return jsonify({
         "status": "healthy", 
-        "models_loaded": models_loaded
+        "models_loaded": models_loaded(),
+        "model_loading": model_loading_status(),
+        "embedding_cache": embedding_cache.stats() if embedding_cache is not None else None,
+        "encode_scheduler": encode_scheduler.stats() if encode_scheduler is not None else None,
+        "document_cache": document_extractor.cache.stats(),
+        "brief_store": brief_store.stats() if brief_store is not None else None,
+        "pair_score_cache": pair_score_cache.stats() if pair_score_cache is not None else None,
+        "term_index": term_index.stats() if term_index is not None else None,
+        "serving_mode": serving_mode,
+        "compute_executor": compute_executor.stats() if compute_executor is not None else None,
+        "request_limits": request_limits
     })
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Counters and latency histograms in the Prometheus text format"""
+    return Response(metrics.render(), content_type=MetricsRegistry.CONTENT_TYPE)
+
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 200 only once models are loaded, so load balancers skip cold workers"""
+    if not models_loaded():
+        return jsonify({"ready": False, "model_loading": model_loading_status()}), 503
+    return jsonify({"ready": True})
+
+def parse_bool(value, default=True):
+    """Booleans from JSON values or multipart form strings"""
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() not in ('', '0', 'false', 'no', 'off')
+    return bool(value)
+
+def segment_source(source, segmenter, include_text=False):
+    """Segment a text or an iterable of text pieces; optionally also return the full text"""
+    if not include_text:
+        return list(segmenter.segment(source)), None
+    
+    pieces = []
+    def collect(chunks):
+        for chunk in ([chunks] if isinstance(chunks, str) else chunks):
+            pieces.append(chunk)
+            yield chunk
+    
+    arguments = list(segmenter.segment(collect(source)))
+    return arguments, ''.join(pieces)
+
 @app.route('/api/extract-arguments', methods=['POST'])
 def extract_arguments():
     """
     Extract arguments from text or documents
-    Input: JSON with 'moving_text' and 'response_text' fields
-    Output: JSON with extracted arguments from both texts
+    Input: JSON with 'moving_text' and 'response_text' fields, or a multipart form with
+           'moving_file' / 'response_file' uploads (PDF or TXT) and/or the text fields.
+           Optional 'outline_headings' (default true) recognizes numbered headings such as
+           "I.", "A." and "1."; 'include_text' returns the extracted text of each brief.
+    Output: JSON with extracted arguments from both texts, with character offsets
+            of each heading and content span in the source text
     """
     try:
-        data = request.json
-        
-        # Get text from request
-        moving_text = data.get('moving_text', '')
-        response_text = data.get('response_text', '')
-        
-        # Function to extract arguments from text
-        def extract_arguments_from_text(text):
-            # Split text into paragraphs
-            paragraphs = text.split('\n\n')
-            
-            arguments = []
-            current_heading = None
-            current_content = []
-            
-            for para in paragraphs:
-                # Skip empty paragraphs
-                if not para.strip():
-                    continue
-                    
-                # Check if paragraph looks like a heading:
-                # - All caps
-                # - Short (less than 100 chars)
-                # - Ends with period but doesn't have many periods
-                is_heading = (para.isupper() or 
-                             (len(para) < 100 and para.count('.') <= 1) or
-                             (para.endswith('.') and para.count('.') == 1))
-                
-                if is_heading:
-                    # If we have a previous heading and content, save it
-                    if current_heading and current_content:
-                        arguments.append({
-                            "heading": current_heading,
-                            "content": '\n\n'.join(current_content)
-                        })
-                        
-                    # Start new argument
-                    current_heading = para
-                    current_content = []
+        # Multipart uploads are extracted server-side; PDF pages stream into segmentation
+        if request.files or request.form:
+            data = request.form
+            sources = {}
+            for side in ('moving', 'response'):
+                upload = request.files.get(f'{side}_file')
+                if upload is not None:
+                    sources[side] = document_extractor.iter_text(upload.read(), upload.filename or '')
                 else:
-                    # Add paragraph to current content
-                    if current_heading:
-                        current_content.append(para)
-                    else:
-                        # If no heading yet, treat this as a heading
-                        current_heading = para
+                    sources[side] = data.get(f'{side}_text', '')
+        else:
+            data = request.json
             
-            # Add the last argument if there is one
-            if current_heading and current_content:
-                arguments.append({
-                    "heading": current_heading,
-                    "content": '\n\n'.join(current_content)
-                })
-                
-            return arguments
+            # Get text from request
+            sources = {
+                'moving': data.get('moving_text', ''),
+                'response': data.get('response_text', '')
+            }
+        
+        include_text = parse_bool(data.get('include_text'), default=False)
+        segmenter = ArgumentSegmenter(outline_headings=parse_bool(data.get('outline_headings')))
         
         # Extract arguments from both texts
-        moving_arguments = extract_arguments_from_text(moving_text)
-        response_arguments = extract_arguments_from_text(response_text)
-        
-        return jsonify({
-            "moving_brief": {
-                "brief_id": "moving_brief",
-                "brief_arguments": moving_arguments
-            },
-            "response_brief": {
-                "brief_id": "response_brief",
-                "brief_arguments": response_arguments
+        result = {}
+        for side in ('moving', 'response'):
+            arguments, text = segment_source(sources[side], segmenter, include_text)
+            result[f'{side}_brief'] = {
+                "brief_id": f"{side}_brief",
+                "brief_arguments": arguments
             }
-        })
+            if include_text:
+                result[f'{side}_brief']['text'] = text
+        
+        return jsonify(result)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/link-arguments', methods=['POST'])
+@admit(link_request_pairs)
+@offload
 def link_arguments():
     """
     Link arguments between moving and response briefs
-    Input: JSON with moving_brief and response_brief objects
-    Output: JSON with linked argument pairs and confidence scores
+    Input: JSON with moving_brief and response_brief objects (or 'moving_brief_id' /
+           'response_brief_id' of briefs registered with PUT /api/briefs/<brief_id>),
+           optional 'threshold', 'max_links_per_arg', 'assignment' ('topk', or 'optimal'
+           for one-to-one links), 'stream' ('ndjson' or 'sse'), 'deadline_ms' and 'debug'.
+           For incremental re-linking send 'incremental': true on the first call, then the
+           returned 'argument_hashes' as 'previous_hashes' with the edited briefs.
+    Output: JSON with linked argument pairs and confidence scores (plus per-stage 'timings'
+            in milliseconds if 'debug' is set; 'argument_hashes' and 'changes' in incremental
+            mode); in streaming mode one record per moving argument as soon as its row is
+            scored, then a summary record. Requests over the size limits get 413, and 429 with
+            Retry-After when the compute queue is full. If the deadline passes, top-k results
+            hold the rows scored so far ('partial': true), otherwise 504.
     """
     try:
         # Check if models are loaded
         global model, feature_extractor, sentence_model, feature_cols
-        if model is None or feature_extractor is None or sentence_model is None:
-            success = load_models()
-            if not success:
-                return jsonify({"error": "Failed to load models"}), 500
+        if not ensure_models_loaded():
+            return jsonify({"error": "Failed to load models"}), 500
         
         data = request.json
         
+        # Time spent waiting for a compute slot counts against the deadline
+        try:
+            deadline = request_deadline(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if deadline_passed(deadline):
+            return deadline_response()
+        
         # Get parameters
         threshold = float(data.get('threshold', 0.4))
         max_links = int(data.get('max_links_per_arg', 5))
+        assignment = data.get('assignment', 'topk')
+        if assignment not in ASSIGNMENT_MODES:
+            return jsonify({"error": f"Invalid assignment '{assignment}'. Expected one of {list(ASSIGNMENT_MODES)}."}), 400
+        
+        # Registered briefs are referenced by ID and already embedded and profiled
+        registered = {}
+        for side in ('moving', 'response'):
+            brief_id = requested_brief_id(data, side)
+            if brief_id is not None:
+                registered[side] = get_registered_brief(brief_id)
+                if registered[side] is None:
+                    return jsonify({"error": f"Brief '{brief_id}' is not registered."}), 404
         
         # Prepare briefs
-        moving_brief = data.get('moving_brief', {})
-        response_brief = data.get('response_brief', {})
+        moving_brief = {'brief_arguments': registered['moving'].arguments} if 'moving' in registered else data.get('moving_brief', {})
+        response_brief = {'brief_arguments': registered['response'].arguments} if 'response' in registered else data.get('response_brief', {})
         
         # Validate input
         if 'brief_arguments' not in moving_brief or 'brief_arguments' not in response_brief:
@@ -358,88 +1401,380 @@ def link_arguments():
         if not moving_args or not response_args:
             return jsonify({"error": "No arguments found in briefs."}), 400
         
-        # Extract features for all possible argument pairs
-        all_pairs = []
-        pair_details = []
+        # Streaming mode: 'stream' field, or an NDJSON / event-stream Accept header
+        stream_format = data.get('stream')
+        if stream_format is None:
+            accept = request.headers.get('Accept', '')
+            if 'application/x-ndjson' in accept:
+                stream_format = 'ndjson'
+            elif 'text/event-stream' in accept:
+                stream_format = 'sse'
+        if stream_format:
+            if stream_format not in STREAM_MIMETYPES:
+                return jsonify({"error": f"Invalid stream format '{stream_format}'. Expected one of {list(STREAM_MIMETYPES)}."}), 400
+            sides = (registered.get('moving', moving_args), registered.get('response', response_args)) if registered else None
+            return stream_link_response(moving_args, response_args, threshold, max_links, assignment, stream_format,
+                                        sides, deadline)
         
-        for m_idx, moving_arg in enumerate(moving_args):
-            for r_idx, response_arg in enumerate(response_args):
-                features = feature_extractor.extract_all_features(moving_arg, response_arg)
-                
-                # Store feature values for classification
-                feature_values = [features[col] for col in feature_cols]
-                all_pairs.append(feature_values)
-                
-                # Store details for each pair
-                pair_details.append({
-                    'moving_idx': m_idx,
-                    'moving_heading': moving_arg['heading'],
-                    'response_idx': r_idx,
-                    'response_heading': response_arg['heading'],
-                    'features': features
-                })
-        
-        # Make predictions if we have pairs
-        if not all_pairs:
-            return jsonify({"links": [], "error": "No argument pairs to analyze."}), 400
-            
-        # Convert to numpy array for prediction
-        X = np.array(all_pairs)
+        # Incremental mode: reuse scores of pairs whose argument hashes are in previous_hashes
+        previous_hashes = data.get('previous_hashes')
+        incremental = previous_hashes is not None or parse_bool(data.get('incremental'), default=False)
         
-        # Get probabilities for positive class
-        try:
-            y_proba = model.predict_proba(X)[:, 1]
-        except Exception as e:
-            # Fallback to using semantic similarity as proxy for probability
-            print(f"Error in prediction: {str(e)}. Using semantic similarity as fallback.")
-            y_proba = np.array([p['features']['semantic_similarity'] for p in pair_details])
-        
-        # Create links with probabilities
-        links_with_proba = []
-        for i, p in enumerate(pair_details):
-            links_with_proba.append({
-                'moving_heading': p['moving_heading'],
-                'response_heading': p['response_heading'],
-                'probability': float(y_proba[i])
-            })
-        
-        # Sort by probability in descending order
-        links_with_proba.sort(key=lambda x: x['probability'], reverse=True)
-        
-        # Filter by threshold
-        links_with_proba = [link for link in links_with_proba if link['probability'] >= threshold]
-        
-        # Post-processing: limit number of response arguments per moving argument
-        final_links = []
-        links_count = {}
-        
-        for link in links_with_proba:
-            moving_heading = link['moving_heading']
-            
-            # Skip if we've already assigned max_links response arguments to this moving argument
-            if moving_heading in links_count and links_count[moving_heading] >= max_links:
-                continue
+        with stage_timer.collect() as timings:
+            if incremental:
+                moving_hashes = [argument_hash(arg) for arg in moving_args]
+                response_hashes = [argument_hash(arg) for arg in response_args]
+                proba_matrix, changes = relink_proba_matrix(
+                    registered.get('moving', moving_args), registered.get('response', response_args),
+                    moving_hashes, response_hashes, previous_hashes or {}, deadline
+                )
+            elif deadline is not None:
+                # Score row blocks until the deadline: top-k rows are final on their own,
+                # while one-to-one links need every row, so those give up with 504
+                proba_matrix = score_rows_until(registered.get('moving', moving_args),
+                                                registered.get('response', response_args),
+                                                deadline, request_limits['deadline_block_rows'])
+                if len(proba_matrix) < len(moving_args) and assignment == 'optimal':
+                    raise DeadlineExceeded()
+            else:
+                # Extract features for all possible argument pairs as (M, N) matrices
+                if registered:
+                    feature_matrix = profiled_feature_matrix(registered.get('moving', moving_args),
+                                                             registered.get('response', response_args))
+                else:
+                    feature_matrix = feature_extractor.extract_feature_matrix(moving_args, response_args)
                 
-            # Add to final links
-            final_links.append({
-                'moving_heading': link['moving_heading'],
-                'response_heading': link['response_heading'],
-                'confidence': link['probability']
-            })
+                # Get probabilities for positive class
+                proba_matrix = score_feature_matrices([feature_matrix])[0]
             
-            # Update counter
-            if moving_heading not in links_count:
-                links_count[moving_heading] = 1
-            else:
-                links_count[moving_heading] += 1
+            final_links = select_links(moving_args, response_args, proba_matrix, threshold, max_links, assignment)
         
-        return jsonify({
+        result = {
             'links': final_links,
             'model_info': {
                 'threshold': threshold,
-                'max_links_per_arg': max_links
+                'max_links_per_arg': max_links,
+                'assignment': assignment
             }
-        })
+        }
+        if len(proba_matrix) < len(moving_args):
+            requests_shed.inc(reason='partial')
+            result['partial'] = True
+            result['scored_moving_args'] = len(proba_matrix)
+        if incremental:
+            # Links touching a changed argument, and the hashes to send with the next edit
+            changed_rows, changed_columns = set(changes['moving_idx']), set(changes['response_idx'])
+            changes['changed_links'] = [link for link in final_links
+                                        if link['moving_idx'] in changed_rows or link['response_idx'] in changed_columns]
+            result['changes'] = changes
+            result['argument_hashes'] = {'moving': moving_hashes, 'response': response_hashes}
+        if parse_bool(data.get('debug'), default=False):
+            result['timings'] = format_timings(timings)
+        
+        return jsonify(result)
+    
+    except DeadlineExceeded:
+        return deadline_response()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/link-arguments/batch', methods=['POST'])
+@admit(batch_request_pairs)
+@offload
+def link_arguments_batch():
+    """
+    Link arguments for many brief pairs in one call
+    Input: JSON with 'brief_pairs', a list of objects shaped like the entries of
+           DataSource/stanford_hackathon_brief_pairs.json (moving_brief, response_brief and
+           optional per-pair threshold / max_links_per_arg / assignment), plus optional default
+           'threshold', 'max_links_per_arg' and 'assignment'. A bare list of pairs is also accepted.
+           Optional 'debug' adds per-stage 'timings' in milliseconds; 'deadline_ms' bounds the batch.
+    Output: JSON with 'results', a list aligned with 'brief_pairs'; each entry has the pair's
+            'brief_id' and 'response_brief_id' and either 'links' or an 'error'. If the deadline
+            passes, pairs scored so far keep their links, the rest get 'timed_out': true and the
+            response is marked 'partial' (504 if no pair was scored)
+    """
+    try:
+        # Check if models are loaded
+        global model, feature_extractor, sentence_model, feature_cols
+        if not ensure_models_loaded():
+            return jsonify({"error": "Failed to load models"}), 500
+        
+        data = request.json
+        if isinstance(data, list):
+            data = {'brief_pairs': data}
+        try:
+            deadline = request_deadline(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if deadline_passed(deadline):
+            return deadline_response()
+        
+        brief_pairs = data.get('brief_pairs')
+        if not isinstance(brief_pairs, list) or not brief_pairs:
+            return jsonify({"error": "Invalid batch format. Non-empty 'brief_pairs' list required."}), 400
+        
+        # Default parameters, overridable per pair
+        default_threshold = float(data.get('threshold', 0.4))
+        default_max_links = int(data.get('max_links_per_arg', 5))
+        default_assignment = data.get('assignment', 'topk')
+        
+        # One result per entry of brief_pairs, in order; invalid pairs get an error entry
+        # instead of failing the whole batch
+        results = []
+        valid_pairs = []
+        for pair in brief_pairs:
+            if not isinstance(pair, dict):
+                results.append({"error": "Invalid pair format. Object with 'moving_brief' and 'response_brief' required."})
+                continue
+            moving_brief = pair.get('moving_brief') or {}
+            response_brief = pair.get('response_brief') or {}
+            if not isinstance(moving_brief, dict) or not isinstance(response_brief, dict):
+                results.append({"error": "Invalid brief format. 'brief_arguments' field required."})
+                continue
+            result = {
+                'brief_id': moving_brief.get('brief_id'),
+                'response_brief_id': response_brief.get('brief_id')
+            }
+            results.append(result)
+            
+            if 'brief_arguments' not in moving_brief or 'brief_arguments' not in response_brief:
+                result['error'] = "Invalid brief format. 'brief_arguments' field required."
+                continue
+            if not moving_brief['brief_arguments'] or not response_brief['brief_arguments']:
+                result['error'] = "No arguments found in briefs."
+                continue
+            error = validate_brief_arguments(moving_brief['brief_arguments']) or \
+                validate_brief_arguments(response_brief['brief_arguments'])
+            if error:
+                result['error'] = error
+                continue
+            assignment = pair.get('assignment', default_assignment)
+            if assignment not in ASSIGNMENT_MODES:
+                result['error'] = f"Invalid assignment '{assignment}'. Expected one of {list(ASSIGNMENT_MODES)}."
+                continue
+            try:
+                threshold = float(pair.get('threshold', default_threshold))
+                max_links = int(pair.get('max_links_per_arg', default_max_links))
+            except (TypeError, ValueError):
+                result['error'] = "'threshold' and 'max_links_per_arg' must be numbers."
+                continue
+            
+            valid_pairs.append((
+                result,
+                moving_brief['brief_arguments'],
+                response_brief['brief_arguments'],
+                threshold,
+                max_links,
+                assignment
+            ))
+        
+        # Without a deadline every pair is encoded in a few large batches and scored in one
+        # call; with one, pairs go in blocks so the deadline is checked between blocks and pairs
+        if deadline is None:
+            blocks = [valid_pairs] if valid_pairs else []
+        else:
+            block_pairs = max(int(request_limits['deadline_block_pairs']), 1)
+            blocks = [valid_pairs[i:i + block_pairs] for i in range(0, len(valid_pairs), block_pairs)]
+        
+        scored = 0
+        with stage_timer.collect() as timings:
+            for block in blocks:
+                if scored and deadline_passed(deadline):
+                    break
+                feature_matrices = feature_extractor.extract_feature_matrices(
+                    [(moving_args, response_args) for _, moving_args, response_args, _, _, _ in block],
+                    stop=lambda: deadline_passed(deadline)
+                )
+                proba_matrices = score_feature_matrices(feature_matrices) if feature_matrices else []
+                
+                for (result, moving_args, response_args, threshold, max_links, assignment), proba_matrix in zip(block, proba_matrices):
+                    result.update({
+                        'links': select_links(moving_args, response_args, proba_matrix, threshold, max_links, assignment),
+                        'model_info': {
+                            'threshold': threshold,
+                            'max_links_per_arg': max_links,
+                            'assignment': assignment
+                        }
+                    })
+                scored += len(proba_matrices)
+                if len(proba_matrices) < len(block):
+                    break
+        
+        if scored < len(valid_pairs):
+            if not scored:
+                return deadline_response()
+            # Pairs that were not reached keep their IDs and say why they have no links
+            requests_shed.inc(reason='partial')
+            for result, *_ in valid_pairs[scored:]:
+                result.update({"error": "Request deadline exceeded before this pair was scored.", "timed_out": True})
+        
+        response = {'results': results}
+        if scored < len(valid_pairs):
+            response['partial'] = True
+        if parse_bool(data.get('debug'), default=False):
+            response['timings'] = format_timings(timings)
+        
+        return jsonify(response)
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def validate_brief_arguments(arguments):
+    """Error message for a malformed 'brief_arguments' list, or None"""
+    if not isinstance(arguments, list) or not arguments:
+        return "Non-empty 'brief_arguments' list required."
+    for arg in arguments:
+        if not isinstance(arg, dict) or not isinstance(arg.get('heading'), str) or not isinstance(arg.get('content'), str):
+            return "Each argument needs string 'heading' and 'content' fields."
+    return None
+
+@app.route('/api/briefs/<brief_id>', methods=['PUT'])
+@offload
+def put_brief(brief_id):
+    """
+    Register a brief so later link requests can reference it by ID
+    Input: JSON with 'brief_arguments', or with 'text' (and optional 'outline_headings') to
+           segment server-side; or a multipart form with a 'file' upload (PDF or TXT)
+    Output: JSON summary of the registered brief; 201 if new, 200 if it replaced one
+    """
+    try:
+        global brief_store
+        if not ensure_models_loaded():
+            return jsonify({"error": "Failed to load models"}), 500
+        
+        if request.files or request.form:
+            data = request.form
+            upload = request.files.get('file')
+            source = document_extractor.iter_text(upload.read(), upload.filename or '') if upload is not None else data.get('text', '')
+        else:
+            data = request.json or {}
+            source = data.get('text')
+        
+        # Segment text once here instead of on every link request
+        if 'brief_arguments' in data:
+            arguments = data['brief_arguments']
+        else:
+            segmenter = ArgumentSegmenter(outline_headings=parse_bool(data.get('outline_headings')))
+            arguments, _ = segment_source(source or '', segmenter)
+        
+        error = validate_brief_arguments(arguments)
+        if error:
+            return jsonify({"error": error}), 400
+        error = request_limit_error([(arguments, [])], content_bytes(arguments))
+        if error:
+            requests_shed.inc(reason='limits')
+            return jsonify({"error": error}), 413
+        
+        try:
+            brief, replaced = register_brief(brief_id, arguments)
+        except ValueError as e:
+            # Larger than the whole store budget
+            return jsonify({"error": str(e)}), 413
+        return jsonify(dict(brief.summary(), replaced=replaced)), 200 if replaced else 201
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/briefs/<brief_id>', methods=['GET'])
+def get_brief(brief_id):
+    """Summary and arguments of a registered brief"""
+    brief = brief_store.get(brief_id) if brief_store is not None else None
+    if brief is None:
+        return jsonify({"error": f"Brief '{brief_id}' is not registered."}), 404
+    return jsonify(dict(brief.summary(), brief_arguments=brief.arguments))
+
+@app.route('/api/briefs/<brief_id>', methods=['DELETE'])
+def delete_brief(brief_id):
+    """Remove a registered brief"""
+    brief = brief_store.peek(brief_id) if brief_store is not None else None
+    if brief is None or not brief_store.delete(brief_id):
+        return jsonify({"error": f"Brief '{brief_id}' is not registered."}), 404
+    forget_brief_terms(brief)
+    return jsonify({"brief_id": brief_id, "deleted": True})
+
+@app.route('/api/search-counterarguments', methods=['POST'])
+@offload
+def search_counterarguments():
+    """
+    Find response arguments anywhere in the indexed archive that rebut a moving argument
+    Input: JSON with 'argument' ({heading, content}) and optional 'top_k', 'n_probe', 'num_candidates'
+    Output: JSON with the top_k candidates, rescored by the classifier
+    """
+    try:
+        # Check if models are loaded
+        global model, feature_extractor, sentence_model, counterargument_index
+        if not ensure_models_loaded():
+            return jsonify({"error": "Failed to load models"}), 500
+        
+        data = request.json
+        argument = data.get('argument', {})
+        if 'heading' not in argument or 'content' not in argument:
+            return jsonify({"error": "Invalid argument format. 'heading' and 'content' fields required."}), 400
+        
+        top_k = int(data.get('top_k', 10))
+        n_probe = int(data.get('n_probe', 8))
+        num_candidates = max(top_k, int(data.get('num_candidates', top_k * 5)))
+        
+        # Entries added by other workers become searchable once they are saved; a reload
+        # replaces the global, so the whole search uses one index object
+        refresh_counterargument_index()
+        index = counterargument_index
+        if len(index) == 0:
+            return jsonify({"results": [], "index_size": 0})
+        
+        # Approximate nearest neighbors on the argument embedding
+        query_embedding = feature_extractor.get_argument_embeddings([argument])
+        ids, scores = index.search(query_embedding[0], num_candidates, n_probe)
+        candidate_embeddings, candidates = index.get(ids)
+        
+        # Rescore the candidates with the full classifier features
+        feature_matrix = feature_extractor.build_feature_matrix(
+            query_embedding, candidate_embeddings,
+            feature_extractor.get_heading_embeddings([argument['heading']]),
+            feature_extractor.get_heading_embeddings([c['heading'] for c in candidates]),
+            [feature_extractor.get_text_profile(argument)],
+            [feature_extractor.get_text_profile(c) for c in candidates]
+        )
+        proba = score_feature_matrices([feature_matrix])[0][0]
+        
+        order = np.argsort(-proba, kind='stable')[:top_k]
+        results = [{
+            'brief_id': candidates[i]['brief_id'],
+            'position': candidates[i]['position'],
+            'heading': candidates[i]['heading'],
+            'confidence': float(proba[i]),
+            'semantic_similarity': float(scores[i])
+        } for i in order]
+        
+        return jsonify({"results": results, "index_size": len(index)})
+    
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/counterargument-index', methods=['POST'])
+@offload
+def add_to_counterargument_index():
+    """
+    Incrementally add briefs to the counterargument index and persist it
+    Input: JSON with 'briefs' (brief objects) and/or 'brief_pairs' (whose response briefs are indexed)
+    Output: JSON with the number of arguments added and the index size
+    """
+    try:
+        # Check if models are loaded
+        global model, feature_extractor, sentence_model, counterargument_index
+        if not ensure_models_loaded():
+            return jsonify({"error": "Failed to load models"}), 500
+        
+        data = request.json
+        briefs = list(data.get('briefs', []))
+        briefs.extend(pair['response_brief'] for pair in data.get('brief_pairs', []) if 'response_brief' in pair)
+        if not briefs:
+            return jsonify({"error": "No briefs to index. 'briefs' or 'brief_pairs' field required."}), 400
+        
+        added = index_briefs(briefs, save=True)
+        
+        return jsonify({"added": added, "index_size": len(counterargument_index)})
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -449,18 +1784,22 @@ def model_info():
     """Get information about the loaded model"""
     global model, feature_cols
     
+    # Report progress instead of blocking while a background load is running
+    if not models_loaded() and models_loading():
+        return jsonify({"error": "Models are still loading", "model_loading": model_loading_status()}), 503
+    
     # Check if models are loaded
-    if model is None:
-        success = load_models()
-        if not success:
-            return jsonify({"error": "Failed to load models"}), 500
+    if not ensure_models_loaded():
+        return jsonify({"error": "Failed to load models", "model_loading": model_loading_status()}), 500
     
     # Get model information
     model_type = type(model).__name__
     
     # Try to get feature importances if available
     feature_importance = None
-    if hasattr(model, 'named_steps') and hasattr(model.named_steps.get('classifier', None), 'coef_'):
+    if isinstance(model, LinearScorer):
+        feature_importance = {feature: float(coef) for feature, coef in zip(model.feature_cols, model.coef)}
+    elif hasattr(model, 'named_steps') and hasattr(model.named_steps.get('classifier', None), 'coef_'):
         feature_importance = {}
         coefs = model.named_steps['classifier'].coef_[0]
         for i, feature in enumerate(feature_cols):
@@ -473,12 +1812,15 @@ def model_info():
     
     return jsonify({
         'model_type': model_type,
+        'model_version': model.model_version if isinstance(model, LinearScorer) else None,
         'feature_cols': feature_cols,
-        'feature_importance': feature_importance
+        'feature_importance': feature_importance,
+        'model_loading': model_loading_status()
     })
 
 # Load models at startup
 if __name__ == '__main__':
-    # Attempt to load models when the app starts
-    load_models()
+    # Load models in the background so the server starts answering right away
+    configure_serving()
+    start_model_loading()
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,260 @@
+"""
+Offline argument linker over JSON / JSONL brief-pair corpora.
+
+Reads records shaped like the entries of DataSource/stanford_hackathon_brief_pairs.json
+(a JSON array or one record per line), links them across a process pool with one model
+load per worker, and appends one JSONL result per record as soon as its chunk finishes.
+The output file doubles as the checkpoint: rerunning the same command skips records
+that already have a result, so a killed job resumes where it stopped.
+
+Usage:
+    python batch_linker.py DataSource/stanford_hackathon_brief_pairs.json -o links.jsonl --workers 4
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, as_completed, wait
+
+import app
+from MatchingEngine.linkSelectionService import ASSIGNMENT_MODES
+
+# Whitespace and commas between the elements of a JSON array
+ELEMENT_SEPARATOR = re.compile(r'[\s,]*')
+
+
+def iter_records(path, chunk_size=1 << 20):
+    """Stream records from a JSON array or a JSONL file without loading the whole file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        # Peek at the first non-whitespace character to tell the formats apart
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        if not first:
+            return
+        if first != '[':
+            line = first + f.readline()
+            while line:
+                if line.strip():
+                    yield json.loads(line)
+                line = f.readline()
+            return
+
+        # Incrementally decode the elements of a top-level JSON array. position walks the
+        # buffer; the consumed prefix is dropped only when the next chunk is read, so small
+        # records don't copy the rest of the buffer each time.
+        decoder = json.JSONDecoder()
+        buffer = ''
+        position = 0
+        eof = False
+        while True:
+            position = ELEMENT_SEPARATOR.match(buffer, position).end()
+            if buffer.startswith(']', position):
+                return
+            try:
+                record, position_after = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    eof = True
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            yield record
+            position = position_after
+
+
+def record_key(record, index):
+    """
+    Stable key for a record, used to skip it on resume. The record's position is part of
+    it, so records that share a moving/response brief ID pair are still told apart.
+    """
+    briefs = [record.get(side) if isinstance(record, dict) else None for side in ('moving_brief', 'response_brief')]
+    moving_id, response_id = [brief.get('brief_id') if isinstance(brief, dict) else None for brief in briefs]
+    if moving_id is not None and response_id is not None:
+        return f"#{index}:{moving_id}:{response_id}"
+    return f"#{index}"
+
+
+def load_completed_keys(output_path):
+    """
+    Keys of records already written to output_path.
+    A trailing partial line left by a killed run is truncated away.
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+
+    good_size = 0
+    with open(output_path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                completed.add(json.loads(line)['key'])
+            except (ValueError, KeyError):
+                break
+            good_size += len(line)
+
+    if good_size != os.path.getsize(output_path):
+        with open(output_path, 'r+b') as f:
+            f.truncate(good_size)
+
+    return completed
+
+
+def init_worker():
+    """Load the models once per worker process (skipped if inherited from the parent)"""
+    if not app.ensure_models_loaded():
+        raise RuntimeError("Failed to load models")
+
+
+def link_records(chunk, threshold, max_links, assignment='topk'):
+    """
+    Link a chunk of (key, record) items; returns one result dict per record.
+    Malformed records get an 'error' result, checked as the batch endpoint checks its pairs,
+    so one bad record can't stop the run (or every resumed run after it).
+    """
+    results = []
+    valid = []
+    for key, record in chunk:
+        result = {'key': key}
+        results.append(result)
+        if not isinstance(record, dict):
+            result['error'] = "Invalid record format. Object with 'moving_brief' and 'response_brief' required."
+            continue
+
+        moving_brief = record.get('moving_brief') or {}
+        response_brief = record.get('response_brief') or {}
+        if not isinstance(moving_brief, dict) or not isinstance(response_brief, dict):
+            result['error'] = "Invalid brief format. 'brief_arguments' field required."
+            continue
+        result['brief_id'] = moving_brief.get('brief_id')
+        result['response_brief_id'] = response_brief.get('brief_id')
+
+        if 'brief_arguments' not in moving_brief or 'brief_arguments' not in response_brief:
+            result['error'] = "Invalid brief format. 'brief_arguments' field required."
+            continue
+        if not moving_brief['brief_arguments'] or not response_brief['brief_arguments']:
+            result['error'] = "No arguments found in briefs."
+            continue
+        error = app.validate_brief_arguments(moving_brief['brief_arguments']) or \
+            app.validate_brief_arguments(response_brief['brief_arguments'])
+        if error:
+            result['error'] = error
+            continue
+        record_assignment = record.get('assignment', assignment)
+        if record_assignment not in ASSIGNMENT_MODES:
+            result['error'] = f"Invalid assignment '{record_assignment}'. Expected one of {list(ASSIGNMENT_MODES)}."
+            continue
+        try:
+            record_threshold = float(record.get('threshold', threshold))
+            record_max_links = int(record.get('max_links_per_arg', max_links))
+        except (TypeError, ValueError):
+            result['error'] = "'threshold' and 'max_links_per_arg' must be numbers."
+            continue
+
+        valid.append((result, moving_brief['brief_arguments'], response_brief['brief_arguments'],
+                      record_threshold, record_max_links, record_assignment))
+
+    if valid:
+        feature_matrices = app.feature_extractor.extract_feature_matrices([
+            (moving_args, response_args) for _, moving_args, response_args, _, _, _ in valid
+        ])
+        proba_matrices = app.score_feature_matrices(feature_matrices)
+
+        for (result, moving_args, response_args, record_threshold, record_max_links, record_assignment), proba_matrix \
+                in zip(valid, proba_matrices):
+            result['links'] = app.select_links(
+                moving_args, response_args, proba_matrix, record_threshold, record_max_links, record_assignment
+            )
+            result['model_info'] = {
+                'threshold': record_threshold,
+                'max_links_per_arg': record_max_links,
+                'assignment': record_assignment
+            }
+
+    return results
+
+
+def iter_chunks(input_path, completed, batch_size):
+    """Group not-yet-completed records into chunks of batch_size"""
+    chunk = []
+    for index, record in enumerate(iter_records(input_path)):
+        key = record_key(record, index)
+        if key in completed:
+            continue
+        chunk.append((key, record))
+        if len(chunk) >= batch_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run(input_path, output_path, workers=1, batch_size=8, threshold=0.4, max_links=5, assignment='topk', log=print):
+    """Link every record of input_path into output_path, resuming from previous output"""
+    completed = load_completed_keys(output_path)
+    if completed:
+        log(f"Resuming: {len(completed)} records already linked")
+
+    chunks = iter_chunks(input_path, completed, batch_size)
+    written = 0
+    start = time.time()
+
+    with open(output_path, 'a', encoding='utf-8') as out:
+        def write_results(results):
+            nonlocal written
+            for result in results:
+                out.write(json.dumps(result) + '\n')
+            out.flush()
+            os.fsync(out.fileno())
+            written += len(results)
+            log(f"{written} records linked ({time.time() - start:.1f}s)")
+
+        if workers <= 1:
+            init_worker()
+            for chunk in chunks:
+                write_results(link_records(chunk, threshold, max_links, assignment))
+            return written
+
+        # Keep a bounded number of chunks in flight so huge inputs stream through
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+            pending = set()
+            for chunk in chunks:
+                pending.add(executor.submit(link_records, chunk, threshold, max_links, assignment))
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        write_results(future.result())
+            for future in as_completed(pending):
+                write_results(future.result())
+
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Link moving/response brief arguments offline")
+    parser.add_argument('input', help="JSON array or JSONL file of brief pairs")
+    parser.add_argument('-o', '--output', required=True, help="JSONL file to write (and resume from)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes, each loading the models once")
+    parser.add_argument('--batch-size', type=int, default=8, help="Brief pairs per worker task")
+    parser.add_argument('--threshold', type=float, default=0.4)
+    parser.add_argument('--max-links-per-arg', type=int, default=5)
+    parser.add_argument('--assignment', choices=ASSIGNMENT_MODES, default='topk',
+                        help="'optimal' pairs each argument with at most one rebuttal")
+    args = parser.parse_args(argv)
+
+    written = run(args.input, args.output, args.workers, args.batch_size,
+                  args.threshold, args.max_links_per_arg, args.assignment)
+    print(f"Done: {written} records written to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
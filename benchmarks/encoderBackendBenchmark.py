@@ -0,0 +1,91 @@
+"""
+Encoder backend benchmark: throughput of each backend and drift of semantic_similarity /
+heading_similarity against the fp32 'torch' backend, over every brief pair in
+DataSource/stanford_hackathon_brief_pairs.json.
+
+Usage: python benchmarks/encoderBackendBenchmark.py [backend ...]
+       (defaults to all backends; 'torch' is always run as the reference)
+"""
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from MatchingEngine.encoderBackendService import ENCODER_BACKENDS, load_encoder
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'DataSource', 'stanford_hackathon_brief_pairs.json')
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), '..', 'legal_argument_linker_model', 'config.json')
+
+
+def load_brief_pairs():
+    with open(DATA_PATH, 'r') as f:
+        return json.load(f)
+
+
+def similarity_matrices(extractor, brief_pairs):
+    """semantic_similarity and heading_similarity for every brief pair, plus encode throughput"""
+    pairs = [(entry['moving_brief']['brief_arguments'], entry['response_brief']['brief_arguments'])
+             for entry in brief_pairs]
+    all_args = [arg for moving_args, response_args in pairs for arg in moving_args + response_args]
+
+    start = time.perf_counter()
+    argument_embeddings = extractor.get_argument_embeddings(all_args)
+    heading_embeddings = extractor.get_heading_embeddings([arg['heading'] for arg in all_args])
+    elapsed = time.perf_counter() - start
+
+    semantic, heading = [], []
+    offset = 0
+    for moving_args, response_args in pairs:
+        moving = slice(offset, offset + len(moving_args))
+        response = slice(moving.stop, moving.stop + len(response_args))
+        offset = response.stop
+        semantic.append(extractor.cosine_similarity_matrix(argument_embeddings[moving], argument_embeddings[response]).ravel())
+        heading.append(extractor.cosine_similarity_matrix(heading_embeddings[moving], heading_embeddings[response]).ravel())
+
+    return np.concatenate(semantic), np.concatenate(heading), 2 * len(all_args) / elapsed
+
+
+def main():
+    from app import ArgumentFeatureExtractor
+
+    with open(CONFIG_PATH, 'r') as f:
+        config = json.load(f)
+    model_name = config.get('sentence_model_name', 'all-mpnet-base-v2')
+    backends = sys.argv[1:] or list(ENCODER_BACKENDS)
+    brief_pairs = load_brief_pairs()
+
+    results = {}
+    for backend in ['torch'] + [b for b in backends if b != 'torch']:
+        try:
+            encoder = load_encoder(model_name, backend, config.get('encoder_model_kwargs'))
+        except Exception as e:
+            print(f"{backend:>10}: unavailable ({e})")
+            continue
+        extractor = ArgumentFeatureExtractor(encoder)
+
+        # Warm-up pass so one-time graph / kernel setup is not timed
+        similarity_matrices(extractor, brief_pairs[:1])
+        results[backend] = similarity_matrices(extractor, brief_pairs)
+
+    if 'torch' not in results:
+        print("fp32 reference backend could not be loaded")
+        return 1
+
+    reference_semantic, reference_heading, _ = results['torch']
+    print(f"{model_name}, {len(reference_semantic)} argument pairs")
+    print(f"{'backend':>10} {'texts/s':>9} {'semantic drift (max/mean)':>27} {'heading drift (max/mean)':>26}")
+    for backend, (semantic, heading, throughput) in results.items():
+        semantic_drift = np.abs(semantic - reference_semantic)
+        heading_drift = np.abs(heading - reference_heading)
+        print(f"{backend:>10} {throughput:9.1f} "
+              f"{semantic_drift.max():13.5f} / {semantic_drift.mean():.5f} "
+              f"{heading_drift.max():12.5f} / {heading_drift.mean():.5f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+Benchmark suite for ArgumentFeatureExtractor and the /api/link-arguments endpoint over every
+brief pair in DataSource/stanford_hackathon_brief_pairs.json. Runs offline: embeddings come
+from the deterministic stub encoder in benchmarks/stubEncoder.py, the classifier is the
+shipped model_weights.json, and the endpoint is called through Flask's test client.
+
+Each stage is run --repeat times; the median and minimum wall time per stage are written
+to a JSON results file. With --compare, stages are checked against an earlier results file
+and the run fails (exit status 1) if any stage's median is slower by more than --tolerance
+(relative) and by more than --min-delta-ms (absolute, to ignore timer noise).
+
+Usage: python benchmarks/featureExtractorBenchmark.py [--repeat N] [--output results.json]
+       [--compare baseline.json] [--tolerance 0.25] [--min-delta-ms 1.0] [--stage NAME ...]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.stubEncoder import StubSentenceModel
+from MatchingEngine.linearScorerService import LinearScorer
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'DataSource', 'stanford_hackathon_brief_pairs.json')
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'legal_argument_linker_model', 'model_weights.json')
+FEATURE_COLS = ['semantic_similarity', 'heading_similarity', 'citation_overlap', 'entity_overlap', 'term_overlap']
+
+
+def load_brief_pairs():
+    with open(DATA_PATH, 'r') as f:
+        return json.load(f)
+
+
+def use_stub_models(app):
+    """Point the app globals at the stub encoder (no embedding cache) and the shipped classifier"""
+    sentence_model = StubSentenceModel()
+    app.sentence_model = sentence_model
+    app.feature_extractor = app.ArgumentFeatureExtractor(sentence_model)
+    app.encode_scheduler = None
+    app.feature_cols = list(FEATURE_COLS)
+    app.model = LinearScorer.load(MODEL_PATH)
+    return app.feature_extractor
+
+
+def build_stages(app, extractor, brief_pairs):
+    """Stage name -> (number of calls per run, callable running the stage once)"""
+    pairs = [(entry['moving_brief']['brief_arguments'], entry['response_brief']['brief_arguments'])
+             for entry in brief_pairs]
+    all_args = [arg for moving_args, response_args in pairs for arg in moving_args + response_args]
+    arg_pairs = [(m, r) for moving_args, response_args in pairs for m in moving_args for r in response_args]
+    texts = [extractor.get_argument_text(arg) for arg in all_args]
+    client = app.app.test_client()
+
+    def per_argument(method):
+        return len(all_args), lambda: [method(arg) for arg in all_args]
+
+    def per_text(method):
+        return len(texts), lambda: [method(text) for text in texts]
+
+    def per_pair(method):
+        return len(arg_pairs), lambda: [method(m, r) for m, r in arg_pairs]
+
+    def link_all_pairs():
+        for entry in brief_pairs:
+            response = client.post('/api/link-arguments', json={
+                'moving_brief': entry['moving_brief'],
+                'response_brief': entry['response_brief']
+            })
+            if response.status_code != 200:
+                raise RuntimeError(f"/api/link-arguments failed: {response.get_json()}")
+
+    return {
+        'get_argument_text': per_argument(extractor.get_argument_text),
+        'get_argument_embedding': per_argument(extractor.get_argument_embedding),
+        'get_heading_embedding': (len(all_args), lambda: [extractor.get_heading_embedding(arg['heading']) for arg in all_args]),
+        'get_argument_embeddings': (1, lambda: extractor.get_argument_embeddings(all_args)),
+        'get_heading_embeddings': (1, lambda: extractor.get_heading_embeddings([arg['heading'] for arg in all_args])),
+        'analyze_text': per_text(extractor.text_analyzer.analyze),
+        'get_text_profile': per_argument(extractor.get_text_profile),
+        'calculate_semantic_similarity': per_pair(extractor.calculate_semantic_similarity),
+        'calculate_heading_similarity': per_pair(extractor.calculate_heading_similarity),
+        'extract_all_features': per_pair(extractor.extract_all_features),
+        'extract_feature_matrices': (len(pairs), lambda: extractor.extract_feature_matrices(pairs)),
+        'link_arguments_endpoint': (len(brief_pairs), link_all_pairs)
+    }
+
+
+def time_stage(fn, repeat):
+    """Wall times of repeat runs, after one untimed warm-up run"""
+    fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run_benchmarks(repeat=5, stage_names=None):
+    """Run the selected stages (default all) and return the results document"""
+    import app
+
+    brief_pairs = load_brief_pairs()
+    extractor = use_stub_models(app)
+    stages = build_stages(app, extractor, brief_pairs)
+    unknown = set(stage_names or []) - set(stages)
+    if unknown:
+        raise ValueError(f"Unknown stages {sorted(unknown)}. Expected some of {list(stages)}.")
+
+    results = {}
+    for name, (calls, fn) in stages.items():
+        if stage_names and name not in stage_names:
+            continue
+        times = time_stage(fn, repeat)
+        median = statistics.median(times)
+        results[name] = {
+            'calls': calls,
+            'median_s': median,
+            'min_s': min(times),
+            'per_call_us': median / calls * 1e6
+        }
+
+    return {
+        'meta': {
+            'encoder': 'stub',
+            'brief_pairs': len(brief_pairs),
+            'repeat': repeat,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z')
+        },
+        'stages': results
+    }
+
+
+def compare_results(current, baseline, tolerance=0.25, min_delta_ms=1.0):
+    """Rows of (stage, baseline median, current median, ratio, regressed) for stages in both files"""
+    rows = []
+    for name, stage in current['stages'].items():
+        if name not in baseline['stages']:
+            continue
+        before = baseline['stages'][name]['median_s']
+        after = stage['median_s']
+        ratio = after / before if before > 0 else float('inf')
+        regressed = ratio > 1.0 + tolerance and (after - before) * 1000.0 > min_delta_ms
+        rows.append((name, before, after, ratio, regressed))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the feature extractor and /api/link-arguments.")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per stage (default 5)")
+    parser.add_argument('--output', default='benchmark_results.json', help="Results file to write")
+    parser.add_argument('--compare', help="Earlier results file to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed relative slowdown (default 0.25)")
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help="Ignore slowdowns smaller than this (default 1.0)")
+    parser.add_argument('--stage', action='append', help="Only run this stage (repeatable)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.repeat, args.stage)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{results['meta']['brief_pairs']} brief pairs, stub encoder, {args.repeat} runs per stage")
+    print(f"{'stage':>30} {'calls':>6} {'median ms':>10} {'min ms':>9} {'us/call':>10}")
+    for name, stage in results['stages'].items():
+        print(f"{name:>30} {stage['calls']:6d} {stage['median_s'] * 1000:10.2f} "
+              f"{stage['min_s'] * 1000:9.2f} {stage['per_call_us']:10.1f}")
+    print(f"Results written to {args.output}")
+
+    if not args.compare:
+        return 0
+
+    with open(args.compare, 'r') as f:
+        baseline = json.load(f)
+    rows = compare_results(results, baseline, args.tolerance, args.min_delta_ms)
+    print(f"\nCompared with {args.compare} (tolerance {args.tolerance:.0%}, min delta {args.min_delta_ms} ms)")
+    print(f"{'stage':>30} {'before ms':>10} {'after ms':>9} {'ratio':>7}")
+    for name, before, after, ratio, regressed in rows:
+        print(f"{name:>30} {before * 1000:10.2f} {after * 1000:9.2f} {ratio:7.2f}{'  REGRESSION' if regressed else ''}")
+    regressions = [row[0] for row in rows if row[4]]
+    if regressions:
+        print(f"{len(regressions)} stage(s) regressed: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
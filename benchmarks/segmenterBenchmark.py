@@ -0,0 +1,108 @@
+"""
+Throughput benchmark for DataProcessing.argumentSegmenterService.ArgumentSegmenter
+against the previous split('\\n\\n') segmenter of /api/extract-arguments, on the
+DataSource briefs concatenated (and repeated) into one multi-megabyte filing.
+
+Usage: python benchmarks/segmenterBenchmark.py [repeat_corpus] [chunk_kb]
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from DataProcessing.argumentSegmenterService import ArgumentSegmenter
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'DataSource', 'stanford_hackathon_brief_pairs.json')
+
+
+def legacy_extract_arguments_from_text(text):
+    """The original nested segmenter of /api/extract-arguments, kept as the baseline"""
+    paragraphs = text.split('\n\n')
+
+    arguments = []
+    current_heading = None
+    current_content = []
+
+    for para in paragraphs:
+        if not para.strip():
+            continue
+
+        is_heading = (para.isupper() or
+                      (len(para) < 100 and para.count('.') <= 1) or
+                      (para.endswith('.') and para.count('.') == 1))
+
+        if is_heading:
+            if current_heading and current_content:
+                arguments.append({
+                    "heading": current_heading,
+                    "content": '\n\n'.join(current_content)
+                })
+            current_heading = para
+            current_content = []
+        else:
+            if current_heading:
+                current_content.append(para)
+            else:
+                current_heading = para
+
+    if current_heading and current_content:
+        arguments.append({
+            "heading": current_heading,
+            "content": '\n\n'.join(current_content)
+        })
+
+    return arguments
+
+
+def corpus_text():
+    """All DataSource briefs rendered as one filing: heading, blank line, content"""
+    with open(DATA_PATH, 'r') as f:
+        brief_pairs = json.load(f)
+    return '\n\n'.join(
+        arg['heading'] + '\n\n' + arg['content']
+        for entry in brief_pairs
+        for side in ('moving_brief', 'response_brief')
+        for arg in entry[side]['brief_arguments']
+    )
+
+
+def iter_chunks(text, chunk_size):
+    for start in range(0, len(text), chunk_size):
+        yield text[start:start + chunk_size]
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    chunk_size = int(sys.argv[2]) * 1024 if len(sys.argv) > 2 else 64 * 1024
+    text = '\n\n'.join([corpus_text()] * repeat)
+    megabytes = len(text) / (1024 * 1024)
+    segmenter = ArgumentSegmenter(outline_headings=False)
+
+    runs = [
+        ('legacy split', lambda: len(legacy_extract_arguments_from_text(text))),
+        ('streaming', lambda: sum(1 for _ in segmenter.segment(iter_chunks(text, chunk_size)))),
+        ('streaming+outline', lambda: sum(1 for _ in ArgumentSegmenter().segment(iter_chunks(text, chunk_size))))
+    ]
+
+    print(f"{megabytes:.1f} MB filing, {chunk_size // 1024} KB chunks")
+    for name, fn in runs:
+        # Consuming the generator without keeping results shows the bounded working set
+        count, elapsed, peak = measure(fn)
+        print(f"{name:>18}: {count:6d} arguments  {megabytes / elapsed:7.1f} MB/s  peak {peak / (1024 * 1024):7.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+"""
+Deterministic offline stand-in for SentenceTransformer, shared by the tests and the
+benchmarks so neither needs network access or downloaded model weights.
+"""
+import re
+import zlib
+
+import numpy as np
+
+
+class StubSentenceModel:
+    """Deterministic offline stand-in for SentenceTransformer (hashed bag of words)"""
+
+    def __init__(self, dim=64):
+        self.dim = dim
+        self.encode_calls = 0
+        self.texts_encoded = 0
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r'\w+', text.lower()):
+            vector[zlib.crc32(word.encode('utf-8')) % self.dim] += 1.0
+        return vector
+
+    def encode(self, sentences, **kwargs):
+        self.encode_calls += 1
+        if isinstance(sentences, str):
+            self.texts_encoded += 1
+            return self._embed(sentences)
+        self.texts_encoded += len(sentences)
+        return np.array([self._embed(s) for s in sentences], dtype=np.float32).reshape(len(sentences), self.dim)
@@ -0,0 +1,82 @@
+"""
+Micro-benchmark: LegalTextAnalyzer.analyze versus separate regex scans for citations,
+entities and key terms (the feature extractor's original implementation, kept here as the
+baseline and as the reference the analyzer's tests compare against), over every argument
+in DataSource/stanford_hackathon_brief_pairs.json.
+
+Usage: python benchmarks/textAnalyzerBenchmark.py [repeats]
+"""
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from DataProcessing.textAnalyzerService import CITATION_PATTERNS, LegalTextAnalyzer
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'DataSource', 'stanford_hackathon_brief_pairs.json')
+
+
+def load_brief_pairs():
+    with open(DATA_PATH, 'r') as f:
+        return json.load(f)
+
+
+def separate_scans(text):
+    """(citations, entities, key terms) of text, one full regex scan or split per kind"""
+    citations = set()
+    for _, pattern in CITATION_PATTERNS:
+        citations.update(re.findall(pattern, text))
+    entities = {e for e in re.findall(r'\b[A-Z][a-zA-Z]*(?:\s+[A-Z][a-zA-Z]*)*\b', text) if len(e) > 3}
+    term_counts = Counter(w for w in text.lower().split() if len(w) > 3)
+    return citations, entities, {term for term, count in term_counts.most_common(50)}
+
+
+def time_it(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    brief_pairs = load_brief_pairs()
+    texts = [arg['content']
+             for entry in brief_pairs
+             for side in ('moving_brief', 'response_brief')
+             for arg in entry[side]['brief_arguments']]
+    analyzer = LegalTextAnalyzer()
+
+    def per_text_separate():
+        for text in texts:
+            separate_scans(text)
+
+    def per_text_profiled():
+        for text in texts:
+            analyzer.analyze(text)
+
+    # Old pair loop: both texts scanned again for every (moving, response) pair
+    def per_pair_separate():
+        for entry in brief_pairs:
+            for moving_arg in entry['moving_brief']['brief_arguments']:
+                for response_arg in entry['response_brief']['brief_arguments']:
+                    separate_scans(moving_arg['content'])
+                    separate_scans(response_arg['content'])
+
+    separate = time_it(per_text_separate, repeats)
+    profiled = time_it(per_text_profiled, repeats)
+    pair_loop = time_it(per_pair_separate, max(1, repeats // 10))
+
+    total_kb = sum(len(t) for t in texts) / 1024
+    print(f"{len(texts)} texts, {total_kb:.0f} KB, {repeats} repeats")
+    print(f"separate scans, per text:        {separate * 1000:8.2f} ms")
+    print(f"LegalTextAnalyzer, per text:     {profiled * 1000:8.2f} ms  ({separate / profiled:.2f}x)")
+    print(f"separate scans, per pair (old):  {pair_loop * 1000:8.2f} ms  ({pair_loop / profiled:.2f}x vs profiles)")
+
+
+if __name__ == '__main__':
+    main()
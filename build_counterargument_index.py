@@ -0,0 +1,76 @@
+"""
+Build (or extend) the corpus-wide counterargument index used by /api/search-counterarguments.
+
+Indexes every response-brief argument of the input records (JSON array or JSONL of
+brief pairs, as in DataSource/stanford_hackathon_brief_pairs.json) and saves the
+index to the path configured in legal_argument_linker_model/config.json.
+
+Usage:
+    python build_counterargument_index.py DataSource/stanford_hackathon_brief_pairs.json [--append]
+"""
+import argparse
+import os
+import sys
+
+import app
+from batch_linker import iter_records
+from MatchingEngine.counterArgumentIndexService import CounterArgumentIndex
+
+
+def index_records(input_path, batch_size):
+    """Add the response briefs of every record to app.counterargument_index; returns the number added"""
+    # Briefs without a brief_id are keyed by their record's place in the archive
+    archive = os.path.basename(input_path)
+    briefs = []
+    sources = []
+    added = 0
+    for index, record in enumerate(iter_records(input_path)):
+        if 'response_brief' in record:
+            briefs.append(record['response_brief'])
+            sources.append(f"{archive}#{index}")
+        if len(briefs) >= batch_size:
+            added += app.index_briefs(briefs, sources)
+            briefs = []
+            sources = []
+    if briefs:
+        added += app.index_briefs(briefs, sources)
+    return added
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the counterargument nearest-neighbor index")
+    parser.add_argument('input', help="JSON array or JSONL file of brief pairs")
+    parser.add_argument('--output', help="Index directory (defaults to the configured path)")
+    parser.add_argument('--append', action='store_true',
+                        help="Add to the existing index instead of rebuilding it")
+    parser.add_argument('--n-lists', type=int, default=None, help="Inverted lists (default ~sqrt(size))")
+    parser.add_argument('--batch-size', type=int, default=64, help="Briefs embedded per batch")
+    args = parser.parse_args(argv)
+
+    if not app.load_models():
+        return 1
+    output = args.output or app.counterargument_index_path
+
+    if args.append:
+        # Server workers may add to the same index: hold its lock for the whole run and
+        # start from the latest saved version, so neither side's entries are lost
+        with CounterArgumentIndex.locked(output):
+            if CounterArgumentIndex.stored_signature(output) is not None:
+                app.counterargument_index = CounterArgumentIndex.load(output)
+            added = index_records(args.input, args.batch_size)
+            app.counterargument_index.save(output)
+    else:
+        app.counterargument_index = CounterArgumentIndex()
+        added = index_records(args.input, args.batch_size)
+
+        # Cluster once all vectors are in (incremental adds reuse the existing lists)
+        app.counterargument_index.train(args.n_lists)
+        with CounterArgumentIndex.locked(output):
+            app.counterargument_index.save(output)
+
+    print(f"Indexed {added} arguments ({len(app.counterargument_index)} total) into {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
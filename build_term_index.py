@@ -0,0 +1,60 @@
+"""
+Build the corpus term-statistics index used by the 'tfidf_cosine' feature.
+
+Counts document frequencies over every argument (moving and response briefs) of the input
+records (JSON array or JSONL of brief pairs, as in DataSource/stanford_hackathon_brief_pairs.json)
+and saves hashed terms, document frequencies and IDF weights as memory-mappable .npy files to
+the path configured in legal_argument_linker_model/config.json ('term_index_path').
+Briefs registered through /api/briefs are added to the statistics at runtime.
+
+Add 'tfidf_cosine' to feature_cols (and retrain with train_model.py --features ...) to use it.
+
+Usage:
+    python build_term_index.py DataSource/stanford_hackathon_brief_pairs.json
+"""
+import argparse
+import json
+import os
+import sys
+
+import app
+from batch_linker import iter_records
+from MatchingEngine.termIndexService import TermIndex
+
+
+def configured_path():
+    """term_index_path from config.json, without loading the models"""
+    config_path = os.path.join(app.model_path, 'config.json')
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            return json.load(f).get('term_index_path', app.term_index_path)
+    return app.term_index_path
+
+
+def iter_argument_texts(records):
+    for record in records:
+        for side in ('moving_brief', 'response_brief'):
+            for arg in record.get(side, {}).get('brief_arguments', []):
+                yield arg['content']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the TF-IDF term index over a brief-pair corpus")
+    parser.add_argument('input', nargs='+', help="JSON array or JSONL files of brief pairs")
+    parser.add_argument('--output', help="Index directory (defaults to the configured path)")
+    args = parser.parse_args(argv)
+
+    records = [record for path in args.input for record in iter_records(path)]
+    index = TermIndex.build(iter_argument_texts(records), metadata={
+        'sources': [os.path.basename(path) for path in args.input]
+    })
+    output = args.output or configured_path()
+    index.save(output)
+    stats = index.stats()
+    print(f"Indexed {stats['terms']} terms over {stats['documents']} arguments "
+          f"({stats['bytes']} bytes) into {output}, version {stats['version']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Export legal_argument_linker_model/model.pkl to model_weights.json, the versioned artifact of
+scaler parameters, logistic-regression weights and feature order that the server loads as a
+pure NumPy scorer (MatchingEngine.linearScorerService.LinearScorer).
+
+The export is refused unless the scorer reproduces the pipeline's probabilities on a grid of
+feature rows (and, with --data, on the real feature matrices of a brief-pair file).
+
+Usage:
+    python export_model.py [--model-dir legal_argument_linker_model] [--data DataSource/stanford_hackathon_brief_pairs.json]
+"""
+import argparse
+import json
+import os
+import pickle
+import sys
+
+import numpy as np
+
+from MatchingEngine.linearScorerService import export_model
+
+DEFAULT_FEATURE_COLS = ['semantic_similarity', 'heading_similarity', 'citation_overlap', 'entity_overlap', 'term_overlap']
+
+
+def data_feature_rows(data_path, feature_cols):
+    """Feature rows of every brief pair in data_path (loads the sentence model)"""
+    import app
+    from batch_linker import iter_records
+
+    if not app.ensure_models_loaded():
+        raise RuntimeError("Failed to load models")
+    pairs = [(record['moving_brief']['brief_arguments'], record['response_brief']['brief_arguments'])
+             for record in iter_records(data_path)]
+    feature_matrices = app.feature_extractor.extract_feature_matrices(pairs)
+    return np.concatenate([
+        np.stack([feature_matrix[col].ravel() for col in feature_cols], axis=1)
+        for feature_matrix in feature_matrices
+    ])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export model.pkl to a NumPy-scorer weights artifact")
+    parser.add_argument('--model-dir', default='./legal_argument_linker_model')
+    parser.add_argument('--output', help="Artifact path (default: <model-dir>/model_weights.json)")
+    parser.add_argument('--data', help="Brief-pair file whose feature rows are added to the parity check")
+    parser.add_argument('--tolerance', type=float, default=1e-9, help="Allowed probability difference")
+    args = parser.parse_args(argv)
+
+    config_path = os.path.join(args.model_dir, 'config.json')
+    config = {}
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+    feature_cols = config.get('feature_cols', DEFAULT_FEATURE_COLS)
+
+    with open(os.path.join(args.model_dir, 'model.pkl'), 'rb') as f:
+        pipeline = pickle.load(f)
+
+    extra_inputs = data_feature_rows(args.data, feature_cols) if args.data else None
+    output = args.output or os.path.join(args.model_dir, config.get('model_weights_file', 'model_weights.json'))
+    try:
+        scorer = export_model(pipeline, feature_cols, output, args.tolerance, extra_inputs,
+                              metadata={'source': 'model.pkl'})
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    print(f"Exported {scorer.model_version} ({len(feature_cols)} features) to {output}; "
+          f"max abs error {scorer.metadata['parity_max_abs_error']:.3g} over {scorer.metadata['parity_rows']} rows")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
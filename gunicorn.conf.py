@@ -0,0 +1,33 @@
+"""gunicorn settings for wsgi:application"""
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', max(2, multiprocessing.cpu_count() // 2)))
+threads = int(os.environ.get('THREADS', 1))
+timeout = int(os.environ.get('TIMEOUT', 300))
+
+# Async serving (see wsgi.py): a gthread worker's selector loop accepts connections and hands
+# requests to its threads; link jobs only occupy COMPUTE_CONCURRENCY of them at a time
+if os.environ.get('SERVING_MODE', 'sync') == 'async':
+    worker_class = 'gthread'
+    threads = int(os.environ.get('THREADS', 16))
+
+# Import wsgi.py in the master before forking workers (with MODEL_LOADING=preload this
+# also loads the models there, shared copy-on-write by the workers)
+preload_app = True
+
+
+def post_fork(server, worker):
+    """Split CPU threads between workers so forked torch pools don't oversubscribe the node"""
+    torch_threads = os.environ.get('TORCH_NUM_THREADS')
+    if torch_threads:
+        import torch
+        torch.set_num_threads(int(torch_threads))
+
+
+def post_worker_init(worker):
+    """Start loading the models in the background unless the master already loaded them"""
+    import app
+    if os.environ.get('MODEL_LOADING', 'background') == 'background':
+        app.start_model_loading()
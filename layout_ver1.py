@@ -1,29 +1,47 @@
+import os
 import streamlit as st
 import time
 from MatchingEngine.matchingEngineService import ArgumentAnalyzer
 from fpdf import FPDF  # Ensure you have installed FPDF: pip install fpdf
 
+ARGUMENT_API_URL = os.environ.get("ARGUMENT_API_URL", "http://localhost:5000/api")
+
+@st.cache_data(show_spinner=False)
+def extract_document_text(data, filename):
+    """
+    Extract text from an uploaded document through the API server's /extract-arguments
+    endpoint (page-parallel PDF extraction with a server-side content-hash cache).
+    Falls back to in-process extraction if the server is not reachable.
+    Cached by Streamlit on the file bytes, so reruns don't re-upload.
+    """
+    try:
+        import requests
+        response = requests.post(
+            f"{ARGUMENT_API_URL}/extract-arguments",
+            files={"moving_file": (filename, data)},
+            data={"include_text": "true"},
+            timeout=120
+        )
+        response.raise_for_status()
+        return response.json()["moving_brief"]["text"]
+    except Exception:
+        from DataProcessing.documentExtractionService import DocumentExtractor
+        return DocumentExtractor(max_workers=1).extract_text(data, filename)
+
 def extract_file_content(file):
     """
     Extract text from a file supporting TXT and PDF formats.
-    For PDFs, PyPDF2 is used to extract text from each page
-    and return it as one continuous line.
+    For PDFs, the text of all pages is returned as one continuous line.
     """
     file.seek(0)
+    data = file.read()
+    try:
+        text = extract_document_text(data, file.name)
+    except RuntimeError as e:
+        return f"Error: {e}"
     if file.type == "application/pdf" or file.name.lower().endswith(".pdf"):
-        try:
-            import PyPDF2
-        except ImportError:
-            return "Error: PyPDF2 module is not installed. Please install it using: pip install PyPDF2"
-        reader = PyPDF2.PdfReader(file)
-        text = ""
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text + " "
         return " ".join(text.split())
-    else:
-        return file.read().decode("utf-8")
+    return text
 
 def main():
     # Set page configuration
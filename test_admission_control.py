@@ -0,0 +1,228 @@
+import json
+import threading
+import time
+
+import pytest
+
+import app
+from MatchingEngine.computeExecutorService import ComputeExecutor, ComputeQueueFull
+from test_async_serving import use_slow_models
+from test_feature_extractor import load_brief_pairs, use_stub_models
+
+
+def link_payload(entry, **options):
+    return dict({'moving_brief': entry['moving_brief'], 'response_brief': entry['response_brief']}, **options)
+
+
+def test_requests_over_size_limits_are_rejected(monkeypatch):
+    use_stub_models()
+    client = app.app.test_client()
+    entry = load_brief_pairs()[3]
+    moving_args = entry['moving_brief']['brief_arguments']
+    response_args = entry['response_brief']['brief_arguments']
+    assert client.post('/api/link-arguments', json=link_payload(entry)).status_code == 200
+
+    monkeypatch.setitem(app.request_limits, 'max_arguments_per_brief', len(moving_args) - 1)
+    response = client.post('/api/link-arguments', json=link_payload(entry))
+    assert response.status_code == 413 and 'arguments' in response.json['error']
+    assert client.post('/api/link-arguments/batch', json=[entry]).status_code == 413
+    assert client.put('/api/briefs/big', json={'brief_arguments': moving_args}).status_code == 413
+    monkeypatch.setitem(app.request_limits, 'max_arguments_per_brief', 0)
+
+    monkeypatch.setitem(app.request_limits, 'max_pairs_per_request', len(moving_args) * len(response_args) - 1)
+    assert client.post('/api/link-arguments', json=link_payload(entry)).status_code == 413
+    # Registered briefs count towards the pair limit too
+    client.put('/api/briefs/m', json={'brief_arguments': moving_args})
+    client.put('/api/briefs/r', json={'brief_arguments': response_args})
+    assert client.post('/api/link-arguments', json={'moving_brief_id': 'm', 'response_brief_id': 'r'}).status_code == 413
+    monkeypatch.setitem(app.request_limits, 'max_pairs_per_request', 0)
+
+    monkeypatch.setitem(app.request_limits, 'max_content_bytes', 1000)
+    response = client.post('/api/link-arguments', json=link_payload(entry))
+    assert response.status_code == 413 and 'bytes' in response.json['error']
+    assert app.requests_shed.value(reason='limits') >= 5
+
+
+def test_malformed_bodies_get_json_400_before_admission():
+    use_stub_models()
+    client = app.app.test_client()
+    argument = {'heading': 'I. Facts', 'content': 'Text'}
+    for body in ([1, 2], 'x', {'moving_brief': 'x', 'response_brief': {}},
+                 {'moving_brief_id': 'a', 'response_brief': [1]}, {'moving_brief': None},
+                 {'moving_brief': {'brief_arguments': 'abc'}, 'response_brief': {'brief_arguments': [argument]}},
+                 {'moving_brief': {'brief_arguments': [argument]}, 'response_brief': {'brief_arguments': [1]}}):
+        response = client.post('/api/link-arguments', json=body)
+        assert response.status_code == 400 and 'error' in response.json, body
+
+    for body in ('x', 5, {'moving_brief': 'x', 'response_brief': {}}):
+        response = client.post('/api/link-arguments/batch', json=body)
+        assert response.status_code == 400 and 'error' in response.json, body
+    # Malformed pairs of a batch get their own error result
+    response = client.post('/api/link-arguments/batch', json=[1, {'moving_brief': 'x', 'response_brief': {}},
+                                                              {'moving_brief_id': 'a', 'response_brief': [1]}])
+    assert response.status_code == 200
+    assert all('error' in result for result in response.json['results'])
+
+
+def test_full_queue_sheds_with_retry_after():
+    use_slow_models(delay=0.1)
+    app.configure_serving('async', 1, max_queue=1)
+    client = app.app.test_client()
+    payload = link_payload(load_brief_pairs()[2])
+    responses = []
+
+    def link():
+        responses.append(client.post('/api/link-arguments', json=payload))
+
+    threads = [threading.Thread(target=link) for _ in range(4)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+    finally:
+        app.configure_serving('sync')
+
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses.count(200) >= 2 and 429 in statuses
+    shed = [response for response in responses if response.status_code == 429]
+    assert all(int(response.headers['Retry-After']) >= 1 for response in shed)
+
+
+def test_invalid_deadline_is_rejected():
+    use_stub_models()
+    client = app.app.test_client()
+    entry = load_brief_pairs()[3]
+    for deadline_ms in ('abc', {}, -5, True):
+        response = client.post('/api/link-arguments', json=link_payload(entry, deadline_ms=deadline_ms))
+        assert response.status_code == 400 and 'deadline_ms' in response.json['error']
+        response = client.post('/api/link-arguments/batch', json={'brief_pairs': [entry], 'deadline_ms': deadline_ms})
+        assert response.status_code == 400
+    assert client.post('/api/link-arguments', json=link_payload(entry, deadline_ms='5000')).status_code == 200
+
+
+def test_admitted_stream_is_not_shed_when_the_queue_fills():
+    executor = ComputeExecutor(1, max_queue=1)
+    stream = executor.iterate(iter([1, 2, 3]))
+    assert next(stream) == 1
+
+    # Occupy the only slot and the only queue place after the stream was admitted
+    release = threading.Event()
+    blockers = [threading.Thread(target=executor.run, args=(release.wait, 5)) for _ in range(2)]
+    for blocker, counter in zip(blockers, ('active', 'queued')):
+        blocker.start()
+        started = time.monotonic()
+        while executor.stats()[counter] == 0 and time.monotonic() - started < 5:
+            time.sleep(0.001)
+    with pytest.raises(ComputeQueueFull):
+        executor.run(int, '1')
+
+    # The rest of the stream waits for a slot instead of failing mid-body
+    threading.Timer(0.05, release.set).start()
+    assert list(stream) == [2, 3]
+    for blocker in blockers:
+        blocker.join(5)
+
+
+def test_deadline_returns_scored_rows_as_partial_result(monkeypatch):
+    use_slow_models(delay=0.05)
+    monkeypatch.setitem(app.request_limits, 'deadline_block_rows', 1)
+    client = app.app.test_client()
+    entry = load_brief_pairs()[3]
+    n_moving = len(entry['moving_brief']['brief_arguments'])
+
+    # Response side plus each one-row block costs two 50 ms encode calls
+    response = client.post('/api/link-arguments', json=link_payload(entry, threshold=0.0, deadline_ms=220))
+    assert response.status_code == 200
+    result = response.json
+    assert result['partial'] is True and 0 < result['scored_moving_args'] < n_moving
+    assert {link['moving_idx'] for link in result['links']} <= set(range(result['scored_moving_args']))
+
+    # Without a deadline every row is scored
+    full = client.post('/api/link-arguments', json=link_payload(entry, threshold=0.0)).json
+    assert 'partial' not in full
+    scored = result['scored_moving_args']
+    partial_links = {(l['moving_idx'], l['response_idx']): l['confidence'] for l in result['links']}
+    full_links = {(l['moving_idx'], l['response_idx']): l['confidence'] for l in full['links'] if l['moving_idx'] < scored}
+    assert partial_links.keys() == full_links.keys()
+    assert all(abs(partial_links[key] - full_links[key]) < 1e-6 for key in full_links)
+
+    streamed = client.post('/api/link-arguments', json=link_payload(entry, stream='ndjson', deadline_ms=220))
+    records = [json.loads(line) for line in streamed.get_data(as_text=True).splitlines()]
+    assert [r['type'] for r in records[-2:]] == ['timeout', 'summary']
+    assert records[-1]['rows'] == records[-2]['rows_scored'] < n_moving
+
+
+def test_deadline_spent_waiting_for_a_slot_times_out():
+    use_slow_models(delay=0.15)
+    app.configure_serving('async', 1, max_queue=4)
+    client = app.app.test_client()
+    entry = load_brief_pairs()[2]
+    responses = {}
+
+    def link(name, **options):
+        responses[name] = client.post('/api/link-arguments', json=link_payload(entry, **options))
+
+    slow = threading.Thread(target=link, args=('slow',))
+    try:
+        slow.start()
+        started = time.monotonic()
+        while app.compute_executor.stats()['active'] == 0 and time.monotonic() - started < 5:
+            time.sleep(0.001)
+        link('hurried', deadline_ms=100)
+        slow.join(30)
+    finally:
+        app.configure_serving('sync')
+
+    assert responses['slow'].status_code == 200
+    assert responses['hurried'].status_code == 504 and responses['hurried'].json['timed_out'] is True
+
+
+def test_batch_deadline_returns_scored_pairs_and_marks_the_rest(monkeypatch):
+    use_slow_models(delay=0.05)
+    monkeypatch.setitem(app.request_limits, 'deadline_block_pairs', 1)
+    client = app.app.test_client()
+    brief_pairs = load_brief_pairs()
+
+    # Each one-pair block costs two 50 ms encode calls
+    response = client.post('/api/link-arguments/batch', json={'brief_pairs': brief_pairs, 'deadline_ms': 250})
+    assert response.status_code == 200 and response.json['partial'] is True
+    results = response.json['results']
+    assert len(results) == len(brief_pairs)
+    scored = [result for result in results if 'links' in result]
+    assert 0 < len(scored) < len(brief_pairs)
+    assert results[:len(scored)] == scored
+    assert all(result['timed_out'] is True and result['brief_id'] == entry['moving_brief']['brief_id']
+               for result, entry in zip(results[len(scored):], brief_pairs[len(scored):]))
+
+
+def test_deadline_abandons_optimal_registered_and_incremental_work(monkeypatch):
+    use_slow_models(delay=0.05)
+    monkeypatch.setitem(app.request_limits, 'deadline_block_rows', 1)
+    client = app.app.test_client()
+    entry = load_brief_pairs()[3]
+    n_moving = len(entry['moving_brief']['brief_arguments'])
+
+    # One-to-one links need every row, so they give up instead of finishing
+    response = client.post('/api/link-arguments', json=link_payload(entry, assignment='optimal', deadline_ms=220))
+    assert response.status_code == 504 and response.json['timed_out'] is True
+    streamed = client.post('/api/link-arguments', json=link_payload(entry, assignment='optimal', stream='ndjson',
+                                                                     deadline_ms=220))
+    records = [json.loads(line) for line in streamed.get_data(as_text=True).splitlines()]
+    assert [r['type'] for r in records] == ['timeout', 'summary'] and records[-1]['rows'] == 0
+
+    # Requests naming a registered brief are scored in row blocks too, so top-k returns the
+    # rows scored in time (each inline moving row still costs two 50 ms encode calls)
+    client.put('/api/briefs/response', json={'brief_arguments': entry['response_brief']['brief_arguments']})
+    response = client.post('/api/link-arguments', json={'moving_brief': entry['moving_brief'], 'response_brief_id': 'response',
+                                                        'threshold': 0.0, 'deadline_ms': 120})
+    assert response.status_code == 200
+    assert response.json['partial'] is True and response.json['scored_moving_args'] < n_moving
+
+    # Incremental re-linking stops between featurizing steps
+    first = client.post('/api/link-arguments', json=link_payload(entry, incremental=True)).json
+    edited = dict(entry['moving_brief'], brief_arguments=[dict(arg, content=arg['content'] + ' Edited.')
+                                                          for arg in entry['moving_brief']['brief_arguments']])
+    response = client.post('/api/link-arguments', json={'moving_brief': edited, 'response_brief': entry['response_brief'],
+                                                        'previous_hashes': first['argument_hashes'], 'deadline_ms': 60})
+    assert response.status_code == 504
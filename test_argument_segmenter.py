@@ -0,0 +1,52 @@
+import random
+
+import app
+from benchmarks.segmenterBenchmark import corpus_text, legacy_extract_arguments_from_text
+from DataProcessing.argumentSegmenterService import ArgumentSegmenter
+
+
+def random_chunks(text, seed=0):
+    rng = random.Random(seed)
+    pos = 0
+    while pos < len(text):
+        size = rng.randint(1, 300)
+        yield text[pos:pos + size]
+        pos += size
+
+
+def test_matches_legacy_segmenter_for_any_chunking():
+    text = corpus_text() + '\n\n\n\nTRAILING HEADING\n\n\ncontent with a stray newline. More text here.'
+    expected = legacy_extract_arguments_from_text(text)
+    segmenter = ArgumentSegmenter(outline_headings=False)
+    for chunks in (text, random_chunks(text), random_chunks(text, seed=1)):
+        arguments = list(segmenter.segment(chunks))
+        assert [(a['heading'], a['content']) for a in arguments] == \
+            [(a['heading'], a['content']) for a in expected]
+
+
+def test_offsets_point_into_source_text():
+    text = corpus_text()
+    for arg in ArgumentSegmenter().segment(random_chunks(text)):
+        assert text[arg['heading_start']:arg['heading_end']] == arg['heading']
+        content = text[arg['content_start']:arg['content_end']]
+        assert content.startswith(arg['content'].split('\n\n')[0])
+        assert content.endswith(arg['content'].split('\n\n')[-1])
+
+
+def test_numbered_outline_headings():
+    text = ("I. Plaintiffs lack standing because they allege no concrete injury. See Smith v. Jones, 1 U.S. 2.\n\n"
+            "Body of the first argument. It has several sentences. Really.\n\n"
+            "A. The Court should decline supplemental jurisdiction over the remaining claims, e.g. counts 3-4.\n\n"
+            "Body of the second argument. It also has sentences. Yes.")
+    headings = [a['heading'] for a in ArgumentSegmenter().segment(text)]
+    assert headings == [text.split('\n\n')[0], text.split('\n\n')[2]]
+    assert len(list(ArgumentSegmenter(outline_headings=False).segment(text))) == 1
+
+
+def test_extract_arguments_endpoint_returns_offsets():
+    text = "BACKGROUND\n\nThe facts are these. They are many. Indeed.\n\nARGUMENT\n\nThe law is that. It applies. Clearly."
+    response = app.app.test_client().post('/api/extract-arguments', json={'moving_text': text, 'response_text': text})
+    assert response.status_code == 200
+    arguments = response.json['moving_brief']['brief_arguments']
+    assert [a['heading'] for a in arguments] == ['BACKGROUND', 'ARGUMENT']
+    assert text[arguments[1]['content_start']:arguments[1]['content_end']] == arguments[1]['content']
@@ -0,0 +1,144 @@
+import json
+import threading
+import time
+import urllib.request
+
+from werkzeug.serving import make_server
+
+import app
+from benchmarks.stubEncoder import StubSentenceModel
+from MatchingEngine.computeExecutorService import ComputeExecutor
+from test_feature_extractor import load_brief_pairs, use_stub_models
+
+
+class SlowStubModel(StubSentenceModel):
+    """Stub encoder taking delay seconds per call (a forward pass releases the GIL), tracking concurrency"""
+
+    def __init__(self, delay=0.05):
+        super().__init__()
+        self.delay = delay
+        # While set to an unset Event, encode calls block on it (holding their compute slot)
+        self.gate = None
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def encode(self, sentences, **kwargs):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            if self.gate is not None:
+                self.gate.wait(30)
+            time.sleep(self.delay)
+            return super().encode(sentences, **kwargs)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+def use_slow_models(delay):
+    use_stub_models()
+    sentence_model = SlowStubModel(delay)
+    app.sentence_model = sentence_model
+    app.feature_extractor = app.ArgumentFeatureExtractor(sentence_model)
+    return sentence_model
+
+
+def test_executor_runs_in_caller_context_and_propagates_errors():
+    import contextvars
+
+    executor = ComputeExecutor(2)
+    var = contextvars.ContextVar('var', default=None)
+    var.set('request-1')
+    assert executor.run(var.get) == 'request-1'
+    assert list(executor.iterate(iter([1, 2, 3]))) == [1, 2, 3]
+    try:
+        executor.run(int, 'not a number')
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    assert executor.stats()['completed'] == 6 and executor.stats()['active'] == 0
+
+
+def test_async_mode_link_responses_match_sync_mode():
+    use_stub_models()
+    entry = load_brief_pairs()[5]
+    payload = {'moving_brief': entry['moving_brief'], 'response_brief': entry['response_brief'], 'threshold': 0.0}
+    client = app.app.test_client()
+    expected = client.post('/api/link-arguments', json=payload).json['links']
+    try:
+        app.configure_serving('async', 2)
+        assert client.post('/api/link-arguments', json=payload).json['links'] == expected
+        streamed = client.post('/api/link-arguments', json=dict(payload, stream='ndjson'))
+        records = [json.loads(line) for line in streamed.get_data(as_text=True).splitlines()]
+        assert records[-1]['type'] == 'summary'
+        assert client.get('/api/health').json['compute_executor']['completed'] >= 2
+    finally:
+        app.configure_serving('sync')
+
+
+def test_health_is_served_while_link_jobs_queue():
+    sentence_model = use_slow_models(delay=0.05)
+    app.configure_serving('async', 2)
+    server = make_server('127.0.0.1', 0, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    entry = load_brief_pairs()[5]
+    body = json.dumps({'moving_brief': entry['moving_brief'], 'response_brief': entry['response_brief']}).encode('utf-8')
+
+    def health():
+        with urllib.request.urlopen(f"{base_url}/api/health", timeout=10) as response:
+            return json.load(response)['compute_executor']
+
+    def link():
+        request = urllib.request.Request(f"{base_url}/api/link-arguments", data=body,
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=60) as response:
+            statuses.append(response.status)
+
+    statuses = []
+    clients = []
+    try:
+        # Four times more concurrent link jobs than compute slots
+        for _ in range(8):
+            clients.append(threading.Thread(target=lambda: [link() for _ in range(3)]))
+            clients[-1].start()
+        snapshots = []
+        while any(client.is_alive() for client in clients) and len(snapshots) < 40:
+            snapshots.append(health())
+            time.sleep(0.01)
+        for client in clients:
+            client.join(60)
+
+        # Both compute slots held by blocked jobs and a third job queued behind them:
+        # /health must still answer promptly rather than wait for a slot
+        sentence_model.gate = threading.Event()
+        clients = [threading.Thread(target=link) for _ in range(3)]
+        for client in clients:
+            client.start()
+        deadline = time.monotonic() + 10
+        while health()['queued'] < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        start = time.perf_counter()
+        held = health()
+        latency = time.perf_counter() - start
+        sentence_model.gate.set()
+    finally:
+        if sentence_model.gate is not None:
+            sentence_model.gate.set()
+        for client in clients:
+            client.join(60)
+        server.shutdown()
+        app.configure_serving('sync')
+
+    assert statuses == [200] * 27
+    assert held['active'] == 2 and held['queued'] >= 1
+    # The held jobs block for up to 30 s, so a health check that waited for a slot would blow this bound
+    assert latency < 2.0
+    # Health checks were answered while link jobs were waiting for a compute slot, so they
+    # did not queue behind them, and the compute work never exceeded its two slots
+    assert any(snapshot['queued'] > 0 for snapshot in snapshots)
+    assert all(snapshot['active'] <= 2 for snapshot in snapshots)
+    assert sentence_model.max_running <= 2
@@ -0,0 +1,89 @@
+import json
+import multiprocessing
+
+import pytest
+
+import batch_linker
+from test_feature_extractor import DATA_PATH, load_brief_pairs, use_stub_models
+
+
+def read_results(path):
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_iter_records_reads_json_array_and_jsonl(tmp_path):
+    brief_pairs = load_brief_pairs()
+    jsonl_path = tmp_path / 'pairs.jsonl'
+    jsonl_path.write_text(''.join(json.dumps(entry) + '\n' for entry in brief_pairs))
+    assert list(batch_linker.iter_records(DATA_PATH)) == brief_pairs
+    assert list(batch_linker.iter_records(str(jsonl_path))) == brief_pairs
+    # Records straddling many small chunk reads
+    assert list(batch_linker.iter_records(DATA_PATH, chunk_size=37)) == brief_pairs
+
+
+def test_run_resumes_after_interruption(tmp_path):
+    use_stub_models()
+    output_path = str(tmp_path / 'links.jsonl')
+    brief_pairs = load_brief_pairs()
+
+    written = batch_linker.run(DATA_PATH, output_path, workers=1, batch_size=3, log=lambda message: None)
+    assert written == len(brief_pairs)
+    full_run = {r['key']: r for r in read_results(output_path)}
+
+    # Simulate a job killed mid-write: keep four results and half of the fifth line
+    with open(output_path, 'r') as f:
+        lines = f.readlines()
+    with open(output_path, 'w') as f:
+        f.writelines(lines[:4])
+        f.write(lines[4][:20])
+
+    written = batch_linker.run(DATA_PATH, output_path, workers=1, batch_size=3, log=lambda message: None)
+    assert written == len(brief_pairs) - 4
+
+    resumed = read_results(output_path)
+    assert len(resumed) == len(brief_pairs)
+    assert {r['key']: r for r in resumed} == full_run
+
+
+def test_run_writes_errors_for_malformed_records_and_keeps_going(tmp_path):
+    use_stub_models()
+    brief_pairs = load_brief_pairs()
+    missing_content = json.loads(json.dumps(brief_pairs[1]))
+    del missing_content['moving_brief']['brief_arguments'][0]['content']
+    records = [
+        brief_pairs[0],
+        missing_content,
+        dict(brief_pairs[2], threshold='high'),
+        'not a record',
+        brief_pairs[0]  # same brief IDs as the first record
+    ]
+    input_path = tmp_path / 'pairs.jsonl'
+    input_path.write_text(''.join(json.dumps(record) + '\n' for record in records))
+    output_path = str(tmp_path / 'links.jsonl')
+
+    assert batch_linker.run(str(input_path), output_path, batch_size=2, log=lambda message: None) == len(records)
+    results = read_results(output_path)
+    assert len({result['key'] for result in results}) == len(records)
+    assert ['links' in result for result in results] == [True, False, False, False, True]
+    assert 'content' in results[1]['error'] and 'threshold' in results[2]['error'] and 'error' in results[3]
+
+    # Every record has a result, so a resumed run has nothing left to do
+    assert batch_linker.run(str(input_path), output_path, batch_size=2, log=lambda message: None) == 0
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                    reason="Workers inherit the stub models only when forked")
+def test_run_with_worker_processes_matches_single_process(tmp_path):
+    use_stub_models()
+    single_path = str(tmp_path / 'single.jsonl')
+    pool_path = str(tmp_path / 'pool.jsonl')
+
+    batch_linker.run(DATA_PATH, single_path, workers=1, batch_size=2, log=lambda message: None)
+    written = batch_linker.run(DATA_PATH, pool_path, workers=2, batch_size=2, log=lambda message: None)
+    assert written == len(load_brief_pairs())
+
+    # Chunks finish in any order across workers, so compare by key
+    pooled = read_results(pool_path)
+    assert len(pooled) == written
+    assert {r['key']: r for r in pooled} == {r['key']: r for r in read_results(single_path)}
@@ -0,0 +1,30 @@
+from benchmarks.featureExtractorBenchmark import compare_results, run_benchmarks
+
+
+def test_benchmark_results_document():
+    results = run_benchmarks(repeat=1, stage_names=['extract_all_features', 'link_arguments_endpoint'])
+    assert results['meta']['encoder'] == 'stub'
+    assert set(results['stages']) == {'extract_all_features', 'link_arguments_endpoint'}
+    for stage in results['stages'].values():
+        assert stage['calls'] > 0
+        assert 0 < stage['min_s'] <= stage['median_s']
+
+
+def test_compare_flags_only_real_regressions():
+    baseline = {'stages': {
+        'slower': {'median_s': 0.100},
+        'noise': {'median_s': 0.0001},
+        'same': {'median_s': 0.050},
+        'removed': {'median_s': 1.0}
+    }}
+    current = {'stages': {
+        'slower': {'median_s': 0.140},
+        'noise': {'median_s': 0.0005},
+        'same': {'median_s': 0.055},
+        'new': {'median_s': 1.0}
+    }}
+    rows = {row[0]: row for row in compare_results(current, baseline, tolerance=0.25, min_delta_ms=1.0)}
+    assert set(rows) == {'slower', 'noise', 'same'}
+    assert rows['slower'][4]
+    assert not rows['noise'][4]
+    assert not rows['same'][4]
@@ -0,0 +1,151 @@
+import json
+import multiprocessing
+
+import numpy as np
+import pytest
+
+import app
+from benchmarks.segmenterBenchmark import corpus_text
+from MatchingEngine.briefStoreService import BriefStore, RegisteredBrief, SharedBriefStore
+from test_feature_extractor import load_brief_pairs, use_stub_models
+
+
+def make_brief(brief_id, size):
+    arguments = [{'heading': 'H', 'content': 'x' * size}]
+    return RegisteredBrief(brief_id, arguments, np.zeros((1, 4), dtype=np.float32),
+                           np.zeros((1, 4), dtype=np.float32), [], 'stub')
+
+
+def test_store_evicts_least_recently_used():
+    store = BriefStore(max_briefs=2, max_bytes=10000)
+    store.put(make_brief('a', 100))
+    store.put(make_brief('b', 100))
+    store.get('a')
+    store.put(make_brief('c', 100))
+    assert store.get('b') is None
+    assert store.get('a') is not None and store.get('c') is not None
+
+    store = BriefStore(max_briefs=10, max_bytes=2500)
+    for brief_id in 'abc':
+        store.put(make_brief(brief_id, 1000))
+    assert len(store) == 2 and store.stats()['evictions'] == 1
+
+
+def test_linking_registered_briefs_matches_inline_briefs():
+    sentence_model = use_stub_models()
+    entry = load_brief_pairs()[2]
+    client = app.app.test_client()
+
+    inline = client.post('/api/link-arguments', json={
+        'moving_brief': entry['moving_brief'],
+        'response_brief': entry['response_brief']
+    }).json
+
+    response = client.put('/api/briefs/moving-1', json={'brief_arguments': entry['moving_brief']['brief_arguments']})
+    assert response.status_code == 201
+    assert response.json['num_arguments'] == len(entry['moving_brief']['brief_arguments'])
+    assert client.put('/api/briefs/response-1', json=entry['response_brief']).status_code == 201
+
+    # Linking registered briefs only scores: nothing is encoded
+    encoded_before = sentence_model.texts_encoded
+    by_id = client.post('/api/link-arguments', json={'moving_brief_id': 'moving-1', 'response_brief_id': 'response-1'}).json
+    assert sentence_model.texts_encoded == encoded_before
+    assert [(l['moving_idx'], l['response_idx']) for l in by_id['links']] == \
+        [(l['moving_idx'], l['response_idx']) for l in inline['links']]
+    assert np.allclose([l['confidence'] for l in by_id['links']], [l['confidence'] for l in inline['links']])
+
+    # One registered side, one inline side
+    mixed = client.post('/api/link-arguments', json={
+        'moving_brief': {'brief_id': 'moving-1'},
+        'response_brief': entry['response_brief']
+    }).json
+    assert np.allclose([l['confidence'] for l in mixed['links']], [l['confidence'] for l in inline['links']])
+
+    streamed = client.post('/api/link-arguments', json={
+        'moving_brief_id': 'moving-1', 'response_brief_id': 'response-1', 'stream': 'ndjson'
+    })
+    records = [json.loads(line) for line in streamed.get_data(as_text=True).splitlines()]
+    assert sum(len(r['links']) for r in records if r['type'] == 'row') == len(inline['links'])
+
+
+def test_brief_endpoints():
+    use_stub_models()
+    client = app.app.test_client()
+
+    text = corpus_text()
+    response = client.put('/api/briefs/drafted', json={'text': text})
+    assert response.status_code == 201
+    registered = client.get('/api/briefs/drafted').json
+    assert registered['brief_arguments'] == client.post('/api/extract-arguments', json={
+        'moving_text': text, 'response_text': ''
+    }).json['moving_brief']['brief_arguments']
+
+    assert client.put('/api/briefs/drafted', json={'text': text}).json['replaced']
+    assert client.put('/api/briefs/bad', json={'brief_arguments': [{'heading': 'H'}]}).status_code == 400
+    assert client.post('/api/link-arguments', json={
+        'moving_brief_id': 'missing', 'response_brief_id': 'drafted'
+    }).status_code == 404
+
+    assert client.delete('/api/briefs/drafted').status_code == 200
+    assert client.get('/api/briefs/drafted').status_code == 404
+    assert client.delete('/api/briefs/drafted').status_code == 404
+
+
+def test_shared_store_is_seen_by_every_store_on_the_file(tmp_path):
+    path = str(tmp_path / 'briefs.sqlite3')
+    loaded, evicted = [], []
+    first = SharedBriefStore(path, max_briefs=2, max_bytes=10000)
+    second = SharedBriefStore(path, max_briefs=2, max_bytes=10000, on_evict=evicted.append, on_load=loaded.append)
+
+    assert not first.put(make_brief('a', 100))
+    brief = second.get('a')
+    assert brief.arguments == make_brief('a', 100).arguments and [b.brief_id for b in loaded] == ['a']
+    assert second.get('a') is brief and len(loaded) == 1
+
+    # Replacements and deletions through one store reach the other's cached copy
+    assert first.put(make_brief('a', 200))
+    assert second.get('a').nbytes == make_brief('a', 200).nbytes and len(loaded) == 2
+    assert first.delete('a')
+    assert second.get('a') is None and [b.brief_id for b in evicted] == ['a']
+
+    # The limits apply to the shared database
+    first.put(make_brief('b', 100))
+    second.put(make_brief('c', 100))
+    second.put(make_brief('d', 100))
+    assert first.get('b') is None and len(first) == 2 and first.stats()['bytes'] == second.stats()['bytes']
+
+
+def register_in_worker(path, brief_pairs):
+    """A second server worker: its own app state and store on the shared database"""
+    use_stub_models()
+    app.brief_store = SharedBriefStore(path, on_evict=app.forget_brief_terms, on_load=app.remember_brief_terms)
+    client = app.app.test_client()
+    moving = client.put('/api/briefs/moving', json=brief_pairs[2]['moving_brief'])
+    response = client.put('/api/briefs/response', json=brief_pairs[2]['response_brief'])
+    raise SystemExit(0 if moving.status_code == response.status_code == 201 else 1)
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason="Needs forked processes")
+def test_brief_registered_through_one_worker_links_through_another(tmp_path):
+    path = str(tmp_path / 'briefs.sqlite3')
+    brief_pairs = load_brief_pairs()
+    worker = multiprocessing.get_context('fork').Process(target=register_in_worker, args=(path, brief_pairs))
+    worker.start()
+    worker.join(60)
+    assert worker.exitcode == 0
+
+    use_stub_models()
+    app.brief_store = SharedBriefStore(path, on_evict=app.forget_brief_terms, on_load=app.remember_brief_terms)
+    client = app.app.test_client()
+    entry = brief_pairs[2]
+    inline = client.post('/api/link-arguments', json={
+        'moving_brief': entry['moving_brief'], 'response_brief': entry['response_brief']
+    }).json
+    response = client.post('/api/link-arguments', json={'moving_brief_id': 'moving', 'response_brief_id': 'response'})
+    assert response.status_code == 200
+    assert [(l['moving_idx'], l['response_idx']) for l in response.json['links']] == \
+        [(l['moving_idx'], l['response_idx']) for l in inline['links']]
+    assert np.allclose([l['confidence'] for l in response.json['links']], [l['confidence'] for l in inline['links']])
+
+    assert client.delete('/api/briefs/moving').status_code == 200
+    assert SharedBriefStore(path).get('moving') is None
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import app
+from test_feature_extractor import use_stub_models
+
+
+def test_import_defers_heavy_modules():
+    code = ("import sys, app; "
+            "print(sorted(m for m in ('sentence_transformers', 'torch', 'sklearn', 'scipy.optimize', 'scipy.sparse') "
+            "if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    assert result.stdout.strip().splitlines()[-1] == '[]'
+
+
+def test_background_loading_reports_progress(monkeypatch):
+    app.model = None
+    release = threading.Event()
+
+    def slow_load():
+        app.set_load_phase('sentence_model')
+        release.wait(5)
+        use_stub_models()
+        return True
+
+    monkeypatch.setattr(app, '_load_models', slow_load)
+    client = app.app.test_client()
+    thread = app.start_model_loading()
+    try:
+        deadline = time.monotonic() + 5
+        while app.model_loading['phase'] != 'sentence_model' and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert app.start_model_loading() is thread
+
+        health = client.get('/api/health').json
+        assert health['models_loaded'] is False
+        assert health['model_loading']['phase'] == 'sentence_model'
+        assert health['model_loading']['elapsed_seconds'] >= 0
+
+        info = client.get('/api/model-info')
+        assert info.status_code == 503 and info.json['model_loading']['phase'] == 'sentence_model'
+        assert client.get('/api/ready').status_code == 503
+
+        # Argument extraction needs no models, so it is served during the load
+        extracted = client.post('/api/extract-arguments', json={
+            'moving_text': "BACKGROUND\n\nThe facts are these. They are many. Indeed.\n\nARGUMENT\n\nThe law is that. It applies. Clearly.",
+            'response_text': ''
+        })
+        assert extracted.status_code == 200
+        assert extracted.json['moving_brief']['brief_arguments']
+    finally:
+        release.set()
+        thread.join(5)
+
+    assert client.get('/api/ready').status_code == 200
+    status = client.get('/api/health').json['model_loading']
+    assert status['phase'] == 'ready' and status['error'] is None
+    assert client.get('/api/model-info').status_code == 200
+
+
+def test_failed_background_load_is_reported(monkeypatch):
+    app.model = None
+
+    def failing_load():
+        app.model_loading['error'] = 'model download failed'
+        return False
+
+    monkeypatch.setattr(app, '_load_models', failing_load)
+    app.start_model_loading().join(5)
+    status = app.app.test_client().get('/api/health').json['model_loading']
+    assert status['phase'] == 'failed' and status['error'] == 'model download failed'
+    use_stub_models()
@@ -0,0 +1,128 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+import app
+from MatchingEngine.counterArgumentIndexService import CounterArgumentIndex
+from test_feature_extractor import load_brief_pairs, use_stub_models
+
+
+def random_index(size=2000, dim=32, seed=0):
+    # Clustered vectors, like topic-grouped argument embeddings
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(50, dim))
+    vectors = (centers[rng.integers(50, size=size)] + 0.3 * rng.normal(size=(size, dim))).astype(np.float32)
+    metadata = [{'brief_id': f'b{i // 10}', 'position': i % 10} for i in range(size)]
+    index = CounterArgumentIndex()
+    index.build(vectors, metadata, n_lists=40)
+    return index, vectors
+
+
+def test_search_recalls_exact_neighbors():
+    index, vectors = random_index()
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    rng = np.random.default_rng(1)
+    recalled = 0
+    for query in vectors[rng.integers(len(vectors), size=20)] + 0.1 * rng.normal(size=(20, vectors.shape[1])):
+        exact = set(np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:10])
+        ids, scores = index.search(query, k=10, n_probe=10)
+        assert list(scores) == sorted(scores, reverse=True)
+        recalled += len(exact & set(ids))
+    assert recalled / 200 > 0.8
+
+
+def test_save_load_and_incremental_add(tmp_path):
+    index, vectors = random_index(size=500)
+    index.save(str(tmp_path))
+    loaded = CounterArgumentIndex.load(str(tmp_path))
+    query = vectors[7]
+    assert np.array_equal(index.search(query, 5)[0], loaded.search(query, 5)[0])
+
+    # Already indexed entries are skipped; new ones become searchable
+    assert loaded.add(vectors[:3], [{'brief_id': 'b0', 'position': i} for i in range(3)]) == 0
+    new_vector = np.ones(vectors.shape[1], dtype=np.float32)
+    assert loaded.add(new_vector[None, :], [{'brief_id': 'new', 'position': 0}]) == 1
+    ids, _ = loaded.search(new_vector, 1, n_probe=1)
+    assert loaded.metadata[ids[0]]['brief_id'] == 'new'
+
+
+def test_search_counterarguments_endpoint(tmp_path):
+    use_stub_models()
+    app.counterargument_index = CounterArgumentIndex()
+    app.counterargument_index_path = str(tmp_path)
+    client = app.app.test_client()
+    brief_pairs = load_brief_pairs()
+
+    response = client.post('/api/counterargument-index', json={'brief_pairs': brief_pairs})
+    assert response.status_code == 200
+    indexed = sum(len(entry['response_brief']['brief_arguments']) for entry in brief_pairs)
+    assert response.json['index_size'] == indexed
+
+    argument = brief_pairs[3]['moving_brief']['brief_arguments'][0]
+    response = client.post('/api/search-counterarguments', json={'argument': argument, 'top_k': 5})
+    assert response.status_code == 200
+    results = response.json['results']
+    assert len(results) == 5
+    confidences = [r['confidence'] for r in results]
+    assert confidences == sorted(confidences, reverse=True)
+    assert CounterArgumentIndex.load(str(tmp_path)).metadata == app.counterargument_index.metadata
+
+
+def test_briefs_without_brief_id_do_not_collide():
+    use_stub_models()
+    app.counterargument_index = CounterArgumentIndex()
+    briefs = [{'brief_arguments': entry['response_brief']['brief_arguments']} for entry in load_brief_pairs()[:3]]
+    expected = sum(len(brief['brief_arguments']) for brief in briefs)
+
+    assert app.index_briefs(briefs, sources=['a.json#0', 'a.json#1', 'a.json#2']) == expected
+    # Without sources each brief is keyed by its content, so re-adding the same briefs is a no-op
+    app.counterargument_index = CounterArgumentIndex()
+    assert app.index_briefs(briefs) == expected
+    assert app.index_briefs(briefs) == 0
+    assert len(app.counterargument_index) == expected
+
+
+def test_workers_sharing_a_saved_index_keep_each_others_entries(tmp_path):
+    use_stub_models()
+    app.counterargument_index_path = str(tmp_path)
+    client = app.app.test_client()
+    brief_pairs = load_brief_pairs()
+
+    # Two workers that loaded the (empty) index before either added to it
+    first, second = CounterArgumentIndex(), CounterArgumentIndex()
+    app.counterargument_index = first
+    assert client.post('/api/counterargument-index', json={'brief_pairs': brief_pairs[:2]}).status_code == 200
+    app.counterargument_index = second
+    response = client.post('/api/counterargument-index', json={'brief_pairs': brief_pairs[2:4]})
+    indexed = sum(len(entry['response_brief']['brief_arguments']) for entry in brief_pairs[:4])
+    assert response.json['index_size'] == indexed
+    assert len(CounterArgumentIndex.load(str(tmp_path))) == indexed
+
+    # The first worker notices the newer save before searching
+    app.counterargument_index = first
+    assert first.is_stale(str(tmp_path))
+    argument = brief_pairs[3]['moving_brief']['brief_arguments'][0]
+    response = client.post('/api/search-counterarguments', json={'argument': argument, 'top_k': 3})
+    assert response.json['index_size'] == indexed
+    assert not app.counterargument_index.is_stale(str(tmp_path))
+
+
+def add_one_entry(path, worker):
+    with CounterArgumentIndex.locked(path):
+        index = CounterArgumentIndex.load(path) if CounterArgumentIndex.stored_signature(path) else CounterArgumentIndex()
+        index.add(np.full((1, 4), worker + 1.0, dtype=np.float32), [{'brief_id': f'w{worker}', 'position': 0}])
+        index.save(path)
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason="Needs forked processes")
+def test_concurrent_adds_from_processes_are_all_saved(tmp_path):
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=add_one_entry, args=(str(tmp_path), worker)) for worker in range(8)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+    assert all(process.exitcode == 0 for process in processes)
+    stored = CounterArgumentIndex.load(str(tmp_path))
+    assert sorted(meta['brief_id'] for meta in stored.metadata) == [f'w{worker}' for worker in range(8)]
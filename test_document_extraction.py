@@ -0,0 +1,62 @@
+import io
+
+from fpdf import FPDF
+
+import app
+from benchmarks.segmenterBenchmark import corpus_text
+from DataProcessing.argumentSegmenterService import ArgumentSegmenter
+from DataProcessing.documentExtractionService import DocumentExtractor
+
+
+def make_pdf(pages):
+    pdf = FPDF()
+    pdf.set_font('Arial', size=11)
+    for i in range(pages):
+        pdf.add_page()
+        pdf.multi_cell(0, 6, f"ARGUMENT {i}\n\nPage {i} body. The claim fails under Rule 12(b)(6).")
+    return pdf.output(dest='S').encode('latin-1')
+
+
+def test_parallel_pdf_extraction_matches_serial():
+    data = make_pdf(12)
+    serial = DocumentExtractor(max_workers=1).extract_text(data, 'brief.pdf')
+    extractor = DocumentExtractor(max_workers=3, min_pages_per_worker=2)
+    parallel = extractor.extract_text(data, 'brief.pdf')
+    # Workers are not forked from the (multi-threaded) server process
+    assert extractor.start_method in ('forkserver', 'spawn')
+    extractor.shutdown()
+    assert parallel == serial
+    assert 'Page 11 body' in parallel
+    assert serial.index('Page 3 body') < serial.index('Page 4 body')
+
+
+def test_extracted_text_is_cached_by_content():
+    data = make_pdf(2)
+    extractor = DocumentExtractor(max_workers=1)
+    first = extractor.extract_text(data, 'a.pdf')
+    assert extractor.extract_text(data, 'renamed.pdf') == first
+    stats = extractor.cache.stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1 and stats['entries'] == 1
+
+
+def test_multipart_upload_extracts_arguments():
+    text = corpus_text()
+    client = app.app.test_client()
+    response = client.post('/api/extract-arguments', data={
+        'moving_file': (io.BytesIO(text.encode('utf-8')), 'moving.txt'),
+        'response_text': text,
+        'include_text': 'true'
+    }, content_type='multipart/form-data')
+    assert response.status_code == 200
+    expected = list(ArgumentSegmenter().segment(text))
+    assert response.json['moving_brief']['brief_arguments'] == expected
+    assert response.json['response_brief']['brief_arguments'] == expected
+    assert response.json['moving_brief']['text'] == text
+
+    pdf_response = client.post('/api/extract-arguments', data={
+        'moving_file': (io.BytesIO(make_pdf(3)), 'moving.pdf'),
+        'include_text': '1'
+    }, content_type='multipart/form-data')
+    assert pdf_response.status_code == 200
+    assert 'Page 2 body' in pdf_response.json['moving_brief']['text']
+    assert pdf_response.json['response_brief']['brief_arguments'] == []
@@ -0,0 +1,49 @@
+import numpy as np
+
+import app
+from MatchingEngine.embeddingCacheService import EmbeddingCache
+from test_feature_extractor import StubSentenceModel, load_brief_pairs
+
+
+def test_lru_eviction_respects_byte_budget():
+    vector = np.ones(16, dtype=np.float32)
+    cache = EmbeddingCache(max_bytes=3 * vector.nbytes)
+    keys = [EmbeddingCache.make_key('stub', text, 'heading') for text in ['a', 'b', 'c', 'd']]
+    for key in keys[:3]:
+        cache.put(key, vector)
+
+    # Touch 'a' so 'b' becomes the least recently used entry
+    assert cache.get(keys[0]) is not None
+    cache.put(keys[3], vector)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is not None
+    stats = cache.stats()
+    assert stats['bytes'] <= stats['max_bytes']
+    assert stats['evictions'] == 1
+    assert stats['hits'] == 2 and stats['misses'] == 1
+
+
+def test_repeated_text_is_not_reencoded():
+    sentence_model = StubSentenceModel()
+    cache = EmbeddingCache()
+    extractor = app.ArgumentFeatureExtractor(sentence_model, cache, 'stub')
+    entry = load_brief_pairs()[0]
+    moving_args = entry['moving_brief']['brief_arguments']
+    response_args = entry['response_brief']['brief_arguments']
+
+    first = extractor.extract_feature_matrix(moving_args, response_args)
+    encoded = sentence_model.texts_encoded
+    second = extractor.extract_feature_matrix(moving_args, response_args)
+
+    assert sentence_model.texts_encoded == encoded
+    assert np.allclose(first['semantic_similarity'], second['semantic_similarity'])
+    assert np.allclose(extractor.get_heading_embedding(moving_args[0]['heading']),
+                       sentence_model.encode(moving_args[0]['heading']))
+
+
+def test_health_reports_cache_counters():
+    app.embedding_cache = EmbeddingCache()
+    response = app.app.test_client().get('/api/health')
+    assert response.status_code == 200
+    assert set(response.json['embedding_cache']) >= {'hits', 'misses', 'evictions', 'bytes', 'max_bytes'}
@@ -0,0 +1,48 @@
+import threading
+import time
+
+import numpy as np
+
+from MatchingEngine.encodeSchedulerService import EncodeScheduler
+from Monitoring.metricsService import Histogram
+from test_feature_extractor import StubSentenceModel
+
+
+def test_concurrent_callers_share_batches_and_get_their_own_rows():
+    sentence_model = StubSentenceModel()
+    queue_wait = Histogram('encode_queue_wait_seconds', 'Queue wait')
+    batch_size = Histogram('encode_batch_texts', 'Batch size', buckets=(1, 8, 64))
+    scheduler = EncodeScheduler(sentence_model, max_batch_size=64, max_wait_ms=50,
+                                queue_wait_histogram=queue_wait, batch_size_histogram=batch_size)
+    inputs = [[f"text {i} {j}" for j in range(3)] for i in range(8)]
+    outputs = [None] * len(inputs)
+
+    def call(i):
+        outputs[i] = scheduler.encode(inputs[i])
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(inputs))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for texts, output in zip(inputs, outputs):
+        assert np.array_equal(output, sentence_model.encode(texts))
+    stats = scheduler.stats()
+    assert stats['requests'] == 8 and stats['texts'] == 24
+    assert stats['batches'] < 8
+    assert queue_wait.count() == 8 and batch_size.count() == stats['batches']
+
+
+def test_full_batch_does_not_wait_and_single_text_returns_vector():
+    sentence_model = StubSentenceModel()
+    scheduler = EncodeScheduler(sentence_model, max_batch_size=2, max_wait_ms=2000)
+
+    # Already at max_batch_size, so it is encoded without waiting out max_wait_ms
+    start = time.perf_counter()
+    assert scheduler.encode(["x", "y", "z"]).shape == (3, sentence_model.dim)
+    assert time.perf_counter() - start < 1.0
+
+    scheduler.max_wait = 0.001
+    vector = scheduler.encode("a single heading")
+    assert np.array_equal(vector, sentence_model.encode("a single heading"))
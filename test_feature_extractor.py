@@ -0,0 +1,236 @@
+import json
+import os
+
+import numpy as np
+
+import app
+from benchmarks.stubEncoder import StubSentenceModel
+from MatchingEngine.briefStoreService import BriefStore
+from MatchingEngine.linearScorerService import LinearScorer
+from MatchingEngine.pairScoreCacheService import PairScoreCache
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), 'DataSource', 'stanford_hackathon_brief_pairs.json')
+
+
+def load_brief_pairs():
+    with open(DATA_PATH, 'r') as f:
+        return json.load(f)
+
+
+def use_stub_models():
+    """Point the app globals at the stub encoder and the shipped classifier weights"""
+    sentence_model = StubSentenceModel()
+    app.sentence_model = sentence_model
+    app.feature_extractor = app.ArgumentFeatureExtractor(sentence_model)
+    app.brief_store = BriefStore(on_evict=app.forget_brief_terms)
+    app.pair_score_cache = PairScoreCache()
+    app.feature_cols = ['semantic_similarity', 'heading_similarity', 'citation_overlap', 'entity_overlap', 'term_overlap']
+    app.model = LinearScorer.load(os.path.join(app.model_path, 'model_weights.json'))
+    return sentence_model
+
+
+def test_feature_matrix_matches_pairwise_features():
+    extractor = app.ArgumentFeatureExtractor(StubSentenceModel())
+    for entry in load_brief_pairs()[:4]:
+        moving_args = entry['moving_brief']['brief_arguments']
+        response_args = entry['response_brief']['brief_arguments']
+        matrix = extractor.extract_feature_matrix(moving_args, response_args)
+        for m_idx, moving_arg in enumerate(moving_args):
+            for r_idx, response_arg in enumerate(response_args):
+                features = extractor.extract_all_features(moving_arg, response_arg)
+                for name, value in features.items():
+                    assert np.isclose(matrix[name][m_idx, r_idx], value, atol=1e-6), name
+
+
+def test_feature_matrix_encodes_each_text_once():
+    sentence_model = StubSentenceModel()
+    extractor = app.ArgumentFeatureExtractor(sentence_model)
+    entry = load_brief_pairs()[5]
+    moving_args = entry['moving_brief']['brief_arguments']
+    response_args = entry['response_brief']['brief_arguments']
+    extractor.extract_feature_matrix(moving_args, response_args)
+    assert sentence_model.texts_encoded == 2 * (len(moving_args) + len(response_args))
+
+
+def test_link_arguments_endpoint():
+    use_stub_models()
+    entry = load_brief_pairs()[5]
+    client = app.app.test_client()
+    response = client.post('/api/link-arguments', json={
+        'moving_brief': entry['moving_brief'],
+        'response_brief': entry['response_brief'],
+        'threshold': 0.3,
+        'max_links_per_arg': 2
+    })
+    assert response.status_code == 200
+    result = response.json
+    confidences = [link['confidence'] for link in result['links']]
+    assert confidences == sorted(confidences, reverse=True)
+    assert all(c >= 0.3 for c in confidences)
+
+
+def test_jaccard_matrix_matches_set_jaccard():
+    moving_sets = [{'a', 'b', 'c'}, set(), {'d'}]
+    response_sets = [{'b', 'c', 'e'}, {'d'}, set()]
+    matrix = app.ArgumentFeatureExtractor.jaccard_matrix(moving_sets, response_sets)
+    expected = [[0.5, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 1.0, 0.0]]
+    assert np.array_equal(matrix, np.array(expected))
+
+
+def test_batch_endpoint_matches_single_pair_calls():
+    use_stub_models()
+    brief_pairs = load_brief_pairs()
+    client = app.app.test_client()
+    batch = [dict(entry, threshold=0.3) for entry in brief_pairs]
+    batch[1] = dict(batch[1], max_links_per_arg=1)
+    response = client.post('/api/link-arguments/batch', json={'brief_pairs': batch})
+    assert response.status_code == 200
+    results = response.json['results']
+    assert len(results) == len(brief_pairs)
+
+    for entry, result in zip(batch, results):
+        single = client.post('/api/link-arguments', json={
+            'moving_brief': entry['moving_brief'],
+            'response_brief': entry['response_brief'],
+            'threshold': entry['threshold'],
+            'max_links_per_arg': entry.get('max_links_per_arg', 5)
+        }).json
+        assert result['brief_id'] == entry['moving_brief']['brief_id']
+        assert result['response_brief_id'] == entry['response_brief']['brief_id']
+        assert [(l['moving_heading'], l['response_heading']) for l in result['links']] == \
+            [(l['moving_heading'], l['response_heading']) for l in single['links']]
+        assert np.allclose([l['confidence'] for l in result['links']], [l['confidence'] for l in single['links']])
+
+
+def test_batch_endpoint_reports_invalid_pairs():
+    use_stub_models()
+    entry = load_brief_pairs()[0]
+    response = app.app.test_client().post('/api/link-arguments/batch', json=[
+        entry,
+        {'moving_brief': {'brief_id': 'broken'}, 'response_brief': {}},
+        'not a pair'
+    ])
+    assert response.status_code == 200
+    results = response.json['results']
+    assert len(results) == 3
+    assert 'links' in results[0]
+    assert results[1]['brief_id'] == 'broken' and 'error' in results[1]
+    assert 'error' in results[2]
+
+
+def test_batch_endpoint_links_one_moving_brief_against_several_responses():
+    use_stub_models()
+    brief_pairs = load_brief_pairs()
+    moving_brief = brief_pairs[0]['moving_brief']
+    batch = [{'moving_brief': moving_brief, 'response_brief': entry['response_brief']} for entry in brief_pairs[:3]]
+    response = app.app.test_client().post('/api/link-arguments/batch', json={'brief_pairs': batch})
+    assert response.status_code == 200
+    results = response.json['results']
+    assert [result['response_brief_id'] for result in results] == \
+        [entry['response_brief']['brief_id'] for entry in brief_pairs[:3]]
+    assert all(result['brief_id'] == moving_brief['brief_id'] and 'links' in result for result in results)
+
+
+def test_link_arguments_optimal_assignment():
+    use_stub_models()
+    entry = load_brief_pairs()[5]
+    response = app.app.test_client().post('/api/link-arguments', json={
+        'moving_brief': entry['moving_brief'],
+        'response_brief': entry['response_brief'],
+        'threshold': 0.0,
+        'assignment': 'optimal'
+    })
+    assert response.status_code == 200
+    links = response.json['links']
+    assert len(links) == min(len(entry['moving_brief']['brief_arguments']),
+                             len(entry['response_brief']['brief_arguments']))
+    assert len({l['response_idx'] for l in links}) == len(links)
+
+
+def test_ready_reports_model_state():
+    client = app.app.test_client()
+    app.model = None
+    assert client.get('/api/ready').status_code == 503
+    use_stub_models()
+    response = client.get('/api/ready')
+    assert response.status_code == 200 and response.json['ready'] is True
+
+
+def test_concurrent_first_requests_load_models_once(monkeypatch):
+    import threading
+    import time
+
+    app.model = None
+    loads = []
+
+    def fake_load():
+        loads.append(1)
+        time.sleep(0.05)
+        use_stub_models()
+        return True
+
+    monkeypatch.setattr(app, '_load_models', fake_load)
+    threads = [threading.Thread(target=app.ensure_models_loaded) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+
+
+def test_chunked_encoding_pools_bounded_chunks():
+    sentence_model = StubSentenceModel()
+    sentence_model.max_seq_length = 64
+    extractor = app.ArgumentFeatureExtractor(sentence_model, argument_encoding='chunked', max_chunks_per_argument=3)
+    words = [f"word{i}" for i in range(1000)]
+    long_arg = {'heading': 'ARGUMENT', 'content': ' '.join(words)}
+    short_arg = {'heading': 'BACKGROUND', 'content': 'Short facts.'}
+
+    chunks = extractor.get_argument_chunks(long_arg)
+    assert len(chunks) == 3
+    assert all(chunk.startswith('ARGUMENT ARGUMENT ') for chunk in chunks)
+    assert all(len(chunk.split()) <= 62 for chunk in chunks)
+    assert chunks[1].split()[2] == words[60]
+    assert extractor.get_argument_chunks(short_arg) == ['BACKGROUND BACKGROUND Short facts.']
+
+    # A heading that would fill the window is cut so every chunk still fits with content
+    long_heading_arg = {'heading': ' '.join(f"HEADING{i}" for i in range(100)), 'content': long_arg['content']}
+    long_heading_chunks = extractor.get_argument_chunks(long_heading_arg)
+    assert all(len(chunk.split()) <= 62 for chunk in long_heading_chunks)
+    assert all(len([w for w in chunk.split() if w.startswith('word')]) >= 31 for chunk in long_heading_chunks)
+
+    embeddings = extractor.get_argument_embeddings([long_arg, short_arg])
+    assert np.allclose(embeddings[0], sentence_model.encode(chunks).mean(axis=0))
+    assert np.allclose(embeddings[1], sentence_model.encode('BACKGROUND BACKGROUND Short facts.'))
+
+    max_extractor = app.ArgumentFeatureExtractor(sentence_model, argument_encoding='chunked', chunk_pooling='max',
+                                                 max_chunks_per_argument=3)
+    assert np.allclose(max_extractor.get_argument_embedding(long_arg), sentence_model.encode(chunks).max(axis=0))
+
+
+def test_link_arguments_streams_rows_then_summary():
+    use_stub_models()
+    entry = load_brief_pairs()[5]
+    payload = {
+        'moving_brief': entry['moving_brief'],
+        'response_brief': entry['response_brief'],
+        'threshold': 0.3,
+        'max_links_per_arg': 2
+    }
+    client = app.app.test_client()
+    full = client.post('/api/link-arguments', json=payload).json
+
+    response = client.post('/api/link-arguments', json=dict(payload, stream='ndjson'))
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    rows, summary = records[:-1], records[-1]
+    assert [r['moving_idx'] for r in rows] == list(range(len(entry['moving_brief']['brief_arguments'])))
+    assert summary['type'] == 'summary' and summary['total_links'] == len(full['links'])
+
+    streamed = sorted((l['moving_idx'], l['response_idx']) for r in rows for l in r['links'])
+    assert streamed == sorted((l['moving_idx'], l['response_idx']) for l in full['links'])
+
+    response = client.post('/api/link-arguments', json=payload, headers={'Accept': 'text/event-stream'})
+    assert response.mimetype == 'text/event-stream'
+    assert response.get_data(as_text=True).rstrip().split('\n\n')[-1].startswith('event: summary')
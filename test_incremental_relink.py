@@ -0,0 +1,88 @@
+import copy
+import hashlib
+import tracemalloc
+
+import numpy as np
+
+import app
+from test_feature_extractor import load_brief_pairs, use_stub_models
+
+
+def link(client, moving_args, response_args, **options):
+    return client.post('/api/link-arguments', json=dict({
+        'moving_brief': {'brief_arguments': moving_args},
+        'response_brief': {'brief_arguments': response_args},
+        'threshold': 0.0
+    }, **options)).json
+
+
+def test_relink_recomputes_only_changed_rows_and_columns():
+    use_stub_models()
+    entry = load_brief_pairs()[4]
+    moving_args = entry['moving_brief']['brief_arguments']
+    response_args = entry['response_brief']['brief_arguments']
+    client = app.app.test_client()
+
+    first = link(client, moving_args, response_args, incremental=True)
+    assert first['changes']['recomputed_pairs'] == len(moving_args) * len(response_args)
+
+    edited_moving = copy.deepcopy(moving_args)
+    edited_moving[1]['content'] += ' The statute of limitations bars this claim.'
+    edited_response = copy.deepcopy(response_args)
+    edited_response[0]['heading'] = 'REVISED ' + edited_response[0]['heading']
+
+    relinked = link(client, edited_moving, edited_response, previous_hashes=first['argument_hashes'])
+    changes = relinked['changes']
+    assert changes['moving_idx'] == [1] and changes['response_idx'] == [0]
+    assert changes['recomputed_pairs'] == len(response_args) + len(moving_args) - 1
+    assert changes['reused_pairs'] == (len(moving_args) - 1) * (len(response_args) - 1)
+    assert all(l['moving_idx'] == 1 or l['response_idx'] == 0 for l in changes['changed_links'])
+
+    # Same links and scores as linking the edited briefs from scratch
+    full = link(client, edited_moving, edited_response)
+    assert 'changes' not in full
+    assert [(l['moving_idx'], l['response_idx']) for l in relinked['links']] == \
+        [(l['moving_idx'], l['response_idx']) for l in full['links']]
+    assert np.allclose([l['confidence'] for l in relinked['links']], [l['confidence'] for l in full['links']])
+
+
+def test_relink_recomputes_evicted_scores():
+    use_stub_models()
+    entry = load_brief_pairs()[0]
+    moving_args = entry['moving_brief']['brief_arguments']
+    response_args = entry['response_brief']['brief_arguments']
+    client = app.app.test_client()
+
+    first = link(client, moving_args, response_args, incremental=True)
+    app.pair_score_cache = app.PairScoreCache()
+    relinked = link(client, moving_args, response_args, previous_hashes=first['argument_hashes'])
+    assert relinked['changes']['moving_idx'] == [] and relinked['changes']['response_idx'] == []
+    assert relinked['changes']['recomputed_pairs'] == len(moving_args) * len(response_args)
+    assert np.allclose([l['confidence'] for l in relinked['links']], [l['confidence'] for l in first['links']])
+
+
+def test_pair_score_cache_is_bounded_by_bytes():
+    cache = app.PairScoreCache(max_bytes=10 * app.PairScoreCache.ENTRY_BYTES)
+    cache.put_many(((f"m{i}", f"r{i}"), i / 15) for i in range(15))
+    stats = cache.stats()
+    assert stats['entries'] == 10 and stats['evictions'] == 5
+    assert stats['bytes'] <= stats['max_bytes']
+    # Least recently used pairs went first
+    assert cache.get_many([("m0", "r0"), ("m14", "r14")]) == [None, 14 / 15]
+
+
+def test_pair_score_cache_entry_bytes_bound_real_entries():
+    cache = app.PairScoreCache()
+    count = 20000
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        # Keys built as the linker builds them, so only what the cache keeps stays allocated
+        cache.put_many(((hashlib.sha1(b'm%d' % i).hexdigest()[:16], hashlib.sha1(b'r%d' % i).hexdigest()[:16], 0),
+                        i / count) for i in range(count))
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    stats = cache.stats()
+    assert stats['entries'] == count
+    assert used <= stats['bytes']
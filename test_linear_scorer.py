@@ -0,0 +1,61 @@
+import os
+import pickle
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import app
+from MatchingEngine.linearScorerService import LinearScorer, export_model, parity_inputs
+from test_feature_extractor import use_stub_models
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'legal_argument_linker_model')
+
+
+def load_pipeline():
+    with open(os.path.join(MODEL_DIR, 'model.pkl'), 'rb') as f:
+        return pickle.load(f)
+
+
+def test_shipped_weights_match_pickled_pipeline():
+    pipeline = load_pipeline()
+    scorer = LinearScorer.load(os.path.join(MODEL_DIR, 'model_weights.json'))
+    X = parity_inputs(len(scorer.feature_cols), n_random=2000, seed=1)
+    assert scorer.parity_error(pipeline, X) < 1e-9
+    assert scorer.predict_proba(X).shape == (len(X), 2)
+
+
+def test_export_round_trip(tmp_path):
+    pipeline = load_pipeline()
+    feature_cols = LinearScorer.load(os.path.join(MODEL_DIR, 'model_weights.json')).feature_cols
+    path = str(tmp_path / 'weights.json')
+    scorer = export_model(pipeline, feature_cols, path)
+    loaded = LinearScorer.load(path)
+    assert loaded.model_version == scorer.model_version
+    assert loaded.metadata['parity_max_abs_error'] < 1e-9
+    X = np.random.default_rng(0).random((50, len(feature_cols)))
+    np.testing.assert_array_equal(loaded.predict_proba(X), scorer.predict_proba(X))
+
+
+def test_export_rejects_unsupported_pipeline(tmp_path):
+    from sklearn.tree import DecisionTreeClassifier
+
+    X = np.random.default_rng(0).random((40, 3))
+    tree = DecisionTreeClassifier().fit(X, X[:, 0] > 0.5)
+    with pytest.raises(ValueError):
+        export_model(tree, ['a', 'b', 'c'], str(tmp_path / 'weights.json'))
+    assert not os.path.exists(tmp_path / 'weights.json')
+
+
+def test_request_path_does_not_import_sklearn():
+    code = "import sys, app; print('sklearn' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    assert result.stdout.strip().splitlines()[-1] == 'False'
+
+
+def test_model_info_reports_model_version():
+    use_stub_models()
+    info = app.app.test_client().get('/api/model-info').json
+    assert info['model_version'] == app.model.model_version
@@ -0,0 +1,45 @@
+import numpy as np
+
+from MatchingEngine.linkSelectionService import select_link_indices
+
+
+def test_topk_limits_each_row_and_sorts_globally():
+    proba = np.array([[0.9, 0.8, 0.7, 0.1],
+                      [0.2, 0.95, 0.5, 0.6]])
+    rows, cols = select_link_indices(proba, threshold=0.55, max_links=2)
+    assert list(zip(rows, cols)) == [(1, 1), (0, 0), (0, 1), (1, 3)]
+
+
+def test_topk_keys_on_index_not_heading():
+    # Two moving arguments would share a heading; each still gets its own quota
+    proba = np.array([[0.9, 0.8], [0.7, 0.6]])
+    rows, cols = select_link_indices(proba, threshold=0.0, max_links=1)
+    assert list(zip(rows, cols)) == [(0, 0), (1, 0)]
+
+
+def test_topk_breaks_ties_at_the_boundary_by_index():
+    proba = np.array([[0.5, 0.9, 0.5, 0.5, 0.5, 0.5],
+                      [0.5, 0.5, 0.5, 0.5, 0.5, 0.5]])
+    rows, cols = select_link_indices(proba, threshold=0.0, max_links=3)
+    assert list(zip(rows, cols)) == [(0, 1), (0, 0), (0, 2), (1, 0), (1, 1), (1, 2)]
+
+    # Same picks as a stable sort of each full row
+    rng = np.random.default_rng(0)
+    proba = rng.integers(0, 4, size=(50, 30)) / 4.0
+    rows, cols = select_link_indices(proba, threshold=0.25, max_links=5)
+    expected = set()
+    for row in range(len(proba)):
+        for col in np.argsort(-proba[row], kind='stable')[:5]:
+            if proba[row, col] >= 0.25:
+                expected.add((row, col))
+    assert set(zip(rows.tolist(), cols.tolist())) == expected
+
+
+def test_optimal_assignment_is_one_to_one_and_maximal():
+    proba = np.array([[0.9, 0.85, 0.1],
+                      [0.88, 0.2, 0.1],
+                      [0.3, 0.3, 0.35]])
+    rows, cols = select_link_indices(proba, threshold=0.4, max_links=5, assignment='optimal')
+    # Greedy would take (0, 0) and strand row 1; the matching pairs 0-1 and 1-0
+    assert sorted(zip(rows, cols)) == [(0, 1), (1, 0)]
+    assert len(set(rows)) == len(rows) and len(set(cols)) == len(cols)
@@ -0,0 +1,67 @@
+import app
+from Monitoring.metricsService import MetricsRegistry, StageTimer
+from test_feature_extractor import load_brief_pairs, use_stub_models
+
+
+def test_histogram_and_counter_text_format():
+    registry = MetricsRegistry()
+    latency = registry.histogram('stage_seconds', 'Stage latency', ['stage'], buckets=(0.1, 1.0))
+    events = registry.counter('events_total', 'Events')
+    latency.observe(0.05, stage='encode')
+    latency.observe(0.5, stage='encode')
+    events.inc(3)
+
+    text = registry.render()
+    assert '# TYPE stage_seconds histogram' in text
+    assert 'stage_seconds_bucket{stage="encode",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="encode",le="1"} 2' in text
+    assert 'stage_seconds_bucket{stage="encode",le="+Inf"} 2' in text
+    assert 'stage_seconds_count{stage="encode"} 2' in text
+    assert 'events_total 3' in text
+
+
+def test_collected_spans_are_observed_once_per_stage():
+    registry = MetricsRegistry()
+    timer = StageTimer(registry.histogram('stage_seconds', 'Stage latency', ['stage']))
+    with timer.collect() as timings:
+        for _ in range(3):
+            with timer.span('encode'):
+                pass
+    assert list(timings) == ['encode']
+    assert timer.histogram.count(stage='encode') == 1
+
+    with timer.span('encode'):
+        pass
+    assert timer.histogram.count(stage='encode') == 2
+
+
+def test_link_arguments_timings_and_metrics():
+    use_stub_models()
+    entry = load_brief_pairs()[0]
+    client = app.app.test_client()
+    pairs_before = app.pairs_scored.value()
+
+    response = client.post('/api/link-arguments', json={
+        'moving_brief': entry['moving_brief'],
+        'response_brief': entry['response_brief'],
+        'debug': True
+    })
+    timings = response.json['timings']
+    assert {'encode', 'text_features', 'feature_matrix', 'predict', 'select_links', 'total'} <= set(timings)
+    assert timings['total'] >= timings['encode']
+
+    pairs = len(entry['moving_brief']['brief_arguments']) * len(entry['response_brief']['brief_arguments'])
+    assert app.pairs_scored.value() - pairs_before == pairs
+
+    plain = client.post('/api/link-arguments', json={
+        'moving_brief': entry['moving_brief'],
+        'response_brief': entry['response_brief']
+    })
+    assert 'timings' not in plain.json
+
+    metrics = client.get('/api/metrics')
+    assert metrics.content_type.startswith('text/plain')
+    text = metrics.get_data(as_text=True)
+    assert 'argument_linker_stage_seconds_bucket{stage="predict",le="+Inf"}' in text
+    assert 'argument_linker_requests_total{endpoint="link_arguments",status="200"}' in text
+    assert 'argument_linker_prediction_fallbacks_total' in text
@@ -0,0 +1,132 @@
+import os
+
+import numpy as np
+
+import app
+import train_model
+from MatchingEngine.termIndexService import TermIndex, term_counts
+from test_feature_extractor import StubSentenceModel, load_brief_pairs, use_stub_models
+
+
+def corpus_contents():
+    return [arg['content'] for entry in load_brief_pairs()
+            for side in ('moving_brief', 'response_brief') for arg in entry[side]['brief_arguments']]
+
+
+def dense_tfidf_cosine(index, moving_texts, response_texts):
+    """Reference TF-IDF cosine over an explicit vocabulary, one pair at a time"""
+    def vector(text):
+        hashes, counts = term_counts(text)
+        return dict(zip(hashes.tolist(), (1.0 + np.log(counts)) * index.idf_for(hashes)))
+
+    def cosine(a, b):
+        dot = sum(weight * b.get(term, 0.0) for term, weight in a.items())
+        norm = np.sqrt(sum(w * w for w in a.values())) * np.sqrt(sum(w * w for w in b.values()))
+        return dot / norm if norm else 0.0
+
+    return np.array([[cosine(vector(m), vector(r)) for r in response_texts] for m in moving_texts])
+
+
+def test_cosine_matrix_matches_pairwise_reference():
+    contents = corpus_contents()
+    index = TermIndex.build(contents)
+    moving, response = contents[:6], contents[6:14] + ['']
+    matrix = index.cosine_matrix([term_counts(t) for t in moving], [term_counts(t) for t in response])
+    np.testing.assert_allclose(matrix, dense_tfidf_cosine(index, moving, response), atol=1e-6)
+    assert np.allclose(index.cosine_matrix([term_counts(contents[0])], [term_counts(contents[0])]), 1.0)
+    assert (matrix[:, -1] == 0).all()
+
+
+def test_common_terms_weigh_less_than_rare_terms():
+    index = TermIndex.build(['the motion is denied', 'the claim is barred', 'the laches doctrine'])
+    common, rare = index.idf_for(term_counts('the laches')[0])
+    assert common < rare
+
+
+def test_saved_index_is_memory_mapped(tmp_path):
+    index = TermIndex.build(corpus_contents(), metadata={'sources': ['corpus']})
+    index.save(str(tmp_path))
+    loaded = TermIndex.load(str(tmp_path))
+    assert isinstance(loaded.idf, np.memmap) and isinstance(loaded.term_hashes, np.memmap)
+    assert loaded.version == index.version and loaded.metadata['sources'] == ['corpus']
+    counts = [term_counts(text) for text in corpus_contents()[:5]]
+    np.testing.assert_allclose(loaded.cosine_matrix(counts, counts), index.cosine_matrix(counts, counts))
+
+
+def test_added_documents_update_statistics_once_per_key():
+    index = TermIndex.build(['the motion is denied', 'the claim is barred'])
+    index.idf_update_documents = 1
+    before = index.idf_for(term_counts('motion')[0])
+    assert index.add_documents('brief-1', ['motion to compel', 'motion in limine'])
+    assert not index.add_documents('brief-1', ['motion to compel', 'motion in limine'])
+    assert index.idf_for(term_counts('motion')[0]) < before
+    assert index.stats()['added_documents'] == 2
+
+    # Replacing a key's documents removes its earlier counts
+    assert index.add_documents('brief-1', ['claim'])
+    assert index.stats()['added_documents'] == 1
+    np.testing.assert_allclose(index.idf_for(term_counts('motion')[0]),
+                               TermIndex.smooth_idf(1, 3))
+
+
+def test_extractor_adds_tfidf_feature_matching_training_features():
+    index = TermIndex.build(corpus_contents())
+    extractor = app.ArgumentFeatureExtractor(StubSentenceModel(), term_index=index)
+    entry = load_brief_pairs()[3]
+    moving_args = entry['moving_brief']['brief_arguments']
+    response_args = entry['response_brief']['brief_arguments']
+    matrix = extractor.extract_feature_matrix(moving_args, response_args)
+    assert matrix['tfidf_cosine'].shape == (len(moving_args), len(response_args))
+    assert np.isclose(matrix['tfidf_cosine'][0, 0], extractor.extract_all_features(moving_args[0], response_args[0])['tfidf_cosine'])
+
+    use_stub_models()
+    app.feature_extractor = extractor
+    features, costs = train_model.featurize_pair(moving_args, response_args)
+    np.testing.assert_allclose(features['tfidf_cosine'], matrix['tfidf_cosine'], atol=1e-9)
+    assert 'tfidf_cosine' in costs
+    assert train_model.feature_cache_dir('cache', extractor).endswith(f"-terms{index.version}")
+
+
+def test_overlay_changes_reach_idf_in_batches_and_can_be_removed():
+    index = TermIndex.build(['the motion is denied', 'the claim is barred'])
+    index.idf_update_documents = 3
+    before = index.idf_for(term_counts('motion')[0])
+
+    # Two documents are pending: the weights (and idf_version) don't move yet
+    assert not index.add_documents('brief-1', ['motion to compel', 'motion in limine'])
+    assert index.idf_version == 0 and np.array_equal(index.idf_for(term_counts('motion')[0]), before)
+    assert index.add_documents('brief-2', ['motion to dismiss'])
+    assert index.idf_version == 1
+    np.testing.assert_allclose(index.idf_for(term_counts('motion')[0]), TermIndex.smooth_idf(4, 5))
+
+    # Removing keys takes their documents out again
+    assert not index.remove_documents('unknown')
+    index.remove_documents('brief-1')
+    assert index.remove_documents('brief-2')
+    assert index.stats()['added_documents'] == 0 and index.stats()['added_terms'] == 0
+    np.testing.assert_allclose(index.idf_for(term_counts('motion')[0]), before)
+
+
+def test_registered_briefs_count_towards_term_statistics():
+    use_stub_models()
+    index = TermIndex.load(os.path.join(app.model_path, 'term_index'), idf_update_documents=1)
+    app.feature_extractor = app.ArgumentFeatureExtractor(app.sentence_model, term_index=index)
+    app.brief_store = app.BriefStore(max_briefs=1, on_evict=app.forget_brief_terms)
+    client = app.app.test_client()
+
+    brief_pairs = load_brief_pairs()
+    arguments = brief_pairs[2]['moving_brief']['brief_arguments']
+    assert client.put('/api/briefs/draft', json={'brief_arguments': arguments}).status_code == 201
+    assert index.stats()['added_documents'] == len(arguments)
+    version = app.pair_score_version()
+    assert version == index.idf_version > 0
+    assert all(p.term_counts is not None for p in app.brief_store.get('draft').profiles)
+
+    # Evicting or deleting a brief takes its terms out of the statistics
+    other = brief_pairs[3]['moving_brief']['brief_arguments']
+    assert client.put('/api/briefs/other', json={'brief_arguments': other}).status_code == 201
+    assert app.brief_store.peek('draft') is None
+    assert index.stats()['added_documents'] == len(other)
+    assert client.delete('/api/briefs/other').status_code == 200
+    assert index.stats()['added_documents'] == 0
+    assert app.pair_score_version() > version
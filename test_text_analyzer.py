@@ -0,0 +1,55 @@
+import random
+
+import app
+from benchmarks.textAnalyzerBenchmark import separate_scans
+from DataProcessing.textAnalyzerService import LegalTextAnalyzer
+from test_feature_extractor import StubSentenceModel, load_brief_pairs
+
+
+def corpus_texts():
+    for entry in load_brief_pairs():
+        for side in ('moving_brief', 'response_brief'):
+            for arg in entry[side]['brief_arguments']:
+                yield arg['content']
+                yield arg['heading']
+
+
+def assert_matches_separate_scans(analyzer, text):
+    profile = analyzer.analyze(text)
+    assert (profile.citations, profile.entities, profile.key_terms) == separate_scans(text), repr(text)
+
+
+def test_profile_matches_separate_scans_on_corpus():
+    analyzer = LegalTextAnalyzer()
+    for text in corpus_texts():
+        assert_matches_separate_scans(analyzer, text)
+
+
+def test_overlapping_citations_match_separate_scans():
+    text = ("See 12 U.S. 5 F.2d 3 and Fed. R. Civ. P. 12(b)(6); 42 U.S.C. § 1983; "
+            "17 C.F.R. § 240.10b-5; 137 S.Ct. 2012; Brown v. Board Smith v. Jones.")
+    assert_matches_separate_scans(LegalTextAnalyzer(), text)
+
+
+def test_capitalized_phrases_match_separate_scans_across_tokens():
+    analyzer = LegalTextAnalyzer()
+    for text in ["Brown  County\nBoard of Education", "O'Brien Smith's Acme1 Corp", "(Supreme Court), Fed. R. Civ. P.",
+                 "Doe Roe_x Alpha Beta2 Gamma Delta", "eBay Inc. Élan Paris", "Acme Widget Co"]:
+        assert_matches_separate_scans(analyzer, text)
+
+    rng = random.Random(4)
+    alphabet = list("Aa Bb. U.S.C.F. v. 12 § (b)_1é'\n,-") + ['Smith', 'Jones', ' U.S. ', ' F.3d ', 'S.Ct.', ' v. ']
+    for _ in range(2000):
+        assert_matches_separate_scans(analyzer, ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 40))))
+
+
+def test_pairwise_overlap_features_use_text_profiles():
+    extractor = app.ArgumentFeatureExtractor(StubSentenceModel())
+    entry = load_brief_pairs()[1]
+    moving_arg = entry['moving_brief']['brief_arguments'][0]
+    response_arg = entry['response_brief']['brief_arguments'][0]
+    features = extractor.extract_all_features(moving_arg, response_arg)
+    moving, response = separate_scans(moving_arg['content']), separate_scans(response_arg['content'])
+    for name, moving_set, response_set in zip(('citation_overlap', 'entity_overlap', 'term_overlap'), moving, response):
+        expected = len(moving_set & response_set) / len(moving_set | response_set) if moving_set and response_set else 0.0
+        assert abs(features[name] - expected) < 1e-12
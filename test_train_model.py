@@ -0,0 +1,115 @@
+import json
+import pickle
+
+import numpy as np
+
+import app
+from MatchingEngine.linearScorerService import LinearScorer
+import train_model
+from test_feature_extractor import load_brief_pairs, use_stub_models
+
+
+def labelled_records():
+    """Brief pairs labelled with each moving argument's most similar response argument"""
+    records = load_brief_pairs()
+    for record in records:
+        moving_args = record['moving_brief']['brief_arguments']
+        response_args = record['response_brief']['brief_arguments']
+        similarity = app.feature_extractor.extract_feature_matrix(moving_args, response_args)['semantic_similarity']
+        record['true_links'] = [[moving_args[m]['heading'], response_args[int(similarity[m].argmax())]['heading']]
+                                for m in range(len(moving_args))]
+    return records
+
+
+def test_featurize_pair_matches_feature_matrix():
+    use_stub_models()
+    entry = load_brief_pairs()[3]
+    moving_args = entry['moving_brief']['brief_arguments']
+    response_args = entry['response_brief']['brief_arguments']
+    features, costs = train_model.featurize_pair(moving_args, response_args)
+    expected = app.feature_extractor.extract_feature_matrix(moving_args, response_args)
+    assert set(costs) == set(expected)
+    for name in expected:
+        assert np.allclose(features[name], expected[name], atol=1e-6), name
+
+
+def test_training_uses_split_and_feature_cache(tmp_path, monkeypatch):
+    use_stub_models()
+    records = labelled_records()
+    labels = train_model.load_labels(records)
+    cache_dir = str(tmp_path / 'cache')
+
+    classifier, report = train_model.train(records, labels, train_model.DEFAULT_FEATURE_COLS, cache_dir,
+                                           workers=2, log=lambda message: None)
+    assert report['featurized_brief_pairs'] == len(records)
+    assert report['brief_pairs'] == {'train': 8, 'test': 2}
+    assert report['metrics']['test']['pairs'] == sum(
+        len(r['moving_brief']['brief_arguments']) * len(r['response_brief']['brief_arguments'])
+        for r in records if r['split'] == 'test')
+    assert set(report['features']) == set(train_model.DEFAULT_FEATURE_COLS)
+    assert all('f1_drop' in entry and entry['extraction_seconds'] > 0 for entry in report['features'].values())
+
+    # Retraining a tweaked classifier reads every feature matrix from the cache
+    def fail(items):
+        raise AssertionError("feature matrix was rebuilt")
+    monkeypatch.setattr(train_model, 'featurize_records', fail)
+    _, cached_report = train_model.train(records, labels, ['semantic_similarity', 'heading_similarity'], cache_dir,
+                                         C=1.0, log=lambda message: None)
+    assert cached_report['featurized_brief_pairs'] == 0
+    assert cached_report['features']['semantic_similarity']['extraction_seconds'] == \
+        report['features']['semantic_similarity']['extraction_seconds']
+
+    output_dir = tmp_path / 'model'
+    train_model.write_model(classifier, report, str(output_dir))
+    with open(output_dir / 'model.pkl', 'rb') as f:
+        assert hasattr(pickle.load(f), 'predict_proba')
+    scorer = LinearScorer.load(str(output_dir / 'model_weights.json'))
+    assert scorer.model_version == report['model_version']
+    config = json.loads((output_dir / 'config.json').read_text())
+    assert config['feature_cols'] == train_model.DEFAULT_FEATURE_COLS
+    assert json.loads((output_dir / 'training_report.json').read_text())['feature_version'] == \
+        app.ArgumentFeatureExtractor.FEATURE_VERSION
+
+
+def test_unlabelled_eval_split_falls_back_to_cross_validation(tmp_path):
+    use_stub_models()
+    records = load_brief_pairs()
+    labels = train_model.load_labels(records)
+    assert [label is not None for label in labels] == [record['split'] == 'train' for record in records]
+
+    _, report = train_model.train(records, labels, train_model.DEFAULT_FEATURE_COLS, str(tmp_path),
+                                  log=lambda message: None)
+    (evaluation, metrics), = report['metrics'].items()
+    assert 'cross-validation' in evaluation
+    assert metrics['pairs'] == report['train_pairs']
+
+
+def test_unlabelled_records_are_rejected(tmp_path):
+    use_stub_models()
+    records = [record for record in load_brief_pairs() if 'true_links' not in record]
+    try:
+        train_model.train(records, train_model.load_labels(records), train_model.DEFAULT_FEATURE_COLS,
+                          str(tmp_path), log=lambda message: None)
+    except ValueError as e:
+        assert 'true_links' in str(e)
+    else:
+        raise AssertionError("expected a ValueError")
+
+
+def test_main_names_the_label_fields_before_loading_models(tmp_path, monkeypatch, capsys):
+    def fail():
+        raise AssertionError("models were loaded")
+    monkeypatch.setattr(app, 'ensure_models_loaded', fail)
+    records = [record for record in load_brief_pairs() if 'true_links' not in record]
+    path = tmp_path / 'pairs.json'
+    path.write_text(json.dumps(records))
+
+    assert train_model.main([str(path), '--output-dir', str(tmp_path)]) == 1
+    output = capsys.readouterr().out
+    assert "'true_links'" in output and '--labels' in output and f'0 of {len(records)}' in output
+
+    # Labels given in the wrong shape are reported by brief
+    labels = tmp_path / 'links.json'
+    labels.write_text(json.dumps({records[0]['moving_brief']['brief_id']: ['BACKGROUND', 'I. Facts']}))
+    assert train_model.main([str(path), '--labels', str(labels), '--output-dir', str(tmp_path)]) == 1
+    assert records[0]['moving_brief']['brief_id'] in capsys.readouterr().out
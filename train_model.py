@@ -0,0 +1,442 @@
+"""
+Train and evaluate the argument-link classifier over brief-pair records.
+
+Records are shaped like the entries of DataSource/stanford_hackathon_brief_pairs.json (a JSON
+array or JSONL) with a 'split' field ('train' / 'test') and labelled links as 'true_links',
+a list of [moving_heading, response_heading] pairs naming linked arguments by heading. Labels
+can also come from --labels, a JSON object mapping the moving brief_id to such a list:
+
+    {"X1Q6O43B7MO2": [["I. Likelihood of Success on the Merits", "<response heading>"], ...]}
+
+Only labelled records are used, and at least one must be in the train split. In the bundled
+file the 'train' records carry true_links and the 'test' ones don't, so it trains as is and
+is evaluated by cross-validation.
+
+Pairwise feature matrices are built across a process pool and cached per brief pair as
+compressed npz files (one array per feature, plus its extraction cost) under
+<cache-dir>/v<FEATURE_VERSION>-<encoder>/, so retraining after a classifier change only
+reads the cache. The trained pipeline is written to <output-dir>/model.pkl and exported to the
+model_weights.json artifact the server scores with, config.json is updated, and training_report.json holds per-feature extraction cost next to accuracy
+(including the F1 of the model retrained without each feature). Accuracy is measured on the
+--eval-split pairs if they are labelled, otherwise by cross-validation over the train pairs.
+
+Usage:
+    python train_model.py DataSource/stanford_hackathon_brief_pairs.json --workers 4
+    python train_model.py unlabelled_pairs.jsonl --labels links.json --workers 4
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+import app
+from batch_linker import init_worker, iter_records
+from MatchingEngine.linearScorerService import export_model
+from MatchingEngine.termIndexService import term_counts
+
+DEFAULT_FEATURE_COLS = ['semantic_similarity', 'heading_similarity', 'citation_overlap', 'entity_overlap', 'term_overlap']
+
+# Features that need extra artifacts: 'tfidf_cosine' needs the term index (build_term_index.py)
+FEATURE_COLS = DEFAULT_FEATURE_COLS + ['tfidf_cosine']
+
+
+def feature_cache_dir(cache_dir, extractor):
+    """Cache directory for this feature code version and encoder configuration"""
+    encoder = f"{extractor.model_name}-{extractor.argument_encoding}"
+    if extractor.argument_encoding == 'chunked':
+        encoder += f"-{extractor.chunk_pooling}{extractor.max_chunks_per_argument}"
+    if extractor.term_index is not None:
+        encoder += f"-terms{extractor.term_index.version}"
+    slug = ''.join(c if c.isalnum() or c in '.-_' else '_' for c in encoder)
+    return os.path.join(cache_dir, f"v{extractor.FEATURE_VERSION}-{slug}")
+
+
+def pair_key(record):
+    """Content hash of a brief pair's arguments (labels and split are not part of it)"""
+    arguments = [record['moving_brief']['brief_arguments'], record['response_brief']['brief_arguments']]
+    return hashlib.sha1(json.dumps(arguments, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def featurize_pair(moving_args, response_args):
+    """
+    Feature matrices of one brief pair, computed one feature at a time so the extraction
+    cost of each can be measured. Values match extract_feature_matrix.
+    """
+    extractor = app.feature_extractor
+    analyzer = extractor.text_analyzer
+    all_args = list(moving_args) + list(response_args)
+    moving, response = slice(0, len(moving_args)), slice(len(moving_args), len(all_args))
+    contents = [arg['content'] for arg in all_args]
+    features, costs = {}, {}
+
+    def timed(name, compute):
+        start = time.perf_counter()
+        features[name] = compute()
+        costs[name] = time.perf_counter() - start
+
+    def semantic():
+        embeddings = extractor.get_argument_embeddings(all_args)
+        return extractor.cosine_similarity_matrix(embeddings[moving], embeddings[response])
+
+    def heading():
+        embeddings = extractor.get_heading_embeddings([arg['heading'] for arg in all_args])
+        return extractor.cosine_similarity_matrix(embeddings[moving], embeddings[response])
+
+    def overlap(kind):
+        def compute():
+            sets = [getattr(profile, kind) for profile in profiles]
+            return extractor.jaccard_matrix(sets[moving], sets[response])
+        return compute
+
+    timed('semantic_similarity', semantic)
+    timed('heading_similarity', heading)
+
+    # One analyzer pass yields all three overlap features' sets; its cost is split evenly
+    start = time.perf_counter()
+    profiles = [analyzer.analyze(text) for text in contents]
+    profile_cost = (time.perf_counter() - start) / 3
+    for name, kind in (('citation_overlap', 'citations'), ('entity_overlap', 'entities'), ('term_overlap', 'key_terms')):
+        timed(name, overlap(kind))
+        costs[name] += profile_cost
+    if extractor.term_index is not None:
+        def tfidf():
+            counts = [term_counts(text) for text in contents]
+            return extractor.term_index.cosine_matrix(counts[moving], counts[response])
+        timed('tfidf_cosine', tfidf)
+    return features, costs
+
+
+def use_term_index():
+    """Compute 'tfidf_cosine' while featurizing (the server only does when its model uses it)"""
+    if app.term_index is None:
+        raise ValueError(f"Feature 'tfidf_cosine' needs a term index at {app.term_index_path}. Run build_term_index.py.")
+    app.feature_extractor.term_index = app.term_index
+
+
+def init_train_worker(with_term_index=False):
+    """Load the models once per worker process, with the term index if the parent uses it"""
+    init_worker()
+    if with_term_index:
+        use_term_index()
+
+
+def featurize_records(items):
+    """Featurize a chunk of (key, moving_args, response_args) items; runs in a worker process"""
+    return [(key,) + featurize_pair(moving_args, response_args) for key, moving_args, response_args in items]
+
+
+def save_features(path, features, costs):
+    arrays = dict(features)
+    arrays.update({f"cost__{name}": np.float64(cost) for name, cost in costs.items()})
+    tmp_path = path + '.tmp.npz'
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_features(path):
+    with np.load(path) as data:
+        features = {name: data[name] for name in data.files if not name.startswith('cost__')}
+        costs = {name[len('cost__'):]: float(data[name]) for name in data.files if name.startswith('cost__')}
+    return features, costs
+
+
+def build_feature_matrices(records, cache_dir, workers=1, batch_size=4, log=print):
+    """
+    Feature matrices and extraction costs for every record, read from the cache where possible.
+    Returns (list of (features, costs) per record, number of records featurized now).
+    """
+    directory = feature_cache_dir(cache_dir, app.feature_extractor)
+    os.makedirs(directory, exist_ok=True)
+
+    keys = [pair_key(record) for record in records]
+    paths = {key: os.path.join(directory, f"{key}.npz") for key in keys}
+    missing = {}
+    for key, record in zip(keys, records):
+        if not os.path.exists(paths[key]):
+            missing[key] = (key, record['moving_brief']['brief_arguments'], record['response_brief']['brief_arguments'])
+    log(f"{len(keys) - len(missing)} of {len(keys)} brief pairs cached in {directory}")
+
+    items = list(missing.values())
+    chunks = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    def save(results):
+        for chunk_results in results:
+            for key, features, costs in chunk_results:
+                save_features(paths[key], features, costs)
+
+    if workers <= 1 or len(chunks) <= 1:
+        save(featurize_records(chunk) for chunk in chunks)
+    else:
+        initializer = partial(init_train_worker, app.feature_extractor.term_index is not None)
+        with ProcessPoolExecutor(max_workers=workers, initializer=initializer) as executor:
+            save(executor.map(featurize_records, chunks))
+
+    return [load_features(paths[key]) for key in keys], len(items)
+
+
+def label_matrix(record, true_links):
+    """(M, N) 0/1 matrix of labelled links between the record's arguments"""
+    moving_args = record['moving_brief']['brief_arguments']
+    response_args = record['response_brief']['brief_arguments']
+    links = {(moving_heading, response_heading) for moving_heading, response_heading in true_links}
+    return np.array([[(m['heading'], r['heading']) in links for r in response_args] for m in moving_args],
+                    dtype=np.int64).reshape(len(moving_args), len(response_args))
+
+
+def stack_features(feature_matrices, feature_cols):
+    return np.concatenate([
+        np.stack([features[col].ravel() for col in feature_cols], axis=1)
+        for features in feature_matrices
+    ]) if feature_matrices else np.empty((0, len(feature_cols)))
+
+
+def make_classifier(C=0.1, smote_ratio=0.75):
+    """The shipped model: standardize, oversample positives with SMOTE, then logistic regression"""
+    from imblearn.pipeline import Pipeline
+    from imblearn.over_sampling import SMOTE
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+
+    steps = [('scaler', StandardScaler())]
+    if smote_ratio > 0:
+        steps.append(('smote', SMOTE(random_state=42, sampling_strategy=smote_ratio)))
+    steps.append(('classifier', LogisticRegression(C=C, max_iter=1000)))
+    return Pipeline(steps)
+
+
+def evaluate(y, proba, threshold):
+    """Pairwise accuracy, precision, recall, F1 and ROC AUC at the link threshold"""
+    from sklearn.metrics import accuracy_score, precision_recall_fscore_support, roc_auc_score
+
+    predicted = (proba >= threshold).astype(np.int64)
+    precision, recall, f1, _ = precision_recall_fscore_support(y, predicted, average='binary', zero_division=0)
+    return {
+        'pairs': int(len(y)),
+        'positives': int(y.sum()),
+        'accuracy': float(accuracy_score(y, predicted)),
+        'precision': float(precision),
+        'recall': float(recall),
+        'f1': float(f1),
+        'roc_auc': float(roc_auc_score(y, proba)) if 0 < y.sum() < len(y) else None
+    }
+
+
+def train(records, labels, feature_cols, cache_dir, train_split='train', eval_split='test',
+          C=0.1, smote_ratio=0.75, threshold=0.4, workers=1, log=print):
+    """Build (or load) features, fit the classifier on train_split and evaluate on eval_split"""
+    unknown = [col for col in feature_cols if col not in FEATURE_COLS]
+    if unknown:
+        raise ValueError(f"Unknown feature columns {unknown}. Expected some of {FEATURE_COLS}.")
+    if 'tfidf_cosine' in feature_cols:
+        use_term_index()
+    check_labels(records, labels, train_split)
+    labelled = [(record, labels[i]) for i, record in enumerate(records) if labels[i] is not None]
+
+    start = time.perf_counter()
+    feature_matrices, featurized = build_feature_matrices([record for record, _ in labelled], cache_dir, workers, log=log)
+    feature_seconds = time.perf_counter() - start
+
+    splits = {}
+    for (record, true_links), (features, _) in zip(labelled, feature_matrices):
+        split = record.get('split', 'train')
+        X_parts, y_parts = splits.setdefault(split, ([], []))
+        X_parts.append(features)
+        y_parts.append(label_matrix(record, true_links).ravel())
+
+    def split_data(split, cols):
+        X_parts, y_parts = splits.get(split, ([], []))
+        return stack_features(X_parts, cols), np.concatenate(y_parts) if y_parts else np.empty(0, dtype=np.int64)
+
+    start = time.perf_counter()
+    X_train, y_train = split_data(train_split, feature_cols)
+    classifier = make_classifier(C, smote_ratio).fit(X_train, y_train)
+    train_seconds = time.perf_counter() - start
+
+    # Evaluate on the labelled eval split; without one, cross-validate over the train
+    # brief pairs, holding out whole pairs so no brief is seen in training and evaluation
+    train_groups = np.concatenate([np.full(len(y), i) for i, y in enumerate(splits[train_split][1])])
+    n_folds = min(5, len(splits[train_split][1]))
+    if eval_split in splits:
+        evaluation = eval_split
+    elif n_folds >= 2:
+        evaluation = f"{train_split} ({n_folds}-fold grouped cross-validation)"
+    else:
+        evaluation = None
+
+    def evaluate_columns(cols, fitted=None):
+        X, y = split_data(train_split, cols)
+        if evaluation == eval_split:
+            X_eval, y_eval = split_data(eval_split, cols)
+            model = fitted or make_classifier(C, smote_ratio).fit(X, y)
+            return evaluate(y_eval, model.predict_proba(X_eval)[:, 1], threshold)
+
+        from sklearn.model_selection import GroupKFold
+        proba = np.zeros(len(y))
+        for train_idx, test_idx in GroupKFold(n_splits=n_folds).split(X, y, train_groups):
+            fold_model = make_classifier(C, smote_ratio).fit(X[train_idx], y[train_idx])
+            proba[test_idx] = fold_model.predict_proba(X[test_idx])[:, 1]
+        return evaluate(y, proba, threshold)
+
+    metrics = evaluate_columns(feature_cols, classifier) if evaluation else None
+
+    # Per-feature extraction cost next to what each feature contributes to F1
+    total_pairs = sum(features[feature_cols[0]].size for features, _ in feature_matrices)
+    feature_report = {}
+    for col in feature_cols:
+        cost = sum(costs.get(col, 0.0) for _, costs in feature_matrices)
+        entry = {'extraction_seconds': cost, 'extraction_us_per_pair': cost / total_pairs * 1e6 if total_pairs else 0.0}
+        reduced = [c for c in feature_cols if c != col]
+        if reduced and metrics is not None:
+            reduced_metrics = evaluate_columns(reduced)
+            entry['f1_without_feature'] = reduced_metrics['f1']
+            entry['f1_drop'] = metrics['f1'] - reduced_metrics['f1']
+        feature_report[col] = entry
+
+    report = {
+        'feature_version': app.ArgumentFeatureExtractor.FEATURE_VERSION,
+        'encoder': app.feature_extractor.model_name,
+        'feature_cols': feature_cols,
+        'brief_pairs': {split: len(X_parts) for split, (X_parts, _) in splits.items()},
+        'train_pairs': int(len(y_train)),
+        'train_positives': int(y_train.sum()),
+        'featurized_brief_pairs': featurized,
+        'feature_seconds': feature_seconds,
+        'train_seconds': train_seconds,
+        'threshold': threshold,
+        'classifier': {'C': C, 'smote_ratio': smote_ratio},
+        'metrics': {evaluation or eval_split: metrics},
+        'features': feature_report
+    }
+    return classifier, report
+
+
+def load_labels(records, labels_path=None):
+    """true_links per record, from the record itself or a {moving brief_id: links} file"""
+    by_brief_id = {}
+    if labels_path:
+        with open(labels_path, 'r') as f:
+            by_brief_id = json.load(f)
+    return [record['true_links'] if 'true_links' in record
+            else by_brief_id.get(str(record['moving_brief'].get('brief_id')))
+            for record in records]
+
+
+def check_labels(records, labels, train_split='train'):
+    """Raise ValueError, naming the fields training needs, unless some train_split record is labelled"""
+    for record, true_links in zip(records, labels):
+        if true_links is None:
+            continue
+        if not isinstance(true_links, list) or not all(
+                isinstance(link, list) and len(link) == 2 and all(isinstance(heading, str) for heading in link)
+                for link in true_links):
+            brief_id = record['moving_brief'].get('brief_id')
+            raise ValueError(f"Labels of moving brief '{brief_id}' must be a list of "
+                             f"[moving_heading, response_heading] pairs.")
+    labelled = sum(true_links is not None for true_links in labels)
+    if not any(true_links is not None and record.get('split', 'train') == train_split
+               for record, true_links in zip(records, labels)):
+        raise ValueError(
+            f"No labelled brief pairs in split '{train_split}' ({labelled} of {len(records)} records labelled). "
+            f"Training records need 'split': '{train_split}' and 'true_links', a list of "
+            f"[moving_heading, response_heading] pairs; or pass --labels with a JSON object mapping "
+            f"each moving brief_id to such a list.")
+
+
+def write_model(classifier, report, output_dir):
+    """
+    Write model.pkl and its exported NumPy-scorer weights (parity-checked), update
+    config.json and write training_report.json
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'model.pkl'), 'wb') as f:
+        pickle.dump(classifier, f)
+
+    config_path = os.path.join(output_dir, 'config.json')
+    config = {}
+    if os.path.exists(config_path):
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+
+    weights_path = os.path.join(output_dir, config.get('model_weights_file', 'model_weights.json'))
+    scorer = export_model(classifier, report['feature_cols'], weights_path,
+                          metadata={'source': 'model.pkl', 'feature_version': report['feature_version']})
+    report['model_version'] = scorer.model_version
+    config.update({
+        'feature_cols': report['feature_cols'],
+        'model_name': 'Logistic Regression',
+        'threshold': report['threshold'],
+        'feature_version': report['feature_version']
+    })
+    with open(config_path, 'w') as f:
+        json.dump(config, f)
+
+    with open(os.path.join(output_dir, 'training_report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def print_report(report, log=print):
+    log(f"Features built in {report['feature_seconds']:.2f}s ({report['featurized_brief_pairs']} brief pairs featurized, "
+        f"rest cached); classifier trained in {report['train_seconds']:.2f}s on {report['train_pairs']} pairs")
+    for split, metrics in report['metrics'].items():
+        if metrics is None:
+            log(f"No labelled '{split}' pairs to evaluate")
+            continue
+        auc = f"{metrics['roc_auc']:.3f}" if metrics['roc_auc'] is not None else 'n/a'
+        log(f"{split}: {metrics['pairs']} pairs, accuracy {metrics['accuracy']:.3f}, precision {metrics['precision']:.3f}, "
+            f"recall {metrics['recall']:.3f}, F1 {metrics['f1']:.3f}, ROC AUC {auc}")
+    log(f"{'feature':>20} {'cost s':>8} {'us/pair':>9} {'F1 without':>11} {'F1 drop':>8}")
+    for name, entry in report['features'].items():
+        without = f"{entry['f1_without_feature']:11.3f} {entry['f1_drop']:8.3f}" if 'f1_drop' in entry else f"{'':>11} {'':>8}"
+        log(f"{name:>20} {entry['extraction_seconds']:8.3f} {entry['extraction_us_per_pair']:9.1f} {without}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train and evaluate the argument-link classifier")
+    parser.add_argument('input', help="JSON array or JSONL file of brief pairs with 'split' (and 'true_links')")
+    parser.add_argument('--labels', help="JSON object mapping moving brief_id to [moving_heading, response_heading] links")
+    parser.add_argument('--output-dir', default=app.model_path, help="Where model.pkl and config.json are written")
+    parser.add_argument('--cache-dir', default='.feature_cache', help="Feature matrix cache directory")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes building feature matrices, each loading the models once")
+    parser.add_argument('--features', nargs='+', help="Feature columns (default: the configured feature_cols)")
+    parser.add_argument('--train-split', default='train')
+    parser.add_argument('--eval-split', default='test')
+    parser.add_argument('--C', type=float, default=0.1, help="Inverse regularization strength")
+    parser.add_argument('--smote-ratio', type=float, default=0.75, help="SMOTE sampling strategy (0 disables)")
+    parser.add_argument('--threshold', type=float, default=0.4, help="Link threshold used for evaluation")
+    args = parser.parse_args(argv)
+
+    # Check the labels before the (slow) model load
+    records = list(iter_records(args.input))
+    labels = load_labels(records, args.labels)
+    try:
+        check_labels(records, labels, args.train_split)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    if not app.ensure_models_loaded():
+        return 1
+    feature_cols = args.features or app.feature_cols or DEFAULT_FEATURE_COLS
+
+    try:
+        classifier, report = train(records, labels, feature_cols, args.cache_dir, args.train_split, args.eval_split,
+                                   args.C, args.smote_ratio, args.threshold, args.workers)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+
+    write_model(classifier, report, args.output_dir)
+    print_report(report)
+    print(f"Model written to {args.output_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""
+Production WSGI entry point.
+
+MODEL_LOADING selects how the models are loaded:
+
+    background  (default) each worker starts answering immediately and loads the models in a
+                background thread (started by gunicorn.conf.py's post_worker_init, or by the
+                first request that needs them). /api/health reports the load phase and
+                /api/ready stays 503 until the worker is ready, so new pods come up fast.
+    preload     load once at import time. With gunicorn's preload_app (see gunicorn.conf.py)
+                that happens in the master before workers are forked, so every worker shares
+                the loaded weights copy-on-write; uses less memory with many workers, but
+                nothing answers until loading is done.
+
+SERVING_MODE=async (with gunicorn.conf.py's gthread workers) runs encoding and scoring on a
+bounded per-worker executor of COMPUTE_CONCURRENCY jobs, so health checks and argument
+extraction are answered by the other request threads while link jobs run.
+
+Usage:
+    gunicorn -c gunicorn.conf.py wsgi:application
+    SERVING_MODE=async COMPUTE_CONCURRENCY=2 gunicorn -c gunicorn.conf.py wsgi:application
+"""
+import gc
+import os
+
+from app import app, configure_serving, load_models
+
+MODEL_LOADING = os.environ.get('MODEL_LOADING', 'background')
+if MODEL_LOADING not in ('background', 'preload'):
+    raise ValueError(f"Unknown MODEL_LOADING '{MODEL_LOADING}'. Expected 'background' or 'preload'.")
+
+if MODEL_LOADING == 'preload':
+    if not load_models():
+        raise RuntimeError("Failed to load models")
+
+    # Move everything allocated so far out of the garbage collector's reach, so GC passes
+    # in the workers don't write to (and un-share) the model's pages
+    gc.freeze()
+
+configure_serving()
+
+application = app